@@ -0,0 +1,205 @@
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS SiteCounters (
+        name VARCHAR(64) NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS UserBookCounts (
+        user_id INT NOT NULL,
+        book_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id),
+        KEY idx_book_count (book_count)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS BookReadCounts (
+        book_id INT NOT NULL,
+        read_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (book_id)
+    )
+    """,
+]
+
+# What each counter stands for, as a full scan; reconcile() compares against
+# these. {reads} is HasRead, or what stands in for it (see reconcile)
+COUNT_QUERIES = {
+    # Total users (excluding admin)
+    'total_users': "SELECT COUNT(*) FROM User WHERE username != 'admin'",
+    # Total books
+    'total_books': "SELECT COUNT(*) FROM Book",
+    # Total reads (entries in HasRead)
+    'total_reads': "SELECT COUNT(*) FROM {reads} h",
+    # Unique books read (distinct book_id)
+    'unique_books_read': "SELECT COUNT(DISTINCT h.book_id) FROM {reads} h",
+}
+
+FETCH_QUERY = "SELECT name, value FROM SiteCounters"
+
+# Top 5 users with most books, read off idx_book_count
+TOP_USERS_QUERY = """
+    SELECT u.username, u.name, c.book_count
+    FROM UserBookCounts c
+    JOIN User u ON u.user_id = c.user_id
+    WHERE u.username != 'admin'
+    ORDER BY c.book_count DESC
+    LIMIT 5
+"""
+
+_TRUE_BOOK_COUNTS = """
+    SELECT u.user_id, COUNT(b.book_id)
+    FROM User u
+    LEFT JOIN Book b ON u.user_id = b.user_id
+    GROUP BY u.user_id
+"""
+
+_BUMP = """
+    INSERT INTO SiteCounters (name, value) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+"""
+
+_BUMP_USER = """
+    INSERT INTO UserBookCounts (user_id, book_count) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE book_count = book_count + VALUES(book_count)
+"""
+
+_TRUE_READ_COUNTS = "SELECT h.book_id, COUNT(*) FROM {reads} h GROUP BY h.book_id"
+
+
+def _bump(cursor, **deltas):
+    cursor.executemany(_BUMP, [(name, delta) for name, delta in deltas.items() if delta])
+
+
+def user_added(db, user_id, username):
+    cursor = db.cursor()
+    if username != 'admin':
+        _bump(cursor, total_users=1)
+    cursor.execute(_BUMP_USER, (user_id, 0))
+    cursor.close()
+
+
+def user_removed(db, user_id):
+    """Call before the User row is deleted, while its books still exist; the
+    event log takes back the reads that go with them"""
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Book WHERE user_id = %s", (user_id,))
+    books = cursor.fetchone()[0]
+    _bump(cursor, total_users=-1, total_books=-books)
+    cursor.execute("DELETE FROM UserBookCounts WHERE user_id = %s", (user_id,))
+    cursor.close()
+
+
+def books_added(db, user_id, count=1):
+    cursor = db.cursor()
+    _bump(cursor, total_books=count)
+    cursor.execute(_BUMP_USER, (user_id, count))
+    cursor.close()
+
+
+def book_removed(db, user_id):
+    """Count a deleted book; the event log takes back its reads"""
+    cursor = db.cursor()
+    _bump(cursor, total_books=-1)
+    cursor.execute(_BUMP_USER, (user_id, -1))
+    cursor.close()
+
+
+def record_reads(db, reads):
+    """Count (book_id, date, delta) reads, a delta of -1 taking back a deleted one.
+    BookReadCounts keeps each book's total, so unique_books_read moves exactly
+    when a book gets its first read or loses its last."""
+    deltas = {}
+    for book_id, _, delta in reads:
+        deltas[book_id] = deltas.get(book_id, 0) + delta
+    books = list(deltas)
+    cursor = db.cursor()
+    cursor.execute("SELECT book_id, read_count FROM BookReadCounts "
+                   f"WHERE book_id IN ({', '.join(['%s'] * len(books))})", books)
+    before = dict(cursor.fetchall())
+    after = {book_id: before.get(book_id, 0) + delta for book_id, delta in deltas.items()}
+    cursor.executemany("""
+        INSERT INTO BookReadCounts (book_id, read_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE read_count = VALUES(read_count)
+    """, [(book_id, count) for book_id, count in after.items() if count > 0 and deltas[book_id]])
+    emptied = [(book_id,) for book_id, count in after.items() if count <= 0 and book_id in before]
+    if emptied:
+        cursor.executemany("DELETE FROM BookReadCounts WHERE book_id = %s", emptied)
+    _bump(cursor, total_reads=sum(deltas.values()),
+          unique_books_read=sum((after[b] > 0) - (before.get(b, 0) > 0) for b in books))
+    cursor.close()
+
+
+def clear_reads(db):
+    """Zero the read counters before the event log replays every read"""
+    cursor = db.cursor()
+    cursor.execute("UPDATE SiteCounters SET value = 0 WHERE name IN ('total_reads', 'unique_books_read')")
+    cursor.execute("DELETE FROM BookReadCounts")
+    cursor.close()
+
+
+def fetch(db):
+    """The /api/admin/stats payload: one primary-key range and one short index scan"""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(FETCH_QUERY)
+    stored = {row['name']: row['value'] for row in cursor.fetchall()}
+    cursor.execute(TOP_USERS_QUERY)
+    top_users = cursor.fetchall()
+    cursor.close()
+    return summarize(stored, top_users)
+
+
+def summarize(stored, top_users):
+    counts = {name: int(stored.get(name, 0)) for name in COUNT_QUERIES}
+    return {**counts, 'top_users': top_users}
+
+
+def seed_read_counts(db, reads):
+    """Fill BookReadCounts from `reads`, a (query, params) standing in for
+    HasRead; the read counters kept before the event log had no per-book totals"""
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookReadCounts")
+    cursor.execute("INSERT INTO BookReadCounts (book_id, read_count) "
+                   + _TRUE_READ_COUNTS.format(reads=f"({reads[0]})"), reads[1])
+    cursor.close()
+
+
+def reconcile(db, fix=False, reads=None):
+    """Recount everything with full scans and report drift as {name: (stored, actual)}.
+
+    Per-user book counts that drifted are reported as 'user_books:<id>'. With
+    fix=True the stored values are overwritten with the actual ones. `reads`
+    is an optional (query, params) the read counters are recounted from instead
+    of HasRead, such as the reads the event log has counted so far.
+    """
+    source, params = (f"({reads[0]})", reads[1]) if reads else ("HasRead", ())
+    cursor = db.cursor()
+    cursor.execute(FETCH_QUERY)
+    stored = dict(cursor.fetchall())
+    drift = {}
+    for name, query in COUNT_QUERIES.items():
+        cursor.execute(query.format(reads=source), params if '{reads}' in query else ())
+        actual = cursor.fetchone()[0]
+        if stored.get(name, 0) != actual:
+            drift[name] = (stored.get(name, 0), actual)
+
+    cursor.execute("SELECT user_id, book_count FROM UserBookCounts")
+    stored_users = dict(cursor.fetchall())
+    cursor.execute(_TRUE_BOOK_COUNTS)
+    actual_users = dict(cursor.fetchall())
+    for user_id in stored_users.keys() | actual_users.keys():
+        if stored_users.get(user_id) != actual_users.get(user_id):
+            drift[f'user_books:{user_id}'] = (stored_users.get(user_id), actual_users.get(user_id))
+
+    if fix and drift:
+        cursor.executemany("""
+            INSERT INTO SiteCounters (name, value) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+        """, [(name, actual) for name, (_, actual) in drift.items() if name in COUNT_QUERIES])
+        cursor.execute("DELETE FROM UserBookCounts")
+        cursor.execute("INSERT INTO UserBookCounts (user_id, book_count) " + _TRUE_BOOK_COUNTS)
+    cursor.close()
+    if fix:
+        seed_read_counts(db, reads or ("SELECT * FROM HasRead", ()))
+    return drift
@@ -0,0 +1,149 @@
+"""Async serving mode for the backend.
+
+    uvicorn asgi_app:app --port 8000
+
+The read-heavy routes below are served natively on an aiomysql pool, running
+independent queries concurrently. Every other route falls through to the Flask
+app in main.py, so both modes expose the same API. Needs starlette, aiomysql
+and an ASGI server (uvicorn) installed; the Flask path does not.
+
+The title search index and the starred, library, followee, user and name
+caches live in each process. Writes bump a CacheEpochs row in their own
+transaction, and every process drops what they changed within
+CACHE_EPOCH_INTERVAL seconds (main.EPOCH_SCOPES), so --workers > 1 works
+with RESPONSE_CACHE_BACKEND = 'redis'. The default memory response cache is
+only invalidated by writes and event-log batches its own process handles, so
+with it run one worker; concurrency then comes from the event loop and the
+thread pool the Flask routes run on.
+"""
+import asyncio
+import contextlib
+from datetime import datetime
+
+import aiomysql
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+import admin_counters
+import challenges
+import main
+import migrate
+import stats_summary
+from main import app as flask_app, AUTHOR_STATS_QUERY
+
+config = flask_app.config
+pool = None
+
+
+def json_response(content, status_code=200):
+    # Flask's encoder, so dates and Decimals serialize exactly as in main.py
+    return Response(flask_app.json.dumps(content), status_code=status_code,
+                    media_type='application/json')
+
+
+async def fetch(query, params=(), one=False):
+    """Run one query on its own pooled connection; rows come back as dicts"""
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, params)
+            return await (cursor.fetchone() if one else cursor.fetchall())
+
+
+async def health(request):
+    return json_response({
+        "status": "healthy",
+        "message": "ASGI server is running",
+        "database": "MySQL",
+        "pool": {"size": pool.size, "free": pool.freesize, "max_size": pool.maxsize},
+    })
+
+
+async def reading_stats(request):
+    user_id = request.query_params.get("user_id")
+    if not user_id:
+        return json_response({"error": "Missing user ID"}, 400)
+    row = await fetch(stats_summary.FETCH_QUERY, (user_id,), one=True)
+    return json_response(stats_summary.summarize(row))
+
+
+async def reading_challenges(request):
+    user_id = request.query_params.get("user_id")
+    if not user_id:
+        return json_response({"status": "error", "message": "Missing user_id"}, 400)
+    metrics = await fetch(challenges.METRICS_QUERY, (user_id, datetime.now().year), one=True)
+    return json_response({"status": "success", "challenges": challenges.score(metrics)})
+
+
+async def author_stats(request):
+    user_id = request.query_params.get("username")
+    if not user_id:
+        return json_response({"error": "Missing user ID"}, 400)
+    top_authors = await fetch(AUTHOR_STATS_QUERY, (user_id,))
+    return json_response([{
+        "author_name": author["author_name"],
+        "num_books": author["num_books"],
+        "avg_page_length": author["avg_page_length"],
+        "min_book_title": author["min_book_title"] or "N/A",
+        "min_page_length": author["min_page_length"],
+        "max_book_title": author["max_book_title"] or "N/A",
+        "max_page_length": author["max_page_length"],
+    } for author in top_authors])
+
+
+async def admin_stats(request):
+    try:
+        counters, top_users = await asyncio.gather(
+            fetch(admin_counters.FETCH_QUERY),
+            fetch(admin_counters.TOP_USERS_QUERY),
+        )
+        stored = {row['name']: row['value'] for row in counters}
+        return json_response({"status": "success", "stats": admin_counters.summarize(stored, top_users)})
+    except Exception as e:
+        return json_response({"status": "error", "message": str(e)}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global pool
+    # The Flask routes answer 503 until then; the native ones have no such guard
+    if main.pending_migrations:
+        raise RuntimeError(f"Pending schema migrations: {migrate.describe(main.pending_migrations)}; "
+                           "run `flask db-migrate` first")
+    pool = await aiomysql.create_pool(
+        host=config['DB_HOST'],
+        user=config['DB_USER'],
+        password=config['DB_PASSWORD'],
+        db=config['DB_DATABASE'],
+        port=config['DB_PORT'],
+        minsize=1,
+        maxsize=config['DB_POOL_SIZE'] + config['DB_POOL_MAX_OVERFLOW'],
+        pool_recycle=config['DB_POOL_RECYCLE'],
+        autocommit=True,
+    )
+    yield
+    pool.close()
+    await pool.wait_closed()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health),
+        Route('/api/reading-stats', reading_stats),
+        Route('/api/reading_challenges', reading_challenges),
+        Route('/api/author-stats', author_stats),
+        Route('/api/admin/stats', admin_stats),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    # Mirrors CORS(app, ...) in main.py for the natively served routes
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                           allow_headers=['*'], expose_headers=['X-Next-Cursor'])],
+    lifespan=lifespan,
+)
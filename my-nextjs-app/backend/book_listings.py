@@ -0,0 +1,73 @@
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS BookListings (
+        book_id INT NOT NULL PRIMARY KEY,
+        user_id INT NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        issue VARCHAR(255) DEFAULT NULL,
+        page_length INT DEFAULT NULL,
+        cover_url VARCHAR(400) DEFAULT NULL,
+        authors VARCHAR(1024) DEFAULT NULL,
+        KEY idx_user_title (user_id, title, book_id),
+        KEY idx_user_pages (user_id, page_length, book_id)
+    )
+    """,
+]
+
+# Columns every listing endpoint returns, in the shape the old GROUP_CONCAT queries produced
+COLUMNS = "l.book_id, l.title, l.issue, l.page_length, l.cover_url, l.authors"
+
+# The join the projection replaces; only ever run for the rows being written.
+# Migration 0005 runs it once over every book to fill the table on upgrade.
+_PROJECT = """
+    INSERT INTO BookListings (book_id, user_id, title, issue, page_length, cover_url, authors)
+    SELECT b.book_id, b.user_id, b.title, b.issue, b.page_length, b.cover_url,
+           LEFT(GROUP_CONCAT(DISTINCT a.name SEPARATOR ', '), 1024)
+    FROM Book b
+    LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
+    LEFT JOIN Author a ON wb.author_id = a.author_id
+    {where}
+    GROUP BY b.book_id, b.user_id, b.title, b.issue, b.page_length, b.cover_url
+    ON DUPLICATE KEY UPDATE
+        user_id = VALUES(user_id), title = VALUES(title), issue = VALUES(issue),
+        page_length = VALUES(page_length), cover_url = VALUES(cover_url), authors = VALUES(authors)
+"""
+
+
+def book_added(db, book_id):
+    """Project one book; call after its Book and WrittenBy rows are inserted"""
+    cursor = db.cursor()
+    cursor.execute(_PROJECT.format(where="WHERE b.book_id = %s AND b.user_id IS NOT NULL"), (book_id,))
+    cursor.close()
+
+
+def books_added(db, user_id, count=1):
+    """Project the user's `count` newest books, i.e. a bulk import batch before its commit"""
+    cursor = db.cursor()
+    cursor.execute(_PROJECT.format(where="""
+        JOIN (SELECT book_id FROM Book WHERE user_id = %s ORDER BY book_id DESC LIMIT %s) newest
+          ON newest.book_id = b.book_id
+    """), (user_id, count))
+    cursor.close()
+
+
+def book_removed(db, book_id):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookListings WHERE book_id = %s", (book_id,))
+    cursor.close()
+
+
+def forget_user(db, user_id):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookListings WHERE user_id = %s", (user_id,))
+    cursor.close()
+
+
+def rebuild_all(db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookListings")
+    cursor.execute(_PROJECT.format(where="WHERE b.user_id IS NOT NULL"))
+    cursor.execute("SELECT COUNT(*) FROM BookListings")
+    rows = cursor.fetchone()[0]
+    cursor.close()
+    return rows
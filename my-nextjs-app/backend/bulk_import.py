@@ -0,0 +1,150 @@
+import csv
+import time
+
+# Column names in books.csv as produced by scripts/script1.py and script2.py
+COLUMNS = {
+    'title': 'Book-Title',
+    'author': 'Book-Author',
+    'publisher': 'Publisher',
+    'cover_url': 'Image-URL-L',
+}
+
+_IN_CHUNK = 1000
+
+
+def read_rows(lines):
+    """Parse the semicolon-separated books CSV lazily, one dict per usable row.
+
+    `lines` is any iterable of text lines (an open file, a decoded upload
+    stream), so the file is never held in memory.
+    """
+    reader = csv.DictReader(lines, delimiter=';', quotechar='"')
+    for record in reader:
+        row = {key: (record.get(column) or '').strip()[:255] for key, column in COLUMNS.items()}
+        if not row['cover_url']:
+            row['cover_url'] = None
+        yield row
+
+
+def _key(name):
+    # The tables use a case-insensitive collation, so dedupe the same way
+    return name.casefold()
+
+
+class BulkImporter:
+    """Loads books for one user in batched transactions.
+
+    Authors and publishers are resolved through in-memory maps, so each name
+    costs one lookup per import rather than an insert-then-select per book.
+    Each batch is a handful of multi-row statements: resolve new names, insert
+    the books, then link them in WrittenBy and PublishedBy.
+    """
+
+    def __init__(self, db, user_id, batch_size=5000, before_commit=None):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        # Called as before_commit(db, user_id, rows) inside each batch's transaction
+        self.before_commit = before_commit
+        self.authors = {}
+        self.publishers = {}
+        self.imported = 0
+        self.skipped = 0
+        self.authors_created = 0
+        self.publishers_created = 0
+
+    def run(self, rows, progress=None):
+        """Import every row; returns a report with throughput.
+
+        `progress`, if given, is called with the report after each batch.
+        """
+        started = time.perf_counter()
+        batch = []
+        for row in rows:
+            if not row['title'] or not row['author'] or not row['publisher']:
+                self.skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+                if progress:
+                    progress(self.report(started))
+        if batch:
+            self._flush(batch)
+        return self.report(started)
+
+    def report(self, started):
+        seconds = time.perf_counter() - started
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "authors_created": self.authors_created,
+            "publishers_created": self.publishers_created,
+            "seconds": round(seconds, 2),
+            "rows_per_sec": round(self.imported / seconds) if seconds else 0,
+        }
+
+    def _flush(self, batch):
+        cursor = self.db.cursor()
+        try:
+            self.authors_created += self._resolve(
+                cursor, 'Author', 'author_id', [row['author'] for row in batch], self.authors)
+            self.publishers_created += self._resolve(
+                cursor, 'Publisher', 'publisher_id', [row['publisher'] for row in batch], self.publishers)
+
+            # executemany turns this into one multi-row INSERT, whose
+            # AUTO_INCREMENT ids are consecutive starting at lastrowid
+            cursor.executemany("""
+                INSERT INTO Book (title, issue, page_length, cover_url, user_id)
+                VALUES (%s, NULL, NULL, %s, %s)
+            """, [(row['title'], row['cover_url'], self.user_id) for row in batch])
+            first_id = cursor.lastrowid
+            book_ids = range(first_id, first_id + len(batch))
+
+            cursor.executemany(
+                "INSERT INTO WrittenBy (book_id, author_id) VALUES (%s, %s)",
+                [(book_id, self.authors[_key(row['author'])]) for book_id, row in zip(book_ids, batch)]
+            )
+            cursor.executemany(
+                "INSERT INTO PublishedBy (book_id, publisher_id) VALUES (%s, %s)",
+                [(book_id, self.publishers[_key(row['publisher'])]) for book_id, row in zip(book_ids, batch)]
+            )
+            if self.before_commit:
+                self.before_commit(self.db, self.user_id, len(batch))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.imported += len(batch)
+
+    def _resolve(self, cursor, table, id_column, names, known):
+        """Fill `known` with ids for `names`, inserting the ones not in the table yet"""
+        missing = {}
+        for name in names:
+            key = _key(name)
+            if key not in known and key not in missing:
+                missing[key] = name
+        if not missing:
+            return 0
+
+        self._lookup(cursor, table, id_column, list(missing.values()), known)
+        new_names = [name for key, name in missing.items() if key not in known]
+        if new_names:
+            # The unique name key turns a concurrent insert of the same name into a no-op
+            cursor.executemany(f"INSERT IGNORE INTO {table} (name) VALUES (%s)", [(name,) for name in new_names])
+            self._lookup(cursor, table, id_column, new_names, known)
+        return len(new_names)
+
+    def _lookup(self, cursor, table, id_column, names, known):
+        for i in range(0, len(names), _IN_CHUNK):
+            chunk = names[i:i + _IN_CHUNK]
+            cursor.execute(f"""
+                SELECT name, MIN({id_column}) FROM {table}
+                WHERE name IN ({', '.join(['%s'] * len(chunk))})
+                GROUP BY name
+            """, chunk)
+            for name, found_id in cursor.fetchall():
+                known.setdefault(_key(name), found_id)
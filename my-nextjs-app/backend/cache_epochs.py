@@ -0,0 +1,60 @@
+import threading
+import time
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS CacheEpochs (
+        name VARCHAR(64) NOT NULL,
+        epoch BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (name)
+    )
+    """,
+]
+
+
+def bump(cursor, name):
+    """Advance epoch `name`; call in the transaction whose writes it announces"""
+    cursor.execute("""
+        INSERT INTO CacheEpochs (name, epoch) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE epoch = epoch + 1
+    """, (name,))
+
+
+class EpochWatcher:
+    """Notices CacheEpochs rows under `prefix` that another process advanced.
+
+    In-process caches cannot see writes made by other processes, such as a
+    `flask` CLI command. Those writes bump an epoch, and every serving process
+    calls `on_change(suffix)` for each epoch that moved since its last check,
+    at most `interval` seconds later. The first check only records where the
+    epochs stand, since nothing has been cached before it.
+    """
+
+    def __init__(self, prefix, on_change, interval=5):
+        self.prefix = prefix
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = None
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def check(self, connect):
+        """Poll if a check is due; `connect()` returns the connection to read with"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked < self.interval:
+                return
+            self._checked = now
+
+        cursor = connect().cursor()
+        cursor.execute("SELECT name, epoch FROM CacheEpochs WHERE name LIKE %s", (self.prefix + '%',))
+        found = dict(cursor.fetchall())
+        cursor.close()
+
+        with self._lock:
+            seen, self._seen = self._seen, found
+        if seen is None:
+            return
+        for name, epoch in found.items():
+            if seen.get(name) != epoch:
+                self.on_change(name[len(self.prefix):])
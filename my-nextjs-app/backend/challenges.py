@@ -0,0 +1,116 @@
+from datetime import datetime
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS UserYearReads (
+        user_id INT NOT NULL,
+        year SMALLINT NOT NULL,
+        books_read INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, year)
+    )
+    """,
+]
+
+
+class Challenge:
+    """A goal on one of the per-user metrics below; adding one needs no new SQL"""
+
+    def __init__(self, key, metric, goal):
+        self.key = key
+        self.metric = metric
+        self.goal = goal
+
+    def evaluate(self, metrics):
+        progress = metrics.get(self.metric) or 0
+        return {"completed": progress >= self.goal, "progress": progress}
+
+
+CHALLENGES = [
+    Challenge('read_12_books_this_year', 'books_this_year', 12),
+    Challenge('read_3_books_by_same_author', 'max_books_by_author', 3),
+    Challenge('read_5000_pages', 'total_pages', 5000),
+]
+
+
+def register(challenge):
+    """Add a challenge definition, replacing any existing one with the same key"""
+    CHALLENGES[:] = [c for c in CHALLENGES if c.key != challenge.key]
+    CHALLENGES.append(challenge)
+
+
+# Every metric a challenge can target, read with primary-key lookups only.
+# max_books_by_author and total_pages come from the reading stats summary.
+METRICS_QUERY = """
+    SELECT
+        COALESCE(y.books_read, 0) AS books_this_year,
+        COALESCE(s.favorite_author_reads, 0) AS max_books_by_author,
+        COALESCE(s.total_pages, 0) AS total_pages,
+        COALESCE(s.total_books, 0) AS books_with_pages
+    FROM (SELECT %s AS user_id) u
+    LEFT JOIN UserReadingStats s ON s.user_id = u.user_id
+    LEFT JOIN UserYearReads y ON y.user_id = u.user_id AND y.year = %s
+"""
+
+_APPLY_READ = """
+    INSERT INTO UserYearReads (user_id, year, books_read)
+    SELECT user_id, YEAR(date), 1
+    FROM HasRead
+    WHERE hasread_id = %s
+    ON DUPLICATE KEY UPDATE books_read = books_read + 1
+"""
+
+_REBUILD = """
+    INSERT INTO UserYearReads (user_id, year, books_read)
+    SELECT hr.user_id, YEAR(hr.date), COUNT(*)
+    FROM HasRead hr
+    {where}
+    GROUP BY hr.user_id, YEAR(hr.date)
+"""
+
+
+def record_read(db, hasread_id):
+    """Bump the yearly counter for one newly inserted HasRead row"""
+    cursor = db.cursor()
+    cursor.execute(_APPLY_READ, (hasread_id,))
+    cursor.close()
+
+
+def clear(db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM UserYearReads")
+    cursor.close()
+
+
+def rebuild_user(db, user_id, only=None):
+    """`only` is an optional (condition, params) on HasRead `hr` limiting the rows counted"""
+    condition, params = only or ("TRUE", ())
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM UserYearReads WHERE user_id = %s", (user_id,))
+    cursor.execute(_REBUILD.format(where=f"WHERE hr.user_id = %s AND {condition}"), (user_id, *params))
+    cursor.close()
+
+
+def rebuild_all(db, only=None):
+    condition, params = only or ("TRUE", ())
+    clear(db)
+    cursor = db.cursor()
+    cursor.execute(_REBUILD.format(where=f"WHERE {condition}"), params)
+    cursor.execute("SELECT COUNT(DISTINCT user_id) FROM UserYearReads")
+    users = cursor.fetchone()[0]
+    cursor.close()
+    return users
+
+
+def evaluate(db, user_id, year=None):
+    """Progress on every registered challenge for a user"""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(METRICS_QUERY, (user_id, year or datetime.now().year))
+    metrics = cursor.fetchone()
+    cursor.close()
+    return score(metrics)
+
+
+def score(metrics):
+    """Progress on every registered challenge, given a METRICS_QUERY row as a dict"""
+    metrics = {name: int(value) for name, value in metrics.items()}
+    return {challenge.key: challenge.evaluate(metrics) for challenge in CHALLENGES}
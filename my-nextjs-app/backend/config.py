@@ -4,3 +4,70 @@ class Config:
     DB_PASSWORD = ''
     DB_DATABASE = 'test_db'
     DB_PORT = 3306
+
+    # Connection pool used by get_db()
+    DB_POOL_SIZE = 5
+    DB_POOL_MAX_OVERFLOW = 10
+    DB_POOL_RECYCLE = 3600      # seconds before a connection is reopened
+    DB_POOL_PRE_PING = True     # ping connections on checkout
+    DB_POOL_TIMEOUT = 30        # seconds to wait for a free connection
+
+    # Activity feed timelines
+    FEED_TIMELINE_LENGTH = 500  # entries kept per follower
+    FEED_FANOUT_LIMIT = 1000    # above this many followers, reads are pulled at read time
+    FEED_TRIM_EVERY = 20        # trim a follower's timeline on ~1 in N pushes
+
+    # Keyset pagination for list endpoints
+    PAGE_SIZE_DEFAULT = 100
+    PAGE_SIZE_MAX = 1000
+
+    # Streaming responses (?stream=ndjson|array)
+    STREAM_BATCH_SIZE = 500     # rows fetched from the cursor per round-trip
+
+    # Bulk book import (POST /api/books/bulk, flask import-books)
+    BULK_IMPORT_BATCH_SIZE = 5000   # rows per transaction
+
+    # Author/Publisher name -> id cache used by the write paths
+    NAME_CACHE_SIZE = 10000         # entries per kind
+
+    # Cross-process invalidation of in-process caches (CacheEpochs)
+    CACHE_EPOCH_INTERVAL = 5        # seconds between checks for writes by other processes
+
+    # Starred-book membership for the listing endpoints
+    STARRED_CACHE_USERS = 10000     # users whose starred sets are kept in memory
+    STARRED_VIA_JOIN = False        # page-range: LEFT JOIN Starred instead of the cache
+
+    # Response cache for read endpoints
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_BACKEND = 'memory'   # or 'redis' to share entries with other processes
+    RESPONSE_CACHE_REDIS_URL = 'redis://localhost:6379/0'
+    RESPONSE_CACHE_TTL = 60             # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = 5000   # memory backend only
+
+    # Query instrumentation (/api/admin/metrics)
+    QUERY_METRICS_ENABLED = True
+    SLOW_QUERY_MS = 200             # statements at or over this are logged, parameters redacted
+
+    # Follow suggestions (/api/users-to-follow)
+    SUGGESTIONS_TOP_K = 20          # candidates stored and served per user
+
+    # Typeahead user search (/api/search-users)
+    FOLLOWEE_CACHE_USERS = 10000    # users whose followee sets are kept in memory
+    USER_SEARCH_RETRY = 30          # seconds before a failed index load is retried
+
+    # Per-user libraries in memory for /api/books/sort, /letter and /page-range
+    LIBRARY_CACHE_ENABLED = True
+    LIBRARY_CACHE_MB = 256          # estimated size budget; least recently used evicted first
+
+    # Per-user trigram title indexes for /api/books/search and /api/books/sort
+    TITLE_INDEX_MB = 256            # estimated size budget; least recently used evicted first
+
+    # Batch write endpoints (/api/mark-as-read/batch, /api/star/batch, /api/follow/batch)
+    WRITE_BATCH_MAX = 1000          # ids accepted per request, applied in one transaction
+
+    # HasRead event log feeding the derived tables (event_log.py)
+    EVENT_LOG_WORKER = True         # apply the log on a background thread in this process
+    EVENT_LOG_BATCH_SIZE = 500      # events per aggregate transaction
+    EVENT_LOG_POLL_MS = 200         # idle wait between passes; writes wake the worker early
+    EVENT_LOG_GAP_TIMEOUT = 10      # seconds an id gap may wait for an in-flight write
+    EVENT_LOG_GAP_RETENTION = 3600  # seconds a skipped id is re-checked before it counts as rolled back
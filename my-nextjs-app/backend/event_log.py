@@ -0,0 +1,441 @@
+import threading
+import time
+from collections import namedtuple
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ReadEvents (
+        event_id BIGINT NOT NULL AUTO_INCREMENT,
+        kind VARCHAR(16) NOT NULL,
+        user_id INT NOT NULL,
+        book_id INT DEFAULT NULL,
+        hasread_id INT DEFAULT NULL,
+        read_date DATE DEFAULT NULL,
+        created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        PRIMARY KEY (event_id),
+        KEY idx_hasread (hasread_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS EventCheckpoints (
+        consumer VARCHAR(64) NOT NULL,
+        last_event_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        PRIMARY KEY (consumer)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS EventGaps (
+        consumer VARCHAR(64) NOT NULL,
+        event_id BIGINT NOT NULL,
+        skipped_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        PRIMARY KEY (consumer, event_id)
+    )
+    """,
+]
+
+# Event kinds; hasread_id and read_date are the HasRead row's, for READ and UNREAD
+READ = 'read'                   # a HasRead row was inserted
+UNREAD = 'unread'               # a HasRead row was deleted
+FOLLOWS = 'follows'             # user_id followed or unfollowed someone
+
+# `present` is false once the event's HasRead row has been deleted again
+Event = namedtuple('Event', 'event_id kind user_id book_id hasread_id read_date present age')
+
+_COLUMNS = """
+    SELECT e.event_id, e.kind, e.user_id, e.book_id, e.hasread_id, e.read_date,
+           h.hasread_id IS NOT NULL AS present,
+           TIMESTAMPDIFF(MICROSECOND, e.created_at, NOW(6)) / 1000000 AS age
+"""
+
+_PENDING = _COLUMNS + """
+    FROM ReadEvents e
+    LEFT JOIN HasRead h ON h.hasread_id = e.hasread_id
+    WHERE e.event_id > %s
+    ORDER BY e.event_id
+    LIMIT %s
+"""
+
+_READ_APPLIED = """
+    NOT EXISTS (
+        SELECT 1 FROM ReadEvents e
+        LEFT JOIN EventGaps g ON g.consumer = %s AND g.event_id = e.event_id
+        WHERE e.hasread_id = {row}.hasread_id AND e.kind = 'read'
+          AND (e.event_id > %s OR g.event_id IS NOT NULL)
+    )
+"""
+
+# Condition on a HasRead row `hr`, with (consumer, event_id) params: true once
+# the consumer has applied the row's READ event at `event_id`, or if the row
+# predates the log. Recomputing part of an aggregate from these rows leaves
+# every READ event the consumer has yet to apply still to be counted.
+COUNTED_READ = _READ_APPLIED.format(row='hr')
+
+# HasRead-shaped rows (hasread_id, user_id, book_id, date) the consumer counts
+# at `event_id`, with (consumer, event_id) params three times over: the
+# COUNTED_READ rows, plus deleted ones whose UNREAD it has yet to apply. A
+# counting aggregate rebuilt from these still takes every pending READ and
+# UNREAD exactly once.
+COUNTED_READS = f"""
+    SELECT hr.hasread_id, hr.user_id, hr.book_id, hr.date
+    FROM HasRead hr
+    WHERE {COUNTED_READ}
+    UNION ALL
+    SELECT u.hasread_id, u.user_id, u.book_id, u.read_date
+    FROM ReadEvents u
+    LEFT JOIN EventGaps ug ON ug.consumer = %s AND ug.event_id = u.event_id
+    WHERE u.kind = 'unread' AND (u.event_id > %s OR ug.event_id IS NOT NULL)
+      AND {_READ_APPLIED.format(row='u')}
+"""
+
+# Skipped ids whose write has committed since
+_LATE = _COLUMNS + """
+    FROM EventGaps g
+    JOIN ReadEvents e ON e.event_id = g.event_id
+    LEFT JOIN HasRead h ON h.hasread_id = e.hasread_id
+    WHERE g.consumer = %s
+    ORDER BY e.event_id
+"""
+
+
+def _event(row):
+    return Event(*row[:6], bool(row[6]), float(row[7]))
+
+
+def append(db, kind, rows, read_date=None):
+    """Log (user_id, book_id, hasread_id) rows inside the caller's transaction"""
+    if not rows:
+        return
+    cursor = db.cursor()
+    # executemany sends this as one multi-row INSERT
+    cursor.executemany(
+        "INSERT INTO ReadEvents (kind, user_id, book_id, hasread_id, read_date) VALUES (%s, %s, %s, %s, %s)",
+        [(kind, user_id, book_id, hasread_id, read_date) for user_id, book_id, hasread_id in rows]
+    )
+    cursor.close()
+
+
+def append_removed(db, condition, params):
+    """Log an UNREAD event for every HasRead row `h` matching `condition`.
+
+    Call in the deleting transaction, before the rows go. Aggregates take the
+    reads back from these events, so a delete never waits for the worker.
+    """
+    cursor = db.cursor()
+    cursor.execute(f"""
+        INSERT INTO ReadEvents (kind, user_id, book_id, hasread_id, read_date)
+        SELECT %s, h.user_id, h.book_id, h.hasread_id, h.date
+        FROM HasRead h
+        WHERE {condition}
+        ORDER BY h.hasread_id
+    """, (UNREAD, *params))
+    cursor.close()
+
+
+class Aggregate:
+    """A derived view fed from the log.
+
+    `apply(db, events)` receives each batch in event order and runs in the same
+    transaction that advances this aggregate's checkpoint, so every event is
+    applied exactly once. `reset(db)` empties the view before a replay from
+    zero; views that recompute from HasRead on every batch can leave it out.
+    `seed(db, reads)` runs when the checkpoint is first created, for state the
+    view needs beyond what was kept before the log; `reads` is COUNTED_READS
+    with its params.
+    """
+
+    def __init__(self, name, apply, reset=None, seed=None):
+        self.name = name
+        self.apply = apply
+        self.reset = reset
+        self.seed = seed
+
+
+class EventLog:
+    """Write-behind log of HasRead and Follows changes with per-aggregate checkpoints.
+
+    Write endpoints append() to ReadEvents in their own transaction and return;
+    a background thread applies new events to every registered aggregate, one
+    transaction per aggregate and batch. Checkpoints are claimed with SKIP
+    LOCKED, so several processes can run workers side by side.
+
+    Event ids are allocated at insert but become visible at commit, so an id
+    gap may be a write still in flight. Consumers stop at a gap until the event
+    after it is `gap_timeout` seconds old, then move past it and note the
+    missing ids in EventGaps. Every pass applies the noted ids that have shown
+    up since, ahead of the new batch; ids still missing after `gap_retention`
+    seconds are taken to be rolled-back writes and forgotten.
+    """
+
+    def __init__(self, batch_size=500, poll_interval=0.2, gap_timeout=10, gap_retention=3600,
+                 on_applied=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.gap_retention = gap_retention
+        # Called as on_applied(events) after the worker commits a batch, e.g. to drop cached responses
+        self.on_applied = on_applied
+        self._aggregates = {}
+        self._lag = {}
+        self._applied = {}
+        self._errors = {}
+        self._gaps_skipped = 0
+        self._gaps_recovered = 0
+        self._head = 0
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def register(self, aggregate):
+        """Add an aggregate, replacing any existing one with the same name"""
+        self._aggregates[aggregate.name] = aggregate
+
+    def names(self):
+        return list(self._aggregates)
+
+    def start(self, pool, wrap=None):
+        """Run the consumer thread with connections from `pool`, once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(pool, wrap),
+                                            name='event-log-worker', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the worker after a commit that appended events"""
+        self._wake.set()
+
+    def ensure_checkpoints(self, db):
+        """Start aggregates with no checkpoint at the head of the log; they were
+        kept current synchronously before the log existed"""
+        cursor = db.cursor()
+        for name, aggregate in self._aggregates.items():
+            cursor.execute("""
+                INSERT IGNORE INTO EventCheckpoints (consumer, last_event_id)
+                SELECT %s, COALESCE(MAX(event_id), 0) FROM ReadEvents
+            """, (name,))
+            if cursor.rowcount and aggregate.seed:
+                cursor.execute("SELECT last_event_id FROM EventCheckpoints WHERE consumer = %s", (name,))
+                aggregate.seed(db, (COUNTED_READS, (name, cursor.fetchone()[0]) * 3))
+        cursor.close()
+
+    def catch_up(self, db):
+        """Apply every pending event to every aggregate in the caller's transaction;
+        the checkpoint locks are held until the caller commits"""
+        for aggregate in self._aggregates.values():
+            while len(self._consume(db, aggregate, wait=True) or ()) >= self.batch_size:
+                pass
+
+    def counted(self, db, name):
+        """COUNTED_READ and its params as of `name`'s checkpoint, which stays
+        locked until the caller commits, for rebuilding a per-user aggregate by hand"""
+        return COUNTED_READ, (name, self._hold(db, name))
+
+    def counted_reads(self, db, name):
+        """COUNTED_READS and its params, likewise, for rebuilding a counting aggregate"""
+        return COUNTED_READS, (name, self._hold(db, name)) * 3
+
+    def _hold(self, db, name):
+        self.ensure_checkpoints(db)
+        cursor = db.cursor()
+        cursor.execute("SELECT last_event_id FROM EventCheckpoints WHERE consumer = %s FOR UPDATE", (name,))
+        checkpoint = cursor.fetchone()[0]
+        cursor.close()
+        return checkpoint
+
+    def replay(self, db, name):
+        """Reset one aggregate and rewind its checkpoint to the start of the log"""
+        aggregate = self._aggregates[name]
+        cursor = db.cursor()
+        cursor.execute("SELECT last_event_id FROM EventCheckpoints WHERE consumer = %s FOR UPDATE", (name,))
+        cursor.fetchall()
+        if aggregate.reset:
+            aggregate.reset(db)
+        cursor.execute("DELETE FROM EventGaps WHERE consumer = %s", (name,))
+        cursor.execute("""
+            INSERT INTO EventCheckpoints (consumer, last_event_id) VALUES (%s, 0)
+            ON DUPLICATE KEY UPDATE last_event_id = 0, updated_at = NOW(6)
+        """, (name,))
+        cursor.close()
+        self.notify()
+
+    def backfill(self, db):
+        """Log a READ event for every HasRead row that predates the log.
+
+        Pending events are applied first and every checkpoint then moves past
+        the backfilled ones, whose reads the aggregates already count. After
+        this a replay from zero rebuilds an aggregate from the log alone.
+        """
+        self.ensure_checkpoints(db)
+        self.catch_up(db)
+        cursor = db.cursor()
+        cursor.execute("""
+            INSERT INTO ReadEvents (kind, user_id, book_id, hasread_id, read_date, created_at)
+            SELECT %s, h.user_id, h.book_id, h.hasread_id, h.date, h.date
+            FROM HasRead h
+            LEFT JOIN ReadEvents e ON e.hasread_id = h.hasread_id
+            WHERE e.event_id IS NULL
+            ORDER BY h.hasread_id
+        """, (READ,))
+        added = cursor.rowcount
+        cursor.execute("""
+            UPDATE EventCheckpoints
+            SET last_event_id = (SELECT COALESCE(MAX(event_id), 0) FROM ReadEvents), updated_at = NOW(6)
+        """)
+        cursor.close()
+        return added
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "head": self._head,
+                "gaps_skipped": self._gaps_skipped,
+                "gaps_recovered": self._gaps_recovered,
+                "aggregates": {
+                    name: {
+                        "applied": self._applied.get(name, 0),
+                        "errors": self._errors.get(name, 0),
+                        **self._lag.get(name, {}),
+                    }
+                    for name in self._aggregates
+                },
+            }
+
+    def gauges(self):
+        """(name, help, value) per aggregate for QueryMetrics.render_prometheus"""
+        found = []
+        for name, entry in self.stats()["aggregates"].items():
+            if 'pending_events' in entry:
+                found.append((f'bookapp_event_log_{name}_pending_events',
+                              f'Events not yet applied to {name}', entry['pending_events']))
+                found.append((f'bookapp_event_log_{name}_lag_seconds',
+                              f'Age of the oldest event not yet applied to {name}', entry['lag_seconds']))
+        return found
+
+    def _consume(self, db, aggregate, wait=False):
+        """Apply the next batch to one aggregate, preceded by any skipped events that
+        have since committed; returns the events applied, or None if another
+        worker holds its checkpoint. The caller commits."""
+        cursor = db.cursor()
+        cursor.execute(
+            "SELECT last_event_id FROM EventCheckpoints WHERE consumer = %s FOR UPDATE"
+            + ("" if wait else " SKIP LOCKED"), (aggregate.name,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.close()
+            return None
+        checkpoint = row[0]
+
+        # Read in the same snapshot as the batch below, so a late event is
+        # applied before any later event that could only follow its commit
+        cursor.execute(_LATE, (aggregate.name,))
+        late = [_event(row) for row in cursor.fetchall()]
+        if late:
+            cursor.executemany("DELETE FROM EventGaps WHERE consumer = %s AND event_id = %s",
+                               [(aggregate.name, event.event_id) for event in late])
+
+        cursor.execute(_PENDING, (checkpoint, self.batch_size))
+        events = []
+        skipped = []
+        for row in cursor.fetchall():
+            event = _event(row)
+            if event.event_id != checkpoint + 1:
+                if event.age < self.gap_timeout:
+                    break
+                # A write older than the retention window cannot still be in flight
+                if event.age < self.gap_retention:
+                    skipped.extend(range(checkpoint + 1, event.event_id))
+            events.append(event)
+            checkpoint = event.event_id
+
+        if skipped:
+            cursor.executemany("INSERT IGNORE INTO EventGaps (consumer, event_id) VALUES (%s, %s)",
+                               [(aggregate.name, event_id) for event_id in skipped])
+        cursor.execute("""
+            DELETE FROM EventGaps
+            WHERE consumer = %s AND skipped_at < NOW(6) - INTERVAL %s SECOND
+        """, (aggregate.name, self.gap_retention))
+
+        applied = late + events
+        if applied:
+            aggregate.apply(db, applied)
+        if events:
+            cursor.execute("""
+                UPDATE EventCheckpoints SET last_event_id = %s, updated_at = NOW(6)
+                WHERE consumer = %s
+            """, (checkpoint, aggregate.name))
+        cursor.close()
+        with self._lock:
+            self._applied[aggregate.name] = self._applied.get(aggregate.name, 0) + len(applied)
+            self._gaps_skipped += len(skipped)
+            self._gaps_recovered += len(late)
+        return applied
+
+    def measure(self, db):
+        """Record and return how far each aggregate trails the head of the log"""
+        cursor = db.cursor()
+        cursor.execute("SELECT COALESCE(MAX(event_id), 0) FROM ReadEvents")
+        head = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT c.consumer, c.last_event_id,
+                   (SELECT TIMESTAMPDIFF(MICROSECOND, e.created_at, NOW(6)) / 1000000
+                    FROM ReadEvents e WHERE e.event_id > c.last_event_id
+                    ORDER BY e.event_id LIMIT 1) AS lag,
+                   (SELECT COUNT(*) FROM EventGaps g WHERE g.consumer = c.consumer) AS gaps
+            FROM EventCheckpoints c
+        """)
+        lag = {name: {"checkpoint": checkpoint, "pending_events": head - checkpoint,
+                      "lag_seconds": float(seconds or 0), "awaiting_gaps": gaps}
+               for name, checkpoint, seconds, gaps in cursor.fetchall()}
+        cursor.close()
+        db.commit()
+        with self._lock:
+            self._head = head
+            self._lag = lag
+        return lag
+
+    def _run(self, pool, wrap):
+        ready = False
+        while True:
+            busy = False
+            try:
+                conn = pool.acquire()
+            except Exception as err:
+                print(f"❌ Event log worker has no connection: {err}")
+                time.sleep(1)
+                continue
+            db = wrap(conn) if wrap else conn
+            try:
+                if not ready:
+                    self.ensure_checkpoints(db)
+                    db.commit()
+                    ready = True
+                for aggregate in list(self._aggregates.values()):
+                    try:
+                        applied = self._consume(db, aggregate)
+                        db.commit()
+                    except Exception as err:
+                        db.rollback()
+                        with self._lock:
+                            self._errors[aggregate.name] = self._errors.get(aggregate.name, 0) + 1
+                        print(f"❌ Event log: {aggregate.name} failed: {err}")
+                        continue
+                    if applied:
+                        busy = busy or len(applied) >= self.batch_size
+                        if self.on_applied:
+                            self.on_applied(applied)
+                self.measure(db)
+            except Exception as err:
+                print(f"❌ Event log worker error: {err}")
+                time.sleep(1)
+            finally:
+                if wrap and hasattr(db, 'flush'):
+                    db.flush()
+                pool.release(conn)
+
+            # Keep draining while any aggregate is behind by a full batch
+            if not busy:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
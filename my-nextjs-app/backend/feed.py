@@ -0,0 +1,261 @@
+import random
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS FeedTimeline (
+        follower_id INT NOT NULL,
+        hasread_id INT NOT NULL,
+        actor_id INT NOT NULL,
+        PRIMARY KEY (follower_id, hasread_id),
+        KEY idx_follower_actor (follower_id, actor_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS FollowerCounts (
+        user_id INT NOT NULL,
+        followers INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id)
+    )
+    """,
+]
+
+_FEED_COLUMNS = """
+    SELECT
+        hr.hasread_id,
+        hr.user_id,
+        u.username,
+        u.name,
+        hr.book_id,
+        b.title as book_title,
+        b.cover_url,
+        hr.date,
+        hr.review,
+        b.page_length
+    FROM HasRead hr
+    INNER JOIN User u ON hr.user_id = u.user_id
+    INNER JOIN Book b ON hr.book_id = b.book_id
+"""
+
+_TRIM = """
+    DELETE FROM FeedTimeline
+    WHERE follower_id = %s AND hasread_id < (
+        SELECT hasread_id FROM (
+            SELECT hasread_id FROM FeedTimeline
+            WHERE follower_id = %s
+            ORDER BY hasread_id DESC
+            LIMIT 1 OFFSET %s
+        ) AS cutoff
+    )
+"""
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+class FeedStore:
+    """Fan-out-on-write timelines for /api/feed, with a pull path for popular users.
+
+    Each new HasRead row is pushed into the FeedTimeline of every follower of its
+    reader, unless the reader has more than `fanout_limit` followers; those reads
+    are pulled from HasRead when a follower loads the feed instead.
+    Timelines are trimmed to roughly `timeline_length` entries, checked on one in
+    `trim_every` pushes per follower so the trim cost is amortized.
+    """
+
+    def __init__(self, timeline_length=500, fanout_limit=1000, trim_every=20):
+        self.timeline_length = timeline_length
+        self.fanout_limit = fanout_limit
+        self.trim_every = trim_every
+
+    def on_read(self, db, user_id, hasread_id):
+        """Push a new HasRead row to its reader's followers"""
+        cursor = db.cursor()
+        if self._is_pulled(cursor, user_id):
+            cursor.close()
+            return
+
+        cursor.execute("SELECT follower_id FROM Follows WHERE followee_id = %s", (user_id,))
+        followers = [row[0] for row in cursor.fetchall()]
+        if followers:
+            cursor.executemany(
+                "INSERT IGNORE INTO FeedTimeline (follower_id, hasread_id, actor_id) VALUES (%s, %s, %s)",
+                [(follower_id, hasread_id, user_id) for follower_id in followers]
+            )
+            for follower_id in followers:
+                if random.randrange(self.trim_every) == 0:
+                    self._trim(cursor, follower_id)
+        cursor.close()
+
+    def on_follow(self, db, follower_id, followee_id):
+        """Count the new follower and backfill the followee's recent reads"""
+        cursor = db.cursor()
+        cursor.execute("""
+            INSERT INTO FollowerCounts (user_id, followers) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE followers = followers + 1
+        """, (followee_id,))
+        if not self._is_pulled(cursor, followee_id):
+            cursor.execute("""
+                INSERT IGNORE INTO FeedTimeline (follower_id, hasread_id, actor_id)
+                SELECT %s, hasread_id, user_id
+                FROM HasRead
+                WHERE user_id = %s
+                ORDER BY hasread_id DESC
+                LIMIT %s
+            """, (follower_id, followee_id, self.timeline_length))
+            self._trim(cursor, follower_id)
+        cursor.close()
+
+    def on_unfollow(self, db, follower_id, followee_id):
+        cursor = db.cursor()
+        cursor.execute("""
+            UPDATE FollowerCounts SET followers = GREATEST(followers - 1, 0) WHERE user_id = %s
+        """, (followee_id,))
+        cursor.execute("DELETE FROM FeedTimeline WHERE follower_id = %s AND actor_id = %s",
+                       (follower_id, followee_id))
+        cursor.close()
+
+    def forget_reads(self, db, reads):
+        """Drop deleted (actor_id, hasread_id) reads from their followers' timelines"""
+        cursor = db.cursor()
+        for actor_id, hasread_id in reads:
+            if self._is_pulled(cursor, actor_id):
+                continue
+            cursor.execute("""
+                DELETE t FROM Follows f
+                JOIN FeedTimeline t ON t.follower_id = f.follower_id AND t.hasread_id = %s
+                WHERE f.followee_id = %s
+            """, (hasread_id, actor_id))
+        cursor.close()
+
+    def forget_user(self, db, user_id):
+        cursor = db.cursor()
+        cursor.execute("DELETE FROM FeedTimeline WHERE follower_id = %s", (user_id,))
+        cursor.execute("DELETE FROM FeedTimeline WHERE actor_id = %s", (user_id,))
+        cursor.execute("DELETE FROM FollowerCounts WHERE user_id = %s", (user_id,))
+        cursor.close()
+
+    def page(self, db, user_id, before=None, limit=30):
+        """Reads by followed users, newest first, strictly older than hasread_id `before`.
+
+        Returns (items, next_before); pass next_before back to fetch the next page.
+        """
+        cursor = db.cursor()
+        before_clause = "AND {column} < %s" if before else ""
+        before_params = (before,) if before else ()
+
+        # Joining HasRead skips entries for reads deleted since they were pushed
+        cursor.execute(f"""
+            SELECT t.hasread_id FROM FeedTimeline t
+            JOIN HasRead hr ON hr.hasread_id = t.hasread_id
+            WHERE t.follower_id = %s {before_clause.format(column='t.hasread_id')}
+            ORDER BY t.hasread_id DESC
+            LIMIT %s
+        """, (user_id, *before_params, limit))
+        ids = {row[0] for row in cursor.fetchall()}
+
+        pulled = self._pulled_followees(cursor, user_id)
+        if pulled:
+            cursor.execute(f"""
+                SELECT hasread_id FROM HasRead
+                WHERE user_id IN ({_placeholders(pulled)}) {before_clause.format(column='hasread_id')}
+                ORDER BY hasread_id DESC
+                LIMIT %s
+            """, (*pulled, *before_params, limit))
+            ids.update(row[0] for row in cursor.fetchall())
+        cursor.close()
+
+        page_ids = sorted(ids, reverse=True)[:limit]
+        items = self._hydrate(db, page_ids)
+        items.sort(key=lambda item: item['hasread_id'], reverse=True)
+        next_before = page_ids[-1] if len(page_ids) == limit else None
+        return items, next_before
+
+    def latest_per_followee(self, db, user_id, limit=50):
+        """The most recent read of each followed user"""
+        cursor = db.cursor()
+        cursor.execute("""
+            SELECT t.actor_id, MAX(t.hasread_id) FROM FeedTimeline t
+            JOIN HasRead hr ON hr.hasread_id = t.hasread_id
+            WHERE t.follower_id = %s
+            GROUP BY t.actor_id
+        """, (user_id,))
+        latest = dict(cursor.fetchall())
+
+        # Trimming drops an actor's reads oldest first, so one still in the
+        # timeline has its latest read there. Followees trimmed out entirely,
+        # and pulled ones, are looked up in HasRead.
+        cursor.execute("SELECT followee_id FROM Follows WHERE follower_id = %s", (user_id,))
+        missing = [row[0] for row in cursor.fetchall() if row[0] not in latest]
+        direct = list(dict.fromkeys(missing + self._pulled_followees(cursor, user_id)))
+        if direct:
+            cursor.execute(f"""
+                SELECT user_id, MAX(hasread_id) FROM HasRead
+                WHERE user_id IN ({_placeholders(direct)})
+                GROUP BY user_id
+            """, tuple(direct))
+            for actor_id, hasread_id in cursor.fetchall():
+                latest[actor_id] = max(hasread_id, latest.get(actor_id, 0))
+        cursor.close()
+
+        items = self._hydrate(db, list(latest.values()))
+        items.sort(key=lambda item: (item['date'], item['hasread_id']), reverse=True)
+        return items[:limit]
+
+    def rebuild(self, db):
+        """Recompute follower counts and every timeline from Follows and HasRead"""
+        cursor = db.cursor()
+        cursor.execute("DELETE FROM FollowerCounts")
+        cursor.execute("""
+            INSERT INTO FollowerCounts (user_id, followers)
+            SELECT followee_id, COUNT(*) FROM Follows GROUP BY followee_id
+        """)
+        cursor.execute("DELETE FROM FeedTimeline")
+        cursor.execute("""
+            INSERT INTO FeedTimeline (follower_id, hasread_id, actor_id)
+            SELECT follower_id, hasread_id, actor_id
+            FROM (
+                SELECT
+                    f.follower_id,
+                    hr.hasread_id,
+                    hr.user_id AS actor_id,
+                    ROW_NUMBER() OVER (PARTITION BY f.follower_id ORDER BY hr.hasread_id DESC) AS rn
+                FROM Follows f
+                JOIN HasRead hr ON hr.user_id = f.followee_id
+                JOIN FollowerCounts c ON c.user_id = f.followee_id
+                WHERE c.followers <= %s
+            ) ranked
+            WHERE rn <= %s
+        """, (self.fanout_limit, self.timeline_length))
+        cursor.execute("SELECT COUNT(*) FROM FeedTimeline")
+        entries = cursor.fetchone()[0]
+        cursor.close()
+        return entries
+
+    def _is_pulled(self, cursor, user_id):
+        """True when a user has too many followers to fan out to"""
+        cursor.execute("SELECT followers FROM FollowerCounts WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        return bool(row) and row[0] > self.fanout_limit
+
+    def _pulled_followees(self, cursor, user_id):
+        cursor.execute("""
+            SELECT f.followee_id
+            FROM Follows f
+            JOIN FollowerCounts c ON c.user_id = f.followee_id
+            WHERE f.follower_id = %s AND c.followers > %s
+        """, (user_id, self.fanout_limit))
+        return [row[0] for row in cursor.fetchall()]
+
+    def _trim(self, cursor, follower_id):
+        cursor.execute(_TRIM, (follower_id, follower_id, self.timeline_length - 1))
+
+    def _hydrate(self, db, hasread_ids):
+        if not hasread_ids:
+            return []
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(_FEED_COLUMNS + f"WHERE hr.hasread_id IN ({_placeholders(hasread_ids)})",
+                       tuple(hasread_ids))
+        items = cursor.fetchall()
+        cursor.close()
+        return items
@@ -0,0 +1,271 @@
+import bisect
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+import pagination
+from search_index import normalize
+
+# Sorts after any character a title can contain, so [key, key + _PREFIX_END) is a prefix range
+_PREFIX_END = '\U0010ffff'
+
+# Stand-in for a NULL page_length; BETWEEN never matches NULL, so these sort out of every range
+_NO_PAGES = -(1 << 31)
+
+# List slots, array items and the page index entry, per book
+_ROW_OVERHEAD = 6 * 8 + 4 + 4 + 8 + 4
+
+
+def _page_key(page_length, book_id):
+    """(page_length, book_id) packed into one int64 so the page index is a flat array"""
+    return (page_length << 32) | book_id
+
+
+class _Library:
+    """One user's books as parallel columns in (normalized title, book_id) order,
+    plus a secondary (page_length, book_id) index of positions into them."""
+
+    __slots__ = ('book_ids', 'titles', 'keys', 'issues', 'pages', 'covers', 'authors',
+                 'page_keys', 'page_rows', 'size')
+
+    def __init__(self, rows):
+        rows = sorted(((normalize(r['title']), r['book_id'], r) for r in rows),
+                      key=lambda item: item[:2])
+        self.book_ids = array('i', (book_id for _, book_id, _ in rows))
+        self.keys = [key for key, _, _ in rows]
+        self.titles = [r['title'] for _, _, r in rows]
+        self.issues = [r['issue'] for _, _, r in rows]
+        self.pages = array('i', (_NO_PAGES if r['page_length'] is None else r['page_length']
+                                 for _, _, r in rows))
+        self.covers = [r['cover_url'] for _, _, r in rows]
+        self.authors = [r['authors'] for _, _, r in rows]
+
+        by_pages = sorted((_page_key(pages, book_id), pos)
+                          for pos, (pages, book_id) in enumerate(zip(self.pages, self.book_ids)))
+        self.page_keys = array('q', (key for key, _ in by_pages))
+        self.page_rows = array('i', (pos for _, pos in by_pages))
+
+        size = len(rows) * _ROW_OVERHEAD
+        for key, title, issue, cover, authors in zip(self.keys, self.titles, self.issues,
+                                                     self.covers, self.authors):
+            size += sys.getsizeof(title) + (sys.getsizeof(key) if key != title else 0)
+            size += sum(sys.getsizeof(v) for v in (issue, cover, authors) if v is not None)
+        self.size = size
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def row(self, pos):
+        """Book `pos` shaped like a BookListings row"""
+        return {
+            "book_id": self.book_ids[pos],
+            "title": self.titles[pos],
+            "issue": self.issues[pos],
+            "page_length": None if self.pages[pos] == _NO_PAGES else self.pages[pos],
+            "cover_url": self.covers[pos],
+            "authors": self.authors[pos],
+        }
+
+    def title_range(self, prefix):
+        """Positions [lo, hi) whose normalized title starts with `prefix`"""
+        key = normalize(prefix)
+        return (bisect.bisect_left(self.keys, key),
+                bisect.bisect_left(self.keys, key + _PREFIX_END))
+
+    def after_title(self, lo, title, book_id):
+        """First position at or past `lo` that sorts after (title, book_id)"""
+        key = normalize(title)
+        pos = max(lo, bisect.bisect_left(self.keys, key))
+        while pos < len(self.keys) and self.keys[pos] == key and self.book_ids[pos] <= book_id:
+            pos += 1
+        return pos
+
+    def page_range(self, min_pages, max_pages, after=None):
+        """Slice [lo, hi) of the page index for min <= page_length <= max, past `after`"""
+        lo = bisect.bisect_left(self.page_keys, _page_key(min_pages, 0))
+        hi = bisect.bisect_left(self.page_keys, _page_key(max_pages + 1, 0))
+        if after is not None:
+            lo = max(lo, bisect.bisect_right(self.page_keys, _page_key(*after)))
+        return lo, hi
+
+
+def _cursor_values(after, cast):
+    """Keyset cursor values as (sort value, book id), rejecting ones we could not have issued"""
+    try:
+        return cast(after[0]), int(after[1])
+    except (TypeError, ValueError):
+        raise pagination.InvalidCursor("Cursor does not match this endpoint")
+
+
+def _stop(lo, hi, limit):
+    """End of a page starting at `lo` in the range [lo, hi)"""
+    return hi if limit is None else min(hi, lo + limit)
+
+
+class LibraryCache:
+    """Per-user book libraries in memory for the sort, letter and page-range listings.
+
+    Each library is read from BookListings on first use and answers title
+    prefix, first letter and page range queries with bisect, in either order,
+    with the same keyset cursors as the SQL paths. Libraries are evicted least
+    recently used first once their estimated size passes `max_bytes`, and a
+    user's library is dropped by any write to their books and reloaded on the
+    next read.
+    """
+
+    LOAD_QUERY = """
+        SELECT book_id, title, issue, page_length, cover_url, authors
+        FROM BookListings
+        WHERE user_id = %s
+    """
+
+    # The letter listing is addressed by username; the User row gives the id to cache under
+    LOAD_BY_USERNAME_QUERY = """
+        SELECT u.user_id, l.book_id, l.title, l.issue, l.page_length, l.cover_url, l.authors
+        FROM User u
+        LEFT JOIN BookListings l ON l.user_id = u.user_id
+        WHERE u.username = %s
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._libraries = OrderedDict()
+        self._user_ids = {}
+        self._versions = {}
+        self._writes = 0
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def by_title(self, cursor, user_id, prefix='', descending=False):
+        """Rows whose title starts with `prefix`, ordered by title"""
+        library = self._library(cursor, user_id)
+        lo, hi = library.title_range(prefix)
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        return [library.row(pos) for pos in positions]
+
+    def by_letter(self, cursor, username, letter, after=None, limit=100):
+        """Up to `limit` (None for all) rows whose title starts with `letter`, in title order past `after`"""
+        library = self._library_for_username(cursor, username)
+        if library is None:
+            return []
+        lo, hi = library.title_range(letter)
+        if after is not None:
+            lo = library.after_title(lo, *_cursor_values(after, str))
+        return [library.row(pos) for pos in range(lo, _stop(lo, hi, limit))]
+
+    def by_page_range(self, cursor, user_id, min_pages, max_pages, after=None, limit=100):
+        """Up to `limit` (None for all) rows with min <= page_length <= max, in (page_length, book_id) order"""
+        if min_pages is None or max_pages is None:
+            return []
+        library = self._library(cursor, user_id)
+        if after is not None:
+            after = _cursor_values(after, int)
+        lo, hi = library.page_range(min_pages, max_pages, after)
+        return [library.row(library.page_rows[i]) for i in range(lo, _stop(lo, hi, limit))]
+
+    def invalidate(self, user_id):
+        """Drop a user's library after a write to their books"""
+        with self._lock:
+            uid = int(user_id)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            self._writes += 1
+            self._evict(uid)
+
+    def drop_user(self, user_id):
+        """Forget a deleted user, including their username"""
+        with self._lock:
+            self.invalidate(user_id)
+            uid = int(user_id)
+            for username in [name for name, known in self._user_ids.items() if known == uid]:
+                del self._user_ids[username]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "users_loaded": len(self._libraries),
+                "books": sum(len(lib) for lib in self._libraries.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            }
+
+    def _lookup(self, uid):
+        """Loaded library for `uid`, counted as a hit or miss; call with the lock held"""
+        library = self._libraries.get(uid)
+        if library is not None:
+            self._libraries.move_to_end(uid)
+            self._hits += 1
+        else:
+            self._misses += 1
+        return library
+
+    def _library(self, cursor, user_id):
+        uid = int(user_id)
+        with self._lock:
+            library = self._lookup(uid)
+            if library is not None:
+                return library
+        return self._load(cursor, uid)
+
+    def _load(self, cursor, uid):
+        with self._lock:
+            version = self._versions.get(uid, 0)
+
+        cursor.execute(self.LOAD_QUERY, (uid,))
+        library = _Library(cursor.fetchall())
+
+        with self._lock:
+            # Only cache the snapshot if no write raced with the load
+            if self._versions.get(uid, 0) == version:
+                self._store(uid, library)
+            return library
+
+    def _library_for_username(self, cursor, username):
+        """The user's library, or None if no such user"""
+        with self._lock:
+            uid = self._user_ids.get(username)
+            if uid is not None:
+                library = self._lookup(uid)
+                if library is not None:
+                    return library
+            writes = self._writes
+        if uid is not None:
+            return self._load(cursor, uid)
+
+        cursor.execute(self.LOAD_BY_USERNAME_QUERY, (username,))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        uid = rows[0]['user_id']
+        library = _Library(row for row in rows if row['book_id'] is not None)
+
+        with self._lock:
+            self._user_ids[username] = uid
+            # Any write during the load might have been to this user
+            if self._writes == writes and uid not in self._libraries:
+                self._store(uid, library)
+            return library
+
+    def _store(self, uid, library):
+        if library.size > self.max_bytes:
+            return
+        self._evict(uid)
+        self._libraries[uid] = library
+        self._bytes += library.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._libraries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._evictions += 1
+
+    def _evict(self, uid):
+        library = self._libraries.pop(uid, None)
+        if library is not None:
+            self._bytes -= library.size
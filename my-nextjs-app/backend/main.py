@@ -1,34 +1,269 @@
-from flask import Flask, jsonify, request, g, render_template
+from flask import Flask, jsonify, request, g, render_template, Response, stream_with_context, has_request_context
 from flask_cors import CORS
 import mysql.connector
 from mysql.connector import Error
 import click
+from flask.cli import with_appcontext
 import random
+import io
 from datetime import datetime
 from datetime import timedelta, datetime
+from pool import ConnectionPool
+import cache_epochs
+from search_index import TitleSearchIndex
+from starred_cache import StarredCache
+from library_cache import LibraryCache
+from user_search import UserSearchIndex, FolloweeCache
+import stats_summary
+import challenges
+import feed
+import rankings
+import admin_counters
+import read_rollups
+import suggestions
+import book_listings
+import event_log
+import migrate
+import pagination
+import streaming
+import bulk_import
+from name_cache import NameCache, TABLES as NAME_KINDS
+from query_metrics import QueryMetrics, InstrumentedConnection
+import response_cache
 
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
 app.config.from_object('config.Config')
 
+db_pool = ConnectionPool(
+    lambda: mysql.connector.connect(
+        host=app.config['DB_HOST'],
+        user=app.config['DB_USER'],
+        password=app.config['DB_PASSWORD'],
+        database=app.config['DB_DATABASE'],
+        port=app.config['DB_PORT']
+    ),
+    size=app.config['DB_POOL_SIZE'],
+    max_overflow=app.config['DB_POOL_MAX_OVERFLOW'],
+    recycle=app.config['DB_POOL_RECYCLE'],
+    pre_ping=app.config['DB_POOL_PRE_PING'],
+    timeout=app.config['DB_POOL_TIMEOUT']
+)
+
+title_index = TitleSearchIndex(max_bytes=app.config['TITLE_INDEX_MB'] * 1024 * 1024)
+query_stats = QueryMetrics(
+    slow_threshold=app.config['SLOW_QUERY_MS'] / 1000,
+    enabled=app.config['QUERY_METRICS_ENABLED']
+)
+responses = response_cache.ResponseCache(
+    response_cache.make_backend(app.config),
+    default_ttl=app.config['RESPONSE_CACHE_TTL'],
+    enabled=app.config['RESPONSE_CACHE_ENABLED']
+)
+starred_sets = StarredCache(max_users=app.config['STARRED_CACHE_USERS'])
+library_books = LibraryCache(max_bytes=app.config['LIBRARY_CACHE_MB'] * 1024 * 1024)
+user_index = UserSearchIndex(log=app.logger, retry_after=app.config['USER_SEARCH_RETRY'])
+followee_sets = FolloweeCache(max_users=app.config['FOLLOWEE_CACHE_USERS'])
+name_ids = NameCache(max_entries=app.config['NAME_CACHE_SIZE'])
+feed_store = feed.FeedStore(
+    timeline_length=app.config['FEED_TIMELINE_LENGTH'],
+    fanout_limit=app.config['FEED_FANOUT_LIMIT'],
+    trim_every=app.config['FEED_TRIM_EVERY']
+)
+events = event_log.EventLog(
+    batch_size=app.config['EVENT_LOG_BATCH_SIZE'],
+    poll_interval=app.config['EVENT_LOG_POLL_MS'] / 1000,
+    gap_timeout=app.config['EVENT_LOG_GAP_TIMEOUT'],
+    gap_retention=app.config['EVENT_LOG_GAP_RETENTION'],
+    # Summaries change when the worker applies a batch, not when the write returns
+    on_applied=lambda batch: responses.invalidate('reads', *{f'user:{e.user_id}' for e in batch})
+)
+
+
+def books_changed_elsewhere(user_id):
+    """Drop a user's book caches after another process (e.g. `flask import-books`) wrote to their books"""
+    title_index.drop_user(user_id)
+    library_books.invalidate(user_id)
+    responses.invalidate(f'user:{user_id}', 'books')
+
+def starred_changed_elsewhere(user_id):
+    starred_sets.drop_user(user_id)
+
+def follows_changed_elsewhere(follower_id):
+    followee_sets.drop_user(follower_id)
+    responses.invalidate(f'user:{follower_id}')
+
+def user_changed_elsewhere(user_id):
+    """Index a user another process registered, or forget one it deleted"""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT username, name FROM User WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row:
+        user_index.add_user(user_id, *row)
+    else:
+        title_index.drop_user(user_id)
+        library_books.drop_user(user_id)
+        starred_sets.drop_user(user_id)
+        user_index.remove_user(user_id)
+        followee_sets.drop_user(user_id)
+        followee_sets.forget_followee(user_id)
+    responses.invalidate(f'user:{user_id}', 'users')
+
+def names_changed_elsewhere(kind):
+    """Drop cached Author/Publisher ids after a migration merged or deleted rows"""
+    name_ids.clear(kind if kind in NAME_KINDS else None)
+
+# CacheEpochs name scope -> what to drop when another process advanced <scope>.<key>.
+# Every write to state these caches hold bumps the epoch in its transaction.
+EPOCH_SCOPES = {
+    'books': books_changed_elsewhere,
+    'starred': starred_changed_elsewhere,
+    'follows': follows_changed_elsewhere,
+    'users': user_changed_elsewhere,
+    'names': names_changed_elsewhere,
+}
+
+def cache_changed_elsewhere(name):
+    scope, _, key = name.partition('.')
+    if scope in EPOCH_SCOPES:
+        EPOCH_SCOPES[scope](key)
+
+cache_epoch_watcher = cache_epochs.EpochWatcher('', cache_changed_elsewhere,
+                                                interval=app.config['CACHE_EPOCH_INTERVAL'])
+
+
+def _per_reader(name, record, rebuild, reset):
+    """An aggregate of per-user summaries. Logged reads are folded in with
+    `record(db, event)`; a user who lost reads is recomputed with `rebuild`,
+    counting the reads applied up to that event, which also covers their
+    earlier events in the batch."""
+    def apply(db, batch):
+        removed = {e.user_id: e.event_id for e in batch if e.kind == event_log.UNREAD}
+        for e in batch:
+            if e.kind == event_log.READ and e.present and e.event_id > removed.get(e.user_id, 0):
+                record(db, e)
+            elif e.event_id == removed.get(e.user_id):
+                rebuild(db, e.user_id, only=(event_log.COUNTED_READ, (name, e.event_id)))
+    return event_log.Aggregate(name, apply, reset=reset)
+
+
+def _counted_reads(record):
+    """Apply `record(db, reads)` to a batch's reads as (book_id, date, delta).
+
+    READ counts +1 whether or not its HasRead row still exists, and the UNREAD
+    logged when the row was deleted counts -1, so the totals come out right
+    however far the worker trails the deletes.
+    """
+    def apply(db, batch):
+        reads = [(e.book_id, e.read_date, 1 if e.kind == event_log.READ else -1) for e in batch
+                 if e.kind in (event_log.READ, event_log.UNREAD) and e.read_date is not None]
+        if reads:
+            record(db, reads)
+    return apply
+
+
+def _feed_apply(db, batch):
+    """Push logged reads whose HasRead row still exists, and pull deleted ones back out"""
+    for e in batch:
+        if e.kind == event_log.READ and e.present:
+            feed_store.on_read(db, e.user_id, e.hasread_id)
+    removed = [(e.user_id, e.hasread_id) for e in batch if e.kind == event_log.UNREAD]
+    if removed:
+        feed_store.forget_reads(db, removed)
+
+
+# Derived views of HasRead, kept current by the event log worker
+events.register(_per_reader(
+    'reading_stats', lambda db, e: stats_summary.record_read(db, e.user_id, e.hasread_id),
+    stats_summary.rebuild_user, reset=stats_summary.clear))
+events.register(_per_reader(
+    'challenges', lambda db, e: challenges.record_read(db, e.hasread_id),
+    challenges.rebuild_user, reset=challenges.clear))
+events.register(event_log.Aggregate(
+    'rankings', _counted_reads(rankings.record_reads), reset=rankings.clear))
+events.register(event_log.Aggregate(
+    'read_rollups', _counted_reads(read_rollups.record_reads), reset=read_rollups.clear))
+events.register(event_log.Aggregate(
+    'admin_reads', _counted_reads(admin_counters.record_reads), reset=admin_counters.clear_reads,
+    seed=admin_counters.seed_read_counts))
+# FeedTimeline inserts are INSERT IGNORE, so a replay needs no reset
+events.register(event_log.Aggregate('feed', _feed_apply))
+# Recomputed from Follows, so a replay needs no reset either
+events.register(event_log.Aggregate('suggestions', lambda db, batch: suggestions.follows_changed(
+    db, dict.fromkeys(e.user_id for e in batch if e.kind == event_log.FOLLOWS),
+    app.config['SUGGESTIONS_TOP_K'], app.config['FEED_FANOUT_LIMIT'])))
+
+
+def page_args(key_size, unpaged_limit=None, source=None):
+    """(limit, cursor key) for a keyset-paginated list endpoint.
+
+    Without ?limit= or ?cursor= the limit is the endpoint's pre-pagination
+    one, `unpaged_limit` (None for every row); the current frontend sends
+    neither and never follows next_cursor.
+    """
+    return pagination.parse(request.args, key_size,
+                            default_limit=app.config['PAGE_SIZE_DEFAULT'],
+                            max_limit=app.config['PAGE_SIZE_MAX'],
+                            unpaged_limit=unpaged_limit, source=source)
+
+def batch_ids(values):
+    """Distinct integer ids from a batch request array, in first-seen order"""
+    if not isinstance(values, list) or len(values) > app.config['WRITE_BATCH_MAX']:
+        raise ValueError(f"Expected an array of at most {app.config['WRITE_BATCH_MAX']} ids")
+    return list(dict.fromkeys(int(value) for value in values))
+
+def stream_rows(fmt, cursor, transform=None, prefix='[', suffix=']'):
+    """Stream a query's rows as they are fetched instead of building a list for jsonify"""
+    rows = streaming.iter_rows(cursor, app.config['STREAM_BATCH_SIZE'])
+    if transform:
+        rows = map(transform, rows)
+    chunks, mimetype = streaming.body(fmt, rows, app.json.dumps, prefix, suffix)
+    return Response(stream_with_context(chunks), mimetype=mimetype)
+
+# Migrations not yet applied to the database; None until init_db has checked
+pending_migrations = None
+
 def get_db():
-    """Get database connection, reusing if exists in g"""
-    if 'db' not in g or not g.db.is_connected():
-        g.db = mysql.connector.connect(
-            host=app.config['DB_HOST'],
-            user=app.config['DB_USER'],
-            password=app.config['DB_PASSWORD'],
-            database=app.config['DB_DATABASE']
-        )
+    """Get a pooled database connection, reusing it if already checked out in g"""
+    if 'db' not in g:
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'cli'
+        g.db = query_stats.wrap(db_pool.acquire(), endpoint)
     return g.db
 
+@app.before_request
+def require_migrations():
+    """Refuse requests until `flask db-migrate` has run: the write paths rely on
+    keys the migrations add, e.g. HasRead's unique (user_id, book_id)"""
+    global pending_migrations
+    if pending_migrations != []:
+        pending_migrations = migrate.pending(get_db())
+        if pending_migrations:
+            return jsonify({"status": "error",
+                            "message": f"Pending schema migrations: {migrate.describe(pending_migrations)}; "
+                                       "run `flask db-migrate`"}), 503
+
+@app.before_request
+def check_cache_epochs():
+    """Pick up writes and migrations made by other processes"""
+    cache_epoch_watcher.check(get_db)
+
+@app.before_request
+def start_event_worker():
+    """Start applying the event log in this process once it serves requests"""
+    if app.config['EVENT_LOG_WORKER']:
+        events.start(db_pool, wrap=lambda conn: query_stats.wrap(conn, 'event_log'))
+
 @app.teardown_appcontext
 def close_db(error):
-    """Close database connection after each request"""
+    """Return the request's connection to the pool"""
     db = g.pop('db', None)
-    if db is not None and db.is_connected():
-        db.close()
+    if isinstance(db, InstrumentedConnection):
+        db.flush()
+        db = db.raw
+    if db is not None:
+        db_pool.release(db)
 
 def init_db():
     """Initialize database tables"""
@@ -42,10 +277,22 @@ def init_db():
                 email VARCHAR(100) NOT NULL UNIQUE
             )
         """)
-        
+
+        # Derived tables maintained alongside HasRead
+        for statement in (stats_summary.SCHEMA + challenges.SCHEMA + feed.SCHEMA +
+                          rankings.SCHEMA + cache_epochs.SCHEMA + admin_counters.SCHEMA +
+                          read_rollups.SCHEMA + suggestions.SCHEMA + book_listings.SCHEMA +
+                          event_log.SCHEMA):
+            cursor.execute(statement)
 
         db.commit()
         print("✅ Database tables initialized")
+
+        global pending_migrations
+        pending_migrations = migrate.pending(db)
+        if pending_migrations:
+            print(f"⚠️ Pending schema migrations: {migrate.describe(pending_migrations)}; "
+                  "run `flask db-migrate` before serving")
     except Error as err:
         print(f"❌ Database initialization error: {err}")
     finally:
@@ -84,12 +331,240 @@ def test_db_command():
 
 app.cli.add_command(test_db_command)
 
+@click.command('db-migrate')
+@with_appcontext
+@click.option('--target', type=int, default=None, help='Stop after this migration version')
+def db_migrate_command(target):
+    """Apply pending schema migrations from migrations/"""
+    db = get_db()
+    ran = migrate.migrate(db, target=target, log=click.echo)
+    if ran:
+        # Migrations may merge duplicate authors/publishers (0004); running
+        # servers drop their cached name ids on the next epoch check
+        cursor = db.cursor()
+        for kind in NAME_KINDS:
+            cache_epochs.bump(cursor, f'names.{kind}')
+        db.commit()
+        cursor.close()
+        name_ids.clear()
+    click.echo(f'Applied {len(ran)} migrations' if ran else 'Schema is up to date')
+
+app.cli.add_command(db_migrate_command)
+
+@click.command('db-migrations')
+@with_appcontext
+def db_migrations_command():
+    """List migrations and whether each has been applied"""
+    done = migrate.applied(get_db())
+    for version, name, _ in migrate.discover():
+        click.echo(f"{'applied' if version in done else 'pending'}  {version:04d}_{name}")
+
+app.cli.add_command(db_migrations_command)
+
+@click.command('rebuild-reading-stats')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_reading_stats_command(user_id):
+    """Backfill the per-user reading stats summary from HasRead"""
+    db = get_db()
+    # Reads the event log has yet to apply are left for the worker to add
+    only = events.counted(db, 'reading_stats')
+    if user_id is not None:
+        stats_summary.rebuild_user(db, user_id, only)
+        db.commit()
+        click.echo(f'Rebuilt reading stats for user {user_id}')
+    else:
+        users = stats_summary.rebuild_all(db, only)
+        db.commit()
+        click.echo(f'Rebuilt reading stats for {users} users')
+
+app.cli.add_command(rebuild_reading_stats_command)
+
+@click.command('rebuild-challenges')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_challenges_command(user_id):
+    """Backfill the reading challenge counters from HasRead"""
+    db = get_db()
+    only = events.counted(db, 'challenges')
+    if user_id is not None:
+        challenges.rebuild_user(db, user_id, only)
+        db.commit()
+        click.echo(f'Rebuilt challenge counters for user {user_id}')
+    else:
+        users = challenges.rebuild_all(db, only)
+        db.commit()
+        click.echo(f'Rebuilt challenge counters for {users} users')
+
+app.cli.add_command(rebuild_challenges_command)
+
+@click.command('rebuild-feeds')
+@with_appcontext
+def rebuild_feeds_command():
+    """Recompute follower counts and every feed timeline"""
+    db = get_db()
+    entries = feed_store.rebuild(db)
+    db.commit()
+    click.echo(f'Rebuilt feed timelines ({entries} entries)')
+
+app.cli.add_command(rebuild_feeds_command)
+
+@click.command('rebuild-rankings')
+@with_appcontext
+def rebuild_rankings_command():
+    """Recompute the per-year book read counts from HasRead"""
+    db = get_db()
+    # Reads and deletes the event log has yet to apply are left to the worker
+    rows = rankings.rebuild_all(db, events.counted_reads(db, 'rankings'))
+    db.commit()
+    click.echo(f'Rebuilt yearly rankings ({rows} book-years)')
+
+app.cli.add_command(rebuild_rankings_command)
+
+@click.command('rebuild-read-rollups')
+@with_appcontext
+def rebuild_read_rollups_command():
+    """Recompute the daily/weekly/monthly read counts from HasRead"""
+    db = get_db()
+    rows = read_rollups.rebuild_all(db, events.counted_reads(db, 'read_rollups'))
+    db.commit()
+    click.echo(f'Rebuilt read rollups ({rows} buckets)')
+
+app.cli.add_command(rebuild_read_rollups_command)
+
+@click.command('rebuild-suggestions')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_suggestions_command(user_id):
+    """Recompute the stored follow suggestions from Follows and UserAuthorReads"""
+    db = get_db()
+    top_k = app.config['SUGGESTIONS_TOP_K']
+    if user_id is not None:
+        count = suggestions.refresh_user(db, user_id, top_k)
+        db.commit()
+        click.echo(f'Stored {count} suggestions for user {user_id}')
+    else:
+        users = suggestions.rebuild_all(db, top_k,
+                                        progress=lambda done, total: click.echo(f'  {done:,}/{total:,} users'))
+        click.echo(f'Rebuilt follow suggestions for {users} users')
+
+app.cli.add_command(rebuild_suggestions_command)
+
+@click.command('rebuild-book-listings')
+@with_appcontext
+def rebuild_book_listings_command():
+    """Recompute the BookListings projection from Book, WrittenBy and Author"""
+    db = get_db()
+    rows = book_listings.rebuild_all(db)
+    db.commit()
+    click.echo(f'Rebuilt book listings ({rows} books)')
+
+app.cli.add_command(rebuild_book_listings_command)
+
+def books_imported(db, user_id, count):
+    """Derived-table upkeep for one bulk import batch, inside its transaction"""
+    admin_counters.books_added(db, user_id, count)
+    book_listings.books_added(db, user_id, count)
+    # Tells every serving process to drop its caches of this user's books
+    cursor = db.cursor()
+    cache_epochs.bump(cursor, f'books.{user_id}')
+    cursor.close()
+
+@click.command('event-log-status')
+@with_appcontext
+def event_log_status_command():
+    """Show how far each aggregate trails the HasRead event log"""
+    db = get_db()
+    events.ensure_checkpoints(db)
+    db.commit()
+    for name, lag in sorted(events.measure(db).items()):
+        click.echo(f"  {name:<16} checkpoint {lag['checkpoint']:>10}  "
+                   f"{lag['pending_events']:>8} pending  {lag['lag_seconds']:.1f}s behind  "
+                   f"{lag['awaiting_gaps']} skipped ids awaited")
+
+app.cli.add_command(event_log_status_command)
+
+@click.command('event-log-replay')
+@with_appcontext
+@click.argument('aggregate', type=click.Choice(events.names()))
+def event_log_replay_command(aggregate):
+    """Reset one aggregate and let the worker rebuild it from event zero"""
+    db = get_db()
+    events.replay(db, aggregate)
+    db.commit()
+    click.echo(f'{aggregate} rewound to event 0; a running server replays it '
+               '(run event-log-backfill first if reads predate the log)')
+
+app.cli.add_command(event_log_replay_command)
+
+@click.command('event-log-backfill')
+@with_appcontext
+def event_log_backfill_command():
+    """Log the HasRead rows that predate the event log, so replays cover all of them"""
+    db = get_db()
+    added = events.backfill(db)
+    db.commit()
+    click.echo(f'Backfilled {added} read events')
+
+app.cli.add_command(event_log_backfill_command)
+
+@click.command('import-books')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user-id', type=int, required=True, help='Owner of the imported books')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction')
+def import_books_command(path, user_id, batch_size):
+    """Bulk load a semicolon-separated books CSV (see scripts/script1.py)"""
+    importer = bulk_import.BulkImporter(get_db(), user_id,
+                                        batch_size or app.config['BULK_IMPORT_BATCH_SIZE'],
+                                        before_commit=books_imported)
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        report = importer.run(
+            bulk_import.read_rows(f),
+            progress=lambda r: click.echo(f"  {r['imported']:,} rows, {r['rows_per_sec']:,} rows/sec")
+        )
+    # Running servers drop their caches of these books through the epoch each batch bumped
+    click.echo(f"Imported {report['imported']:,} books ({report['skipped']:,} skipped) "
+               f"in {report['seconds']}s, {report['rows_per_sec']:,} rows/sec")
+
+app.cli.add_command(import_books_command)
+
+@click.command('reconcile-admin-counters')
+@with_appcontext
+@click.option('--fix', is_flag=True, help='Overwrite drifted counters with recounted values')
+def reconcile_admin_counters_command(fix):
+    """Recount the admin dashboard counters with full scans and report drift"""
+    db = get_db()
+    # Read counters are recounted as of what the event log has applied to them
+    drift = admin_counters.reconcile(db, fix=fix, reads=events.counted_reads(db, 'admin_reads'))
+    db.commit()
+    if not drift:
+        click.echo('Admin counters match')
+        return
+    for name, (stored, actual) in sorted(drift.items()):
+        click.echo(f'  {name}: stored {stored}, actual {actual}')
+    click.echo(f"{len(drift)} counters drifted{', fixed' if fix else ''}")
+    if not fix:
+        raise SystemExit(1)
+
+app.cli.add_command(reconcile_admin_counters_command)
+
 @app.route('/api/health')
 def health_check():
     return jsonify(
         status="healthy",
         message="Flask server is running",
-        database="MySQL"
+        database="MySQL",
+        pool=db_pool.stats(),
+        search_index=title_index.stats(),
+        name_cache=name_ids.stats(),
+        starred_cache=starred_sets.stats(),
+        library_cache=library_books.stats(),
+        event_log=events.stats(),
+        user_search=user_index.stats(),
+        followee_cache=followee_sets.stats(),
+        response_cache=responses.stats(),
+        query_metrics=query_stats.stats()
     )
 
 @app.route('/api/test_db')
@@ -256,7 +731,12 @@ def register():
     try:
         cursor.execute("INSERT INTO User (username, password, name, age) VALUES (%s, %s, %s, %s)",
                        (username, password, name, age))
+        user_id = cursor.lastrowid
+        admin_counters.user_added(db, user_id, username)
+        cache_epochs.bump(cursor, f'users.{user_id}')
         db.commit()
+        user_index.add_user(user_id, username, name)
+        responses.invalidate('users')
         return jsonify({'message': 'User registered successfully'}), 201
     except mysql.connector.IntegrityError:
         return jsonify({'error': 'Username already exists'}), 400
@@ -384,31 +864,9 @@ def log_book_from_ui():
 
         
 
-        # Step 1: Insert author if not exists
-        cursor.execute("""
-            INSERT INTO Author (name, date_of_birth)
-            SELECT %s, %s
-            WHERE NOT EXISTS (
-                SELECT 1 FROM Author WHERE name = %s
-            )
-        """, (author_name, author_dob or None, author_name))
-
-        # Step 2: Get author_id
-        cursor.execute("SELECT author_id FROM Author WHERE name = %s", (author_name,))
-        author_id = cursor.fetchone()[0]
-
-        # Step 3: Insert publisher if not exists
-        cursor.execute("""
-            INSERT INTO Publisher (name)
-            SELECT %s
-            WHERE NOT EXISTS (
-                SELECT 1 FROM Publisher WHERE name = %s
-            )
-        """, (publisher_name, publisher_name))
-
-        # Step 4: Get publisher_id
-        cursor.execute("SELECT publisher_id FROM Publisher WHERE name = %s", (publisher_name,))
-        publisher_id = cursor.fetchone()[0]
+        # Steps 1-4: Resolve author and publisher ids, inserting them if new
+        author_id = name_ids.resolve(cursor, 'author', author_name, {'date_of_birth': author_dob or None})
+        publisher_id = name_ids.resolve(cursor, 'publisher', publisher_name)
 
         # Step 5: Insert book
         cursor.execute("""
@@ -423,9 +881,16 @@ def log_book_from_ui():
         # Step 7: Insert into PublishedBy
         cursor.execute("INSERT INTO PublishedBy (book_id, publisher_id) VALUES (%s, %s)", (book_id, publisher_id))
 
+        admin_counters.books_added(db, user_id)
+        book_listings.book_added(db, book_id)
+        cache_epochs.bump(cursor, f'books.{user_id}')
         db.commit()
         cursor.close()
 
+        title_index.add_book(user_id, book_id, title, author_name, cover_url or None)
+        library_books.invalidate(user_id)
+        responses.invalidate(f'user:{user_id}', 'books')
+
         return jsonify({
             "status": "success",
             "message": "Book, author, and publisher saved",
@@ -442,11 +907,41 @@ def log_book_from_ui():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route('/api/books/bulk', methods=['POST'])
+def bulk_import_books():
+    """Import a books CSV, sent as a multipart 'file' field or as the raw request body"""
+    user_id = request.args.get('user_id') or request.form.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Missing user_id"}), 400
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    lines = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+
+    importer = bulk_import.BulkImporter(get_db(), user_id, app.config['BULK_IMPORT_BATCH_SIZE'],
+                                        before_commit=books_imported)
+    try:
+        report = importer.run(bulk_import.read_rows(lines))
+    except Error as err:
+        # Earlier batches are already committed; report how far the import got
+        print(f"❌ Bulk import error: {err}")
+        return jsonify({"status": "error", "message": str(err),
+                        "imported": importer.imported}), 500
+    finally:
+        title_index.drop_user(user_id)
+        library_books.invalidate(user_id)
+        responses.invalidate(f'user:{user_id}', 'books')
+
+    print(f"✅ Bulk imported {report['imported']} books at {report['rows_per_sec']} rows/sec")
+    return jsonify({"status": "success", **report}), 201
+
+
 @app.route('/api/books/search', methods=['GET'])
 def search_books():
     try:
         search_query = request.args.get('query', '').strip()
         username = request.args.get('username', '').strip()
+        limit = request.args.get('limit', type=int)
 
         if not search_query or not username:
             return jsonify({"status": "error", "message": "Missing search query or username"}), 400
@@ -454,41 +949,22 @@ def search_books():
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
+        # Ranked title/author matches from the in-process trigram index
+        books = title_index.search(cursor, username, search_query, limit=limit)
 
-        # Fetch books matching search query for this user
-        cursor.execute("""
-            SELECT 
-                b.book_id, 
-                b.title, 
-                b.issue, 
-                b.page_length,
-                GROUP_CONCAT(DISTINCT a.name SEPARATOR ', ') AS authors,
-                b.cover_url
-            FROM Book b
-            LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
-            LEFT JOIN Author a ON wb.author_id = a.author_id
-            WHERE b.title LIKE %s AND b.user_id = %s
-            GROUP BY b.book_id, b.title, b.issue, b.page_length, b.cover_url
-            ORDER BY b.title
-        """, (f"%{search_query}%", username))
-
-        books = cursor.fetchall()
-
-        # Fetch all starred book IDs for this user
-        cursor.execute("SELECT book_id FROM Starred WHERE user_id = %s", (username,))
-        starred_books = {row["book_id"] for row in cursor.fetchall()}
+        starred_ids = starred_sets.starred_ids(cursor, username)
 
         cursor.close()
 
         formatted_books = []
         for book in books:
             formatted_books.append({
-                "id": book["book_id"],
-                "title": book["title"],
-                "author": book["authors"] or "Unknown Author",
-                "coverUrl": book["cover_url"] or "/placeholder.svg?height=192&width=128",
-                "letter": book["title"][0].upper() if book["title"] else "A",
-                "starred": book["book_id"] in starred_books
+                "id": book.book_id,
+                "title": book.title,
+                "author": book.authors or "Unknown Author",
+                "coverUrl": book.cover_url or "/placeholder.svg?height=192&width=128",
+                "letter": book.title[0].upper() if book.title else "A",
+                "starred": starred_sets.is_starred(starred_ids, book.book_id)
             })
 
         return jsonify({
@@ -517,37 +993,17 @@ def sort_books():
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
-        # Base query with username filtering
-        base_query = f"""
-            SELECT 
-                b.book_id, 
-                b.title, 
-                b.issue, 
-                b.page_length,
-                b.cover_url,
-                GROUP_CONCAT(DISTINCT a.name SEPARATOR ', ') AS authors
-            FROM Book b
-            LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
-            LEFT JOIN Author a ON wb.author_id = a.author_id
-            WHERE b.user_id = %s
-        """
-
-        # Add search filter if given
-        params = [username]
-        if search_query:
-            base_query += " AND b.title LIKE %s"
-            params.append(search_query + '%')
-
-        base_query += f"""
-            GROUP BY b.book_id, b.title, b.issue, b.page_length, b.cover_url
-            ORDER BY b.title {sort_order.upper()}
-        """
+        # Title prefix filter and ordering served from memory, by the library
+        # cache when it is on and otherwise by the search index
+        if app.config['LIBRARY_CACHE_ENABLED'] and username.isdigit():
+            books = library_books.by_title(cursor, username, search_query,
+                                           descending=(sort_order == 'desc'))
+        else:
+            books = [{"book_id": b.book_id, "title": b.title, "authors": b.authors, "cover_url": b.cover_url}
+                     for b in title_index.prefix_search(cursor, username, search_query,
+                                                        descending=(sort_order == 'desc'))]
 
-        cursor.execute(base_query, params)
-        books = cursor.fetchall()
-        
-        cursor.execute("SELECT book_id FROM Starred WHERE user_id = %s", (username,))
-        starred_books = {row["book_id"] for row in cursor.fetchall()}
+        starred_ids = starred_sets.starred_ids(cursor, username)
 
         cursor.close()
 
@@ -557,8 +1013,8 @@ def sort_books():
             "author": b["authors"] or "Unknown Author",
             "coverUrl": b["cover_url"] or "/placeholder.svg?height=192&width=128",
             "letter": b["title"][0].upper() if b["title"] else "?",
-            "starred": b["book_id"] in starred_books
-            
+            "starred": starred_sets.is_starred(starred_ids, b["book_id"])
+
         } for b in books]
 
         return jsonify({
@@ -580,7 +1036,7 @@ def star_book():
         data = request.get_json()
         username = request.args.get('username', '').strip()
         book_id = data.get('book_id')
-        starred = data.get('starred', True)
+        starred_flag = data.get('starred', True)
 
         if not username or not book_id:
             return jsonify({"status": "error", "message": "Missing user_id or book_id"}), 400
@@ -593,11 +1049,14 @@ def star_book():
             INSERT INTO Starred (user_id, book_id, starred)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE starred = VALUES(starred)
-        """, (username, book_id, starred))
+        """, (username, book_id, starred_flag))
+        cache_epochs.bump(cursor, f'starred.{username}')
 
         db.commit()
         cursor.close()
 
+        starred_sets.star(username, book_id)
+
         return jsonify({"status": "success", "message": "Book starred successfully"})
 
     except Exception as e:
@@ -624,16 +1083,63 @@ def unstar_book():
             "DELETE FROM Starred WHERE user_id = %s AND book_id = %s",
             (username, book_id)
         )
+        cache_epochs.bump(cursor, f'starred.{username}')
 
         db.commit()
         cursor.close()
 
+        starred_sets.unstar(username, book_id)
+
         return jsonify({"status": "success", "message": "Book unstarred successfully"})
 
     except Exception as e:
         print(f"❌ Error unstarring book: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/star/batch', methods=['POST'])
+def star_books_batch():
+    """Star and unstar many books in one transaction: {"star": [ids], "unstar": [ids]}"""
+    username = request.args.get('username', '').strip()
+    data = request.get_json() or {}
+    if not username:
+        return jsonify({"status": "error", "message": "Missing user_id"}), 400
+    try:
+        star, unstar = batch_ids(data.get('star', [])), batch_ids(data.get('unstar', []))
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if set(star) & set(unstar):
+        return jsonify({"status": "error", "message": "A book cannot be starred and unstarred at once"}), 400
+    if not star and not unstar:
+        return jsonify({"status": "error", "message": "Nothing to star or unstar"}), 400
+
+    try:
+        db = get_db()
+        cursor = db.cursor()
+        if star:
+            cursor.executemany("""
+                INSERT INTO Starred (user_id, book_id, starred)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE starred = VALUES(starred)
+            """, [(username, book_id, True) for book_id in star])
+        if unstar:
+            cursor.execute(f"DELETE FROM Starred WHERE user_id = %s AND book_id IN ({', '.join(['%s'] * len(unstar))})",
+                           [username] + unstar)
+        if star or unstar:
+            cache_epochs.bump(cursor, f'starred.{username}')
+        db.commit()
+        cursor.close()
+
+        for book_id in star:
+            starred_sets.star(username, book_id)
+        for book_id in unstar:
+            starred_sets.unstar(username, book_id)
+
+        return jsonify({"status": "success", "starred": len(star), "unstarred": len(unstar)})
+
+    except Exception as e:
+        print(f"❌ Error starring books: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/api/books/page-range')
 def filter_books_by_page_range():
     try:
@@ -645,26 +1151,48 @@ def filter_books_by_page_range():
         if not username:
             return jsonify({"status": "error", "message": "Username is required"}), 400
 
+        # Either fold the starred flag into the listing query or use the cache
+        join_starred = app.config['STARRED_VIA_JOIN']
+        limit, after = page_args(2)
+
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
-        # Filter books owned by this user in the given page range
-        query = """
-            SELECT 
-                b.book_id, b.title, b.issue, b.page_length, b.cover_url,
-                GROUP_CONCAT(DISTINCT a.name SEPARATOR ', ') AS authors
-            FROM Book b
-            LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
-            LEFT JOIN Author a ON wb.author_id = a.author_id
-            WHERE b.page_length BETWEEN %s AND %s AND b.user_id = %s
-            GROUP BY b.book_id
-            ORDER BY b.page_length ASC
-        """
-        cursor.execute(query, (min_pages, max_pages, username))
-        books = cursor.fetchall()
-        
-        cursor.execute("SELECT book_id FROM Starred WHERE user_id = %s", (username,))
-        starred_books = {row["book_id"] for row in cursor.fetchall()}
+        if app.config['LIBRARY_CACHE_ENABLED'] and username.isdigit():
+            # Bisect over the user's cached library; starred flags come from the cache
+            join_starred = False
+            rows = library_books.by_page_range(cursor, username, min_pages, max_pages, after,
+                                               pagination.fetch_size(limit))
+        else:
+            params = ([username] if join_starred else []) + [min_pages, max_pages, username]
+            keyset = ""
+            if after:
+                clause, extra = pagination.after_clause(["l.page_length", "l.book_id"], after)
+                keyset = f"AND {clause}"
+                params.extend(extra)
+            if limit is not None:
+                params.append(limit + 1)
+
+            # Filter books owned by this user in the given page range: one range
+            # scan on BookListings (user_id, page_length, book_id)
+            query = f"""
+                SELECT {book_listings.COLUMNS}
+                    {", s.book_id IS NOT NULL AS starred" if join_starred else ""}
+                FROM BookListings l
+                {"LEFT JOIN Starred s ON s.book_id = l.book_id AND s.user_id = %s" if join_starred else ""}
+                WHERE l.page_length BETWEEN %s AND %s AND l.user_id = %s {keyset}
+                ORDER BY l.page_length ASC, l.book_id ASC
+                {"" if limit is None else "LIMIT %s"}
+            """
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        books, next_cursor = pagination.trim(rows, limit, lambda b: (b["page_length"], b["book_id"]))
+
+        if join_starred:
+            is_starred = lambda b: bool(b["starred"])
+        else:
+            starred_ids = starred_sets.starred_ids(cursor, username)
+            is_starred = lambda b: starred_sets.is_starred(starred_ids, b["book_id"])
 
         formatted_books = [{
             "id": b["book_id"],
@@ -672,11 +1200,13 @@ def filter_books_by_page_range():
             "author": b["authors"] or "Unknown",
             "coverUrl": b["cover_url"] or "/placeholder.svg?height=192&width=128",
             "letter": b["title"][0].upper() if b["title"] else "?",
-            "starred": b["book_id"] in starred_books
+            "starred": is_starred(b)
         } for b in books]
 
-        return jsonify({"status": "success", "books": formatted_books})
+        return jsonify({"status": "success", "books": formatted_books, "next_cursor": next_cursor})
 
+    except pagination.InvalidCursor as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         print("❌ Page range filter error:", e)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -688,22 +1218,39 @@ def filter_books_by_letter(letter):
         if not username:
             return jsonify({"status": "error", "message": "Missing username"}), 400
 
+        # The cache sorts titles by search_index.normalize, SQL by the column's
+        # collation; the orders differ, so a cursor only resumes on the path that issued it
+        source = 'library' if app.config['LIBRARY_CACHE_ENABLED'] else None
+        limit, after = page_args(2, source=source)
+
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
-        query = """
-            SELECT b.book_id, b.title, b.issue, b.page_length, b.cover_url,
-                   GROUP_CONCAT(DISTINCT a.name SEPARATOR ', ') AS authors
-            FROM Book b
-            JOIN User u ON b.user_id = u.user_id
-            LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
-            LEFT JOIN Author a ON wb.author_id = a.author_id
-            WHERE u.username = %s AND b.title LIKE %s
-            GROUP BY b.book_id
-            ORDER BY b.title ASC
-        """
-        cursor.execute(query, (username, f"{letter}%"))
-        books = cursor.fetchall()
+        if source:
+            rows = library_books.by_letter(cursor, username, letter, after, pagination.fetch_size(limit))
+        else:
+            params = [username, f"{letter}%"]
+            keyset = ""
+            if after:
+                clause, extra = pagination.after_clause(["l.title", "l.book_id"], after)
+                keyset = f"AND {clause}"
+                params.extend(extra)
+            if limit is not None:
+                params.append(limit + 1)
+
+            # Username resolves to one User row, then a range scan on
+            # BookListings (user_id, title, book_id)
+            query = f"""
+                SELECT {book_listings.COLUMNS}
+                FROM User u
+                JOIN BookListings l ON l.user_id = u.user_id
+                WHERE u.username = %s AND l.title LIKE %s {keyset}
+                ORDER BY l.title ASC, l.book_id ASC
+                {"" if limit is None else "LIMIT %s"}
+            """
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        books, next_cursor = pagination.trim(rows, limit, lambda b: (b["title"], b["book_id"]), source)
 
         formatted_books = [{
             "id": b["book_id"],
@@ -713,8 +1260,10 @@ def filter_books_by_letter(letter):
             "letter": b["title"][0].upper() if b["title"] else "?"
         } for b in books]
 
-        return jsonify({"status": "success", "books": formatted_books})
+        return jsonify({"status": "success", "books": formatted_books, "next_cursor": next_cursor})
     
+    except pagination.InvalidCursor as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         print("❌ Filter letter error:", e)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -726,33 +1275,55 @@ def get_all_books_by_user():
         if not username:
             return jsonify({"status": "error", "message": "Missing username"}), 400
 
+        # Streaming returns everything after the cursor, so no page limit applies
+        fmt = streaming.requested_format(request.args, request.headers.get('Accept'))
+        limit, after = page_args(2)
+        if fmt:
+            limit = None
+        params = [username]
+        keyset = ""
+        if after:
+            clause, extra = pagination.after_clause(["l.title", "l.book_id"], after)
+            keyset = f"AND {clause}"
+            params.extend(extra)
+        if limit is not None:
+            params.append(limit + 1)
+
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
-        query = """
-            SELECT b.book_id, b.title, b.issue, b.page_length, b.cover_url,
-                   GROUP_CONCAT(DISTINCT a.name SEPARATOR ', ') AS authors
-            FROM Book b
-            JOIN User u ON b.user_id = u.user_id
-            LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
-            LEFT JOIN Author a ON wb.author_id = a.author_id
-            WHERE u.username = %s
-            GROUP BY b.book_id
-            ORDER BY b.title ASC
+        query = f"""
+            SELECT {book_listings.COLUMNS}
+            FROM User u
+            JOIN BookListings l ON l.user_id = u.user_id
+            WHERE u.username = %s {keyset}
+            ORDER BY l.title ASC, l.book_id ASC
+            {"" if limit is None else "LIMIT %s"}
         """
-        cursor.execute(query, (username,))
-        books = cursor.fetchall()
+        cursor.execute(query, params)
+
+        def format_book(b):
+            return {
+                "id": b["book_id"],
+                "title": b["title"],
+                "author": b["authors"] or "Unknown",
+                "coverUrl": b["cover_url"] or "/placeholder.svg?height=192&width=128",
+                "letter": b["title"][0].upper() if b["title"] else "?"
+            }
 
-        formatted_books = [{
-            "id": b["book_id"],
-            "title": b["title"],
-            "author": b["authors"] or "Unknown",
-            "coverUrl": b["cover_url"] or "/placeholder.svg?height=192&width=128",
-            "letter": b["title"][0].upper() if b["title"] else "?"
-        } for b in books]
+        if fmt:
+            return stream_rows(fmt, cursor, format_book,
+                               prefix='{"status": "success", "books": [',
+                               suffix='], "next_cursor": null}')
 
-        return jsonify({"status": "success", "books": formatted_books})
+        books, next_cursor = pagination.trim(cursor.fetchall(), limit,
+                                             lambda b: (b["title"], b["book_id"]))
+        formatted_books = [format_book(b) for b in books]
+
+        return jsonify({"status": "success", "books": formatted_books, "next_cursor": next_cursor})
     
+    except pagination.InvalidCursor as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         print("❌ Get all books error:", e)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -760,6 +1331,52 @@ def get_all_books_by_user():
 from flask import request, jsonify
 from datetime import date
 
+def insert_reads(db, user_id, reads):
+    """Insert (book_id, review) pairs for one user as a single idempotent upsert.
+
+    HasRead's unique (user_id, book_id) key turns re-reads into no-ops. New
+    rows are appended to the event log in the caller's transaction, and the
+    worker brings the derived tables up to date; returns their book ids.
+    """
+    cursor = db.cursor()
+    today = date.today()
+
+    # Locks the rows already there and, under REPEATABLE READ, the gaps the
+    # missing ones would fill, so a concurrent mark-as-read of one of these
+    # books waits for this transaction instead of racing it
+    book_ids = [book_id for book_id, _ in reads]
+    cursor.execute(f"""
+        SELECT book_id FROM HasRead
+        WHERE user_id = %s AND book_id IN ({', '.join(['%s'] * len(book_ids))})
+        FOR UPDATE
+    """, [user_id] + book_ids)
+    existing = {book_id for book_id, in cursor.fetchall()}
+    new_reads = [(book_id, review) for book_id, review in reads if int(book_id) not in existing]
+
+    inserted = []
+    if new_reads:
+        # executemany sends this as one multi-row INSERT. Its lastrowid says
+        # nothing reliable about the other rows' ids, so they are read back by key.
+        cursor.executemany("""
+            INSERT INTO HasRead (user_id, book_id, date, review)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE hasread_id = hasread_id
+        """, [(user_id, book_id, today, review) for book_id, review in new_reads])
+        new_ids = [book_id for book_id, _ in new_reads]
+        cursor.execute(f"""
+            SELECT hasread_id, book_id FROM HasRead
+            WHERE user_id = %s AND book_id IN ({', '.join(['%s'] * len(new_ids))})
+            ORDER BY hasread_id
+        """, [user_id] + new_ids)
+        inserted = cursor.fetchall()
+    cursor.close()
+
+    if inserted:
+        event_log.append(db, event_log.READ,
+                         [(user_id, book_id, hasread_id) for hasread_id, book_id in inserted],
+                         read_date=today)
+    return [book_id for _, book_id in inserted]
+
 @app.route('/api/mark-as-read', methods=['POST'])
 def mark_as_read():
     user_id = request.args.get("username")  # really user_id
@@ -772,28 +1389,48 @@ def mark_as_read():
 
     try:
         db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        cursor.execute("""
-            INSERT INTO HasRead (user_id, book_id, date, review)
-            SELECT %s, %s, CURDATE(), %s
-            FROM (SELECT 1) AS dummy
-            WHERE NOT EXISTS (
-                SELECT 1 FROM HasRead h2 
-                WHERE h2.user_id = %s AND h2.book_id = %s
-                HAVING COUNT(*) > 0
-            ) OR EXISTS (
-                SELECT 1 FROM HasRead h3 
-                WHERE h3.user_id = %s AND h3.book_id = %s
-                HAVING COUNT(*) = 0
-            )
-        """, (user_id, book_id, review, user_id, book_id, user_id, book_id))
-
+        # Only a real insert (not a duplicate) changes the derived counters
+        inserted = insert_reads(db, user_id, [(book_id, review)])
         db.commit()
+        if inserted:
+            events.notify()
+            # Read today, so only this year's rankings moved
+            responses.invalidate(f'user:{user_id}', f'year:{date.today().year}', 'years', 'reads')
         return jsonify({'message': 'Book marked as read'}), 200
     except Exception as e:
         print("❌ Error inserting:", e)
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/mark-as-read/batch', methods=['POST'])
+def mark_as_read_batch():
+    """Mark many books read in one transaction: {"books": [{"book_id": 1, "review": "..."}, ...]}"""
+    user_id = request.args.get("username")  # really user_id
+    data = request.get_json() or {}
+    books = data.get("books")
+
+    if not user_id or not isinstance(books, list) or not books:
+        return jsonify({'error': 'Missing data'}), 400
+    try:
+        batch_ids([book.get("book_id") for book in books])
+        reviews = {}
+        for book in books:
+            # The first entry for a book wins, as it would for single calls
+            reviews.setdefault(int(book["book_id"]), book.get("review"))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid books: {e}'}), 400
+
+    try:
+        db = get_db()
+        inserted = insert_reads(db, user_id, list(reviews.items()))
+        db.commit()
+        if inserted:
+            events.notify()
+            responses.invalidate(f'user:{user_id}', f'year:{date.today().year}', 'years', 'reads')
+        return jsonify({'message': 'Books marked as read', 'inserted': inserted,
+                        'duplicates': len(reviews) - len(inserted)}), 200
+    except Exception as e:
+        print("❌ Error inserting batch:", e)
+        return jsonify({'error': str(e)}), 500
     
 @app.route('/api/hasread')
 def get_has_read_books():
@@ -802,13 +1439,32 @@ def get_has_read_books():
     if not username:
         return jsonify({'error': 'Username required'}), 400
 
+    try:
+        limit, after = page_args(1)
+    except pagination.InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Streaming returns everything after the cursor, so no page limit applies
+    fmt = streaming.requested_format(request.args, request.headers.get('Accept'))
+    if fmt:
+        limit = None
+    params = [username]
+    keyset = ""
+    if after:
+        clause, extra = pagination.after_clause(["h.hasread_id"], after)
+        keyset = f"AND {clause}"
+        params.extend(extra)
+    if limit is not None:
+        params.append(limit + 1)
+
     db = get_db()
     cursor = db.cursor(dictionary=True)
 
     # Enhanced SQL with CTE while selecting exactly the same columns
-    cursor.execute("""
+    cursor.execute(f"""
         WITH UserBooks AS (
             SELECT 
+                h.hasread_id,
                 h.book_id,
                 h.review,
                 h.date,
@@ -818,14 +1474,31 @@ def get_has_read_books():
             FROM HasRead h
             JOIN Book b ON h.book_id = b.book_id
             JOIN User u ON h.user_id = u.user_id
-            WHERE u.user_id = %s
+            WHERE u.user_id = %s {keyset}
+            ORDER BY h.hasread_id
+            {"" if limit is None else "LIMIT %s"}
         )
-        SELECT book_id, title, issue, page_length, review, date
+        SELECT hasread_id, book_id, title, issue, page_length, review, date
         FROM UserBooks
-    """, (username,))
+        ORDER BY hasread_id
+    """, params)
+
+    def drop_key(row):
+        del row['hasread_id']
+        return row
+
+    if fmt:
+        return stream_rows(fmt, cursor, drop_key)
 
-    results = cursor.fetchall()
-    return jsonify(results)
+    results, next_cursor = pagination.trim(cursor.fetchall(), limit, lambda r: (r['hasread_id'],))
+    for row in results:
+        drop_key(row)
+
+    # The body stays a bare array, so the next page's cursor travels in a header
+    response = jsonify(results)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/hasread/review', methods=['PUT'])
 def update_review():
@@ -857,6 +1530,7 @@ def update_review():
         """
         
         cursor.execute(update_query, (user_id, book_id, review))
+        # No event is logged: every view that shows a review reads it from HasRead
         connection.commit()
         
         # Check if any rows were affected
@@ -864,7 +1538,6 @@ def update_review():
             return jsonify({'error': 'No matching record found or no changes made'}), 404
         
         cursor.close()
-        connection.close()
         
         return jsonify({
             'message': 'Review updated successfully',
@@ -881,201 +1554,78 @@ def update_review():
 
 
 @app.route("/api/reading-stats")
+@responses.cached(lambda args: [f"user:{args.get('user_id')}"])
 def reading_stats():
     user_id = request.args.get("user_id")
     if not user_id:
         return jsonify({"error": "Missing user ID"}), 400
 
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    # Enhanced query with CTEs, window functions, and recursive-like logic
-    query = """
-        WITH RECURSIVE UserReadingData AS (
-            -- Base case: Get all user's reading data with rankings
-            SELECT 
-                hr.user_id,
-                hr.book_id,
-                hr.date,
-                hr.hasread_id,
-                b.title,
-                b.page_length,
-                ROW_NUMBER() OVER (PARTITION BY hr.user_id ORDER BY hr.date ASC) as read_sequence,
-                ROW_NUMBER() OVER (PARTITION BY hr.user_id ORDER BY hr.hasread_id DESC) as latest_sequence,
-                COUNT(*) OVER (PARTITION BY hr.user_id) as total_books_count,
-                1 as depth_level
-            FROM HasRead hr
-            JOIN Book b ON b.book_id = hr.book_id
-            WHERE hr.user_id = %s
-            
-            UNION ALL
-            
-            -- Recursive case: Create depth levels for complex aggregation
-            SELECT 
-                urd.user_id,
-                urd.book_id,
-                urd.date,
-                urd.hasread_id,
-                urd.title,
-                urd.page_length,
-                urd.read_sequence,
-                urd.latest_sequence,
-                urd.total_books_count,
-                urd.depth_level + 1
-            FROM UserReadingData urd
-            WHERE urd.depth_level < 2  -- Limit recursion depth
-        ),
-        AuthorAnalysis AS (
-            -- CTE for author preference analysis with window functions
-            SELECT 
-                a.author_id,
-                a.name,
-                COUNT(*) as books_by_author,
-                RANK() OVER (ORDER BY COUNT(*) DESC) as author_rank,
-                DENSE_RANK() OVER (ORDER BY COUNT(*) DESC) as author_dense_rank
-            FROM UserReadingData urd
-            JOIN WrittenBy wb ON urd.book_id = wb.book_id
-            JOIN Author a ON a.author_id = wb.author_id
-            WHERE urd.depth_level = 1  -- Use only base level data
-            GROUP BY a.author_id, a.name
-        ),
-        BookSequence AS (
-            -- CTE for first and latest book identification
-            SELECT 
-                title,
-                read_sequence,
-                latest_sequence,
-                CASE WHEN read_sequence = 1 THEN title END as first_book_title,
-                CASE WHEN latest_sequence = 1 THEN title END as latest_book_title
-            FROM UserReadingData
-            WHERE depth_level = 1
-        ),
-        PageStats AS (
-            -- CTE for page statistics with advanced calculations
-            SELECT 
-                COUNT(*) as total_books,
-                ROUND(AVG(CASE WHEN page_length IS NOT NULL THEN page_length END), 1) as avg_pages,
-                STDDEV(page_length) as page_stddev,
-                MIN(page_length) as min_pages,
-                MAX(page_length) as max_pages
-            FROM UserReadingData
-            WHERE depth_level = 1 AND page_length IS NOT NULL
-        )
-        SELECT 
-            ps.total_books,
-            ps.avg_pages,
-            (SELECT name FROM AuthorAnalysis WHERE author_rank = 1 LIMIT 1) as favorite_author,
-            (SELECT title FROM BookSequence WHERE first_book_title IS NOT NULL LIMIT 1) as first_book,
-            (SELECT title FROM BookSequence WHERE latest_book_title IS NOT NULL LIMIT 1) as latest_book
-        FROM PageStats ps
-    """
-
-    cursor.execute(query, (user_id,))
-    stats = cursor.fetchone()
-
-    # Convert avg_pages to float if it's not None
-    if stats and stats.get('avg_pages') is not None:
-        try:
-            stats['avg_pages'] = float(stats['avg_pages'])
-        except (ValueError, TypeError):
-            stats['avg_pages'] = None
+    # O(1) lookup of the summary maintained by mark-as-read and book deletes
+    stats = stats_summary.fetch(get_db(), user_id)
 
     print("Fetched stats:", stats)
     return jsonify(stats)
 
-@app.route("/api/author-stats")
-def author_stats():
-    user_id = request.args.get("username")
-    if not user_id:
-        return jsonify({"error": "Missing user ID"}), 400
-
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    # Fetch top 10 authors (by number of books added by current user)
-    cursor.execute("""
+# Top 10 authors for a user with page stats and shortest/longest titles in one pass
+AUTHOR_STATS_QUERY = """
+    WITH AuthorBooks AS (
         SELECT 
             a.author_id,
             a.name AS author_name,
-            COUNT(b.book_id) AS num_books
+            b.title,
+            b.page_length,
+            ROW_NUMBER() OVER (
+                PARTITION BY a.author_id
+                ORDER BY b.page_length IS NULL, b.page_length ASC, b.book_id
+            ) AS shortest_rank,
+            ROW_NUMBER() OVER (
+                PARTITION BY a.author_id
+                ORDER BY b.page_length IS NULL, b.page_length DESC, b.book_id
+            ) AS longest_rank
         FROM Author a
         JOIN WrittenBy wb ON a.author_id = wb.author_id
         JOIN Book b ON b.book_id = wb.book_id
         WHERE b.user_id = %s
-        GROUP BY a.author_id, a.name
-        ORDER BY num_books DESC
-        LIMIT 10
-    """, (user_id,))
-    top_authors = cursor.fetchall()
+    )
+    SELECT 
+        author_id,
+        author_name,
+        COUNT(*) AS num_books,
+        MIN(page_length) AS min_page_length,
+        MAX(page_length) AS max_page_length,
+        ROUND(AVG(page_length), 1) AS avg_page_length,
+        MAX(CASE WHEN shortest_rank = 1 AND page_length IS NOT NULL THEN title END) AS min_book_title,
+        MAX(CASE WHEN longest_rank = 1 AND page_length IS NOT NULL THEN title END) AS max_book_title
+    FROM AuthorBooks
+    GROUP BY author_id, author_name
+    ORDER BY num_books DESC
+    LIMIT 10
+"""
 
-    print(f"Found {len(top_authors)} authors for user {user_id}")
+@app.route("/api/author-stats")
+@responses.cached(lambda args: [f"user:{args.get('username')}"])
+def author_stats():
+    user_id = request.args.get("username")
+    if not user_id:
+        return jsonify({"error": "Missing user ID"}), 400
 
-    author_stats = []
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
 
-    for author in top_authors:
-        author_id = author["author_id"]
-        print(f"Processing author: {author['author_name']} (ID: {author_id})")
+    cursor.execute(AUTHOR_STATS_QUERY, (user_id,))
+    top_authors = cursor.fetchall()
+    cursor.close()
 
-        # Stats only for books added by current user with non-NULL page_length
-        cursor.execute("""
-            SELECT 
-                MIN(b.page_length) AS min_page_length,
-                MAX(b.page_length) AS max_page_length,
-                ROUND(AVG(b.page_length), 1) AS avg_page_length,
-                COUNT(b.book_id) AS books_with_pages
-            FROM Book b
-            JOIN WrittenBy wb ON b.book_id = wb.book_id
-            WHERE wb.author_id = %s AND b.user_id = %s AND b.page_length IS NOT NULL
-        """, (author_id, user_id))
-        page_stats = cursor.fetchone()
-
-        print(f"Page stats: {page_stats}")
-
-        # Only proceed if we have books with page lengths
-        if page_stats and page_stats['books_with_pages'] > 0:
-            min_page_length = page_stats['min_page_length']
-            max_page_length = page_stats['max_page_length']
-
-            # Title of shortest book
-            cursor.execute("""
-                SELECT b.title
-                FROM Book b
-                JOIN WrittenBy wb ON b.book_id = wb.book_id
-                WHERE wb.author_id = %s AND b.user_id = %s AND b.page_length = %s
-                LIMIT 1
-            """, (author_id, user_id, min_page_length))
-            min_book = cursor.fetchone()
-
-            # Title of longest book
-            cursor.execute("""
-                SELECT b.title
-                FROM Book b
-                JOIN WrittenBy wb ON b.book_id = wb.book_id
-                WHERE wb.author_id = %s AND b.user_id = %s AND b.page_length = %s
-                LIMIT 1
-            """, (author_id, user_id, max_page_length))
-            max_book = cursor.fetchone()
-
-            author_stats.append({
-                "author_name": author["author_name"],
-                "num_books": author["num_books"],
-                "avg_page_length": page_stats["avg_page_length"],
-                "min_book_title": min_book["title"] if min_book else "N/A",
-                "min_page_length": min_page_length,
-                "max_book_title": max_book["title"] if max_book else "N/A",
-                "max_page_length": max_page_length,
-            })
-        else:
-            # Author has books but none with page lengths
-            author_stats.append({
-                "author_name": author["author_name"],
-                "num_books": author["num_books"],
-                "avg_page_length": None,
-                "min_book_title": "N/A",
-                "min_page_length": None,
-                "max_book_title": "N/A",
-                "max_page_length": None,
-            })
+    # Authors with no page lengths come back with NULL stats and titles
+    author_stats = [{
+        "author_name": author["author_name"],
+        "num_books": author["num_books"],
+        "avg_page_length": author["avg_page_length"],
+        "min_book_title": author["min_book_title"] or "N/A",
+        "min_page_length": author["min_page_length"],
+        "max_book_title": author["max_book_title"] or "N/A",
+        "max_page_length": author["max_page_length"],
+    } for author in top_authors]
 
     print(f"Returning {len(author_stats)} author stats")
     return jsonify(author_stats)
@@ -1083,6 +1633,7 @@ def author_stats():
 
 
 @app.route("/api/most-read-book")
+@responses.cached(lambda args: [f"year:{args.get('year')}", 'reads'])
 def most_read_book():
     year = request.args.get("year")
     if not year:
@@ -1093,75 +1644,37 @@ def most_read_book():
     except ValueError:
         return jsonify({"error": "Invalid year format"}), 400
 
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
+    # ?limit=K returns the top K in "books" for the rankings page
+    limit = min(max(request.args.get("limit", 1, type=int), 1), 100)
 
     print(f"Finding most read book for year {year}")
 
-    # Create the view if it doesn't exist
-    cursor.execute("""
-        CREATE OR REPLACE VIEW MostReadBookView AS
-        SELECT 
-            b.book_id,
-            b.title,
-            COUNT(h.hasread_id) AS read_count
-        FROM HasRead h
-        JOIN Book b ON b.book_id = h.book_id
-        GROUP BY b.book_id, b.title
-    """)
-    
-    # Get the most read book using the view
-    cursor.execute("""
-        SELECT 
-            v.book_id,
-            v.title,
-            v.read_count
-        FROM MostReadBookView v
-        JOIN HasRead h ON v.book_id = h.book_id
-        WHERE YEAR(h.date) = %s
-        ORDER BY v.read_count DESC
-        LIMIT 1
-    """, (year,))
-    
-    most_read = cursor.fetchone()
+    # Served from the BookYearReads rollup, kept current by mark_as_read
+    top_books = rankings.top(get_db(), year, limit)
 
-    if not most_read:
+    if not top_books:
         print(f"No books found for year {year}")
         return jsonify({
             "book": None,
+            "books": [],
             "year": year,
             "message": f"No books were read in {year}"
         })
 
-    # Process the result
-    book_data = {
-        "book_id": most_read["book_id"],
-        "title": most_read["title"],
-        "read_count": most_read["read_count"]
-    }
-
+    most_read = top_books[0]
     print(f"Most read book: {most_read['title']} with {most_read['read_count']} reads")
     
     return jsonify({
-        "book": book_data,
+        "book": most_read,
+        "books": top_books,
         "year": year
     })
 
 
 @app.route("/api/most-read-book/available-years")
+@responses.cached(lambda args: ['years', 'reads'])
 def available_years_for_most_read():
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT DISTINCT YEAR(date) as year
-        FROM HasRead
-        WHERE date IS NOT NULL
-        ORDER BY year DESC
-    """)
-    
-    years = cursor.fetchall()
-    year_list = [row['year'] for row in years] if years else []
+    year_list = rankings.years(get_db())
     
     if not year_list:
         current_year = datetime.now().year
@@ -1183,171 +1696,10 @@ def get_reading_challenges():
     if not user_id:
         return jsonify({"status": "error", "message": "Missing user_id"}), 400
 
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    
-
-    # Challenge 1: Read 12 books this year (using CTE with window functions)
-    current_year = datetime.now().year
-    
-    cursor.execute("""
-        WITH yearly_reads AS (
-            SELECT 
-                user_id,
-                book_id,
-                date,
-                YEAR(date) as read_year,
-                ROW_NUMBER() OVER (PARTITION BY user_id, YEAR(date) ORDER BY date) as book_sequence
-            FROM HasRead
-            WHERE user_id = %s
-        ),
-        year_aggregation AS (
-            SELECT 
-                user_id,
-                read_year,
-                COUNT(*) as total_books,
-                MAX(book_sequence) as max_sequence
-            FROM yearly_reads
-            WHERE read_year = %s
-            GROUP BY user_id, read_year
-            HAVING COUNT(*) >= 0
-        )
-        SELECT 
-            COALESCE(SUM(total_books), 0) as 'COUNT(*)'
-        FROM year_aggregation
-        WHERE user_id = %s AND read_year = %s
-    """, (user_id, current_year, user_id, current_year))
-    
-    print("Executing:", user_id, current_year)
-
-    result = cursor.fetchone()
-    print("Raw fetchone() result (books read):", result)
-    
-    books_read_this_year = result['COUNT(*)']
-
-    # Challenge 2: Read 3 books by the same author (using recursive CTE and window functions)
-    cursor.execute("""
-        WITH RECURSIVE author_books AS (
-            -- Base case: Get all user's books with authors
-            SELECT 
-                hr.user_id,
-                hr.book_id,
-                wb.author_id,
-                1 as book_count,
-                hr.book_id as first_book_id
-            FROM HasRead hr
-            JOIN WrittenBy wb ON hr.book_id = wb.book_id
-            WHERE hr.user_id = %s
-            
-            UNION ALL
-            
-            -- Recursive case: Count books by same author
-            SELECT 
-                ab.user_id,
-                hr2.book_id,
-                ab.author_id,
-                ab.book_count + 1,
-                ab.first_book_id
-            FROM author_books ab
-            JOIN HasRead hr2 ON ab.user_id = hr2.user_id
-            JOIN WrittenBy wb2 ON hr2.book_id = wb2.book_id
-            WHERE wb2.author_id = ab.author_id 
-            AND hr2.book_id > ab.book_id
-            AND ab.book_count < 100  -- Prevent infinite recursion
-        ),
-        author_counts_cte AS (
-            SELECT 
-                author_id,
-                COUNT(DISTINCT book_id) as author_count,
-                DENSE_RANK() OVER (ORDER BY COUNT(DISTINCT book_id) DESC) as author_rank
-            FROM (
-                SELECT DISTINCT user_id, book_id, author_id 
-                FROM author_books
-            ) unique_books
-            GROUP BY author_id
-        ),
-        max_count_cte AS (
-            SELECT 
-                author_count,
-                ROW_NUMBER() OVER (ORDER BY author_count DESC) as rn
-            FROM author_counts_cte
-            WHERE author_rank = 1
-        )
-        SELECT 
-            COALESCE(MAX(author_count), 0) as 'MAX(author_count)'
-        FROM max_count_cte
-        WHERE rn = 1
-    """, (user_id,))
-    result = cursor.fetchone()
-    
-    max_books_by_single_author = (result and result['MAX(author_count)']) or 0
-
-    # Challenge 3: Read 5000+ pages (using multiple CTEs and window functions)
-    cursor.execute("""
-        WITH user_books AS (
-            SELECT DISTINCT
-                hr.user_id,
-                hr.book_id,
-                b.page_length,
-                ROW_NUMBER() OVER (PARTITION BY hr.user_id ORDER BY hr.date) as read_order
-            FROM HasRead hr
-            JOIN Book b ON hr.book_id = b.book_id
-            WHERE hr.user_id = %s
-        ),
-        page_calculations AS (
-            SELECT 
-                user_id,
-                book_id,
-                page_length,
-                SUM(page_length) OVER (PARTITION BY user_id ORDER BY read_order) as running_total,
-                CASE 
-                    WHEN page_length IS NOT NULL THEN page_length
-                    ELSE 0 
-                END as safe_page_length
-            FROM user_books
-        ),
-        final_sum AS (
-            SELECT 
-                user_id,
-                SUM(DISTINCT safe_page_length) as total_pages,
-                COUNT(DISTINCT book_id) as total_books,
-                AVG(safe_page_length) as avg_pages_per_book
-            FROM page_calculations
-            WHERE safe_page_length > 0
-            GROUP BY user_id
-            HAVING SUM(DISTINCT safe_page_length) >= 0
-        )
-        SELECT 
-            COALESCE(total_pages, 0) as 'SUM(Book.page_length)'
-        FROM final_sum
-        WHERE user_id = %s
-    """, (user_id, user_id))
-    result = cursor.fetchone()
-    
-    total_pages_read = (result and result['SUM(Book.page_length)']) or 0
-
-    print(books_read_this_year)
-    print(max_books_by_single_author)
-    print(total_pages_read)
-    cursor.close()
-
-    # Return boolean completion status + progress values (optional)
+    # Constant-time read of the per-user counters, whatever the reading history length
     return jsonify({
         "status": "success",
-        "challenges": {
-            "read_12_books_this_year": {
-                "completed": books_read_this_year >= 12,
-                "progress": books_read_this_year
-            },
-            "read_3_books_by_same_author": {
-                "completed": max_books_by_single_author >= 3,
-                "progress": max_books_by_single_author
-            },
-            "read_5000_pages": {
-                "completed": total_pages_read >= 5000,
-                "progress": total_pages_read
-            }
-        }
+        "challenges": challenges.evaluate(get_db(), user_id)
     })
 
 
@@ -1379,9 +1731,16 @@ def follow_user():
             INSERT INTO Follows (follower_id, followee_id)
             VALUES (%s, %s)
         """, (follower_id, followee_id))
+        feed_store.on_follow(db, follower_id, followee_id)
+        event_log.append(db, event_log.FOLLOWS, [(follower_id, None, None)])
+        cache_epochs.bump(cursor, f'follows.{follower_id}')
         db.commit()
         cursor.close()
 
+        events.notify()
+        followee_sets.follow(follower_id, followee_id)
+        responses.invalidate(f'user:{follower_id}')
+
         return jsonify({"status": "success", "message": "Followed successfully"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1406,14 +1765,91 @@ def unfollow_user():
         if cursor.rowcount == 0:
             cursor.close()
             return jsonify({"status": "error", "message": "You are not following this user"}), 404
-            
+
+        feed_store.on_unfollow(db, follower_id, followee_id)
+        event_log.append(db, event_log.FOLLOWS, [(follower_id, None, None)])
+        cache_epochs.bump(cursor, f'follows.{follower_id}')
         db.commit()
         cursor.close()
 
+        events.notify()
+        followee_sets.unfollow(follower_id, followee_id)
+        responses.invalidate(f'user:{follower_id}')
+
         return jsonify({"status": "success", "message": "Unfollowed successfully"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/api/follow/batch", methods=["POST"])
+def follow_users_batch():
+    """Follow and unfollow many users in one transaction:
+    {"follower_id": 1, "follow": [ids], "unfollow": [ids]}"""
+    data = request.get_json() or {}
+    follower_id = data.get("follower_id")
+    if not follower_id:
+        return jsonify({"status": "error", "message": "Missing user IDs"}), 400
+    try:
+        follower_id = int(follower_id)
+        follow, unfollow = batch_ids(data.get("follow", [])), batch_ids(data.get("unfollow", []))
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if follower_id in follow:
+        return jsonify({"status": "error", "message": "Cannot follow yourself"}), 400
+    if set(follow) & set(unfollow):
+        return jsonify({"status": "error", "message": "A user cannot be followed and unfollowed at once"}), 400
+    if not follow and not unfollow:
+        return jsonify({"status": "error", "message": "Nothing to follow or unfollow"}), 400
+
+    try:
+        db = get_db()
+        cursor = db.cursor()
+
+        # Locks the pairs that exist, so the hooks below see exactly what changed
+        targets = follow + unfollow
+        cursor.execute(f"""
+            SELECT followee_id FROM Follows
+            WHERE follower_id = %s AND followee_id IN ({', '.join(['%s'] * len(targets))})
+            FOR UPDATE
+        """, [follower_id] + targets)
+        existing = {row[0] for row in cursor.fetchall()}
+        added = [followee_id for followee_id in follow if followee_id not in existing]
+        removed = [followee_id for followee_id in unfollow if followee_id in existing]
+
+        if added:
+            cursor.executemany("""
+                INSERT INTO Follows (follower_id, followee_id)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE followee_id = followee_id
+            """, [(follower_id, followee_id) for followee_id in added])
+        if removed:
+            cursor.execute(f"""
+                DELETE FROM Follows
+                WHERE follower_id = %s AND followee_id IN ({', '.join(['%s'] * len(removed))})
+            """, [follower_id] + removed)
+        for followee_id in added:
+            feed_store.on_follow(db, follower_id, followee_id)
+        for followee_id in removed:
+            feed_store.on_unfollow(db, follower_id, followee_id)
+        # One suggestions refresh for the whole batch rather than one per follow
+        if added or removed:
+            event_log.append(db, event_log.FOLLOWS, [(follower_id, None, None)])
+            cache_epochs.bump(cursor, f'follows.{follower_id}')
+        db.commit()
+        cursor.close()
+
+        for followee_id in added:
+            followee_sets.follow(follower_id, followee_id)
+        for followee_id in removed:
+            followee_sets.unfollow(follower_id, followee_id)
+        if added or removed:
+            events.notify()
+            responses.invalidate(f'user:{follower_id}')
+
+        return jsonify({"status": "success", "followed": added, "unfollowed": removed,
+                        "unchanged": len(targets) - len(added) - len(removed)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route("/api/following", methods=["GET"])
 def get_following():
     """Get users that the current user is following"""
@@ -1439,6 +1875,7 @@ def get_following():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/api/users-to-follow", methods=["GET"])
+@responses.cached(lambda args: [f"user:{args.get('user_id')}", 'users'])
 def get_users_to_follow():
     """Get suggested users that the current user can follow"""
     user_id = request.args.get("user_id")
@@ -1446,26 +1883,14 @@ def get_users_to_follow():
         return jsonify({"status": "error", "message": "Missing user_id"}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
+        # Ranked friends-of-friends and shared-author readers, precomputed per
+        # user and refreshed by the event log worker after follow/unfollow;
+        # see rebuild-suggestions
+        users = suggestions.fetch(get_db(), user_id, app.config['SUGGESTIONS_TOP_K'])
 
-        # Get users that the current user is not following (excluding themselves)
-        cursor.execute("""
-            SELECT u.user_id, u.username, u.name,
-                   CASE WHEN f.followee_id IS NOT NULL THEN TRUE ELSE FALSE END as isFollowing
-            FROM User u
-            LEFT JOIN Follows f ON u.user_id = f.followee_id AND f.follower_id = %s
-            WHERE u.user_id != %s
-            ORDER BY u.username
-            LIMIT 20
-        """, (user_id, user_id))
-        
-        users = cursor.fetchall()
-        cursor.close()
-        
-        # Convert boolean for JSON serialization
+        # Suggestions never include users already followed
         for user in users:
-            user['isFollowing'] = bool(user['isFollowing'])
+            user['isFollowing'] = False
 
         return jsonify({"status": "success", "users": users}), 200
     except Exception as e:
@@ -1483,39 +1908,25 @@ def search_users():
         return jsonify({"status": "error", "message": "Missing current_user_id"}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        # Search by username or user_id, excluding current user
-        if query.isdigit():
-            # Search by user ID
-            cursor.execute("""
-                SELECT u.user_id, u.username, u.name,
-                       CASE WHEN f.followee_id IS NOT NULL THEN TRUE ELSE FALSE END as isFollowing
-                FROM User u
-                LEFT JOIN Follows f ON u.user_id = f.followee_id AND f.follower_id = %s
-                WHERE u.user_id = %s AND u.user_id != %s
-            """, (current_user_id, query, current_user_id))
-        else:
-            # Search by username (partial match)
-            search_term = f"%{query}%"
-            cursor.execute("""
-                SELECT u.user_id, u.username, u.name,
-                       CASE WHEN f.followee_id IS NOT NULL THEN TRUE ELSE FALSE END as isFollowing
-                FROM User u
-                LEFT JOIN Follows f ON u.user_id = f.followee_id AND f.follower_id = %s
-                WHERE (u.username LIKE %s OR u.name LIKE %s) AND u.user_id != %s
-                ORDER BY u.username
-                LIMIT 10
-            """, (current_user_id, search_term, search_term, current_user_id))
-        
-        users = cursor.fetchall()
+        # Typeahead served from memory; follow state from the cached followee set
+        matches = user_index.search(query, limit=10, exclude=current_user_id)
+        if matches is None:
+            # The first load scans all of User, so it runs in the background
+            # (retried after a failure) and the client is told to come back
+            user_index.load_in_background(db_pool)
+            response = jsonify({"status": "error", "message": "User search is still loading"})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        cursor = get_db().cursor(dictionary=True)
+        followee_ids = followee_sets.followee_ids(cursor, current_user_id)
         cursor.close()
-        
-        # Convert boolean for JSON serialization
-        for user in users:
-            user['isFollowing'] = bool(user['isFollowing'])
-
+        users = [{
+            "user_id": user_id,
+            "username": username,
+            "name": name,
+            "isFollowing": followee_sets.is_following(followee_ids, user_id),
+        } for user_id, username, name in matches]
         return jsonify({"status": "success", "users": users}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1550,42 +1961,8 @@ def get_user_feed():
         return jsonify({"status": "error", "message": "Missing user_id"}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        # Get the latest book read by each user that the current user follows
-        # This query gets the most recent HasRead entry for each followed user
-        cursor.execute("""
-            SELECT 
-                hr.hasread_id,
-                hr.user_id,
-                u.username,
-                u.name,
-                hr.book_id,
-                b.title as book_title,
-                b.cover_url,
-                hr.date,
-                hr.review,
-                b.page_length
-            FROM HasRead hr
-            INNER JOIN (
-                -- Subquery to get the most recent hasread_id for each user that we follow
-                SELECT 
-                    hr2.user_id,
-                    MAX(hr2.hasread_id) as latest_hasread_id
-                FROM HasRead hr2
-                INNER JOIN Follows f ON hr2.user_id = f.followee_id
-                WHERE f.follower_id = %s
-                GROUP BY hr2.user_id
-            ) latest ON hr.hasread_id = latest.latest_hasread_id
-            INNER JOIN User u ON hr.user_id = u.user_id
-            INNER JOIN Book b ON hr.book_id = b.book_id
-            ORDER BY hr.date DESC, hr.hasread_id DESC
-            LIMIT 50
-        """, (user_id,))
-        
-        feed_items = cursor.fetchall()
-        cursor.close()
+        # Latest read per followed user, from the fan-out timeline plus pulled popular users
+        feed_items = feed_store.latest_per_followee(get_db(), user_id)
 
         # Convert date objects to strings for JSON serialization
         for item in feed_items:
@@ -1601,46 +1978,23 @@ def get_user_feed():
 def get_all_reading_activity():
     """Get all recent reading activity from people the user follows (not just latest per person)"""
     user_id = request.args.get("user_id")
-    limit = request.args.get("limit", 30)  # Default to 30 items
+    limit = request.args.get("limit", 30, type=int)  # Default to 30 items
+    limit = max(1, min(limit or 30, app.config['PAGE_SIZE_MAX']))
+    before = request.args.get("before", type=int)  # hasread_id cursor from next_before
     
     if not user_id:
         return jsonify({"status": "error", "message": "Missing user_id"}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        # Get all recent reading activity from followed users
-        cursor.execute("""
-            SELECT 
-                hr.hasread_id,
-                hr.user_id,
-                u.username,
-                u.name,
-                hr.book_id,
-                b.title as book_title,
-                b.cover_url,
-                hr.date,
-                hr.review,
-                b.page_length
-            FROM HasRead hr
-            INNER JOIN Follows f ON hr.user_id = f.followee_id
-            INNER JOIN User u ON hr.user_id = u.user_id
-            INNER JOIN Book b ON hr.book_id = b.book_id
-            WHERE f.follower_id = %s
-            ORDER BY hr.date DESC, hr.hasread_id DESC
-            LIMIT %s
-        """, (user_id, limit))
-        
-        feed_items = cursor.fetchall()
-        cursor.close()
+        # Keyset page over the user's timeline, newest first
+        feed_items, next_before = feed_store.page(get_db(), user_id, before=before, limit=limit)
 
         # Convert date objects to strings for JSON serialization
         for item in feed_items:
             if item['date']:
                 item['date'] = item['date'].strftime('%Y-%m-%d')
 
-        return jsonify({"status": "success", "feed": feed_items}), 200
+        return jsonify({"status": "success", "feed": feed_items, "next_before": next_before}), 200
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1649,12 +2003,20 @@ def get_all_reading_activity():
 def get_user_reading_history(target_user_id):
     """Get reading history for a specific user (useful for profile pages)"""
     current_user_id = request.args.get("current_user_id")
-    limit = request.args.get("limit", 20)
     
     if not current_user_id:
         return jsonify({"status": "error", "message": "Missing current_user_id"}), 400
 
     try:
+        limit, after = page_args(2, unpaged_limit=20)
+        params = [target_user_id]
+        keyset = ""
+        if after:
+            clause, extra = pagination.after_clause(["hr.date", "hr.hasread_id"], after, descending=True)
+            keyset = f"AND {clause}"
+            params.extend(extra)
+        params.append(limit + 1)
+
         db = get_db()
         cursor = db.cursor(dictionary=True)
 
@@ -1670,7 +2032,7 @@ def get_user_reading_history(target_user_id):
                 return jsonify({"status": "error", "message": "You can only view reading history of users you follow"}), 403
 
         # Get reading history for the target user
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 hr.hasread_id,
                 hr.user_id,
@@ -1685,12 +2047,13 @@ def get_user_reading_history(target_user_id):
             FROM HasRead hr
             INNER JOIN User u ON hr.user_id = u.user_id
             INNER JOIN Book b ON hr.book_id = b.book_id
-            WHERE hr.user_id = %s
+            WHERE hr.user_id = %s {keyset}
             ORDER BY hr.date DESC, hr.hasread_id DESC
             LIMIT %s
-        """, (target_user_id, limit))
+        """, params)
         
-        reading_history = cursor.fetchall()
+        reading_history, next_cursor = pagination.trim(cursor.fetchall(), limit,
+                                                       lambda r: (r['date'], r['hasread_id']))
         cursor.close()
 
         # Convert date objects to strings for JSON serialization
@@ -1698,8 +2061,11 @@ def get_user_reading_history(target_user_id):
             if item['date']:
                 item['date'] = item['date'].strftime('%Y-%m-%d')
 
-        return jsonify({"status": "success", "reading_history": reading_history}), 200
+        return jsonify({"status": "success", "reading_history": reading_history,
+                        "next_cursor": next_cursor}), 200
 
+    except pagination.InvalidCursor as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -1737,6 +2103,15 @@ def delete_user():
             cursor.close()
             return jsonify({'status': 'error', 'message': 'Cannot delete admin user'}), 403
         
+        # Needs the user's HasRead and Book rows, so it runs before the cascade.
+        # Their reads, and every read of their books, are taken back by the
+        # event log worker.
+        event_log.append_removed(
+            db, "h.user_id = %s OR h.book_id IN (SELECT book_id FROM Book WHERE user_id = %s)",
+            (user_id, user_id))
+        admin_counters.user_removed(db, user_id)
+        book_listings.forget_user(db, user_id)
+
         # Delete user (books will be deleted automatically due to CASCADE)
         cursor.execute("DELETE FROM User WHERE user_id = %s", (user_id,))
         
@@ -1744,9 +2119,22 @@ def delete_user():
         if cursor.rowcount == 0:
             cursor.close()
             return jsonify({'status': 'error', 'message': 'Failed to delete user'}), 500
+
+        feed_store.forget_user(db, user_id)
+        suggestions.forget_user(db, user_id)
+        cache_epochs.bump(cursor, f'users.{user_id}')
         
         db.commit()
         cursor.close()
+        events.notify()
+
+        title_index.drop_user(user_id)
+        library_books.drop_user(user_id)
+        starred_sets.drop_user(user_id)
+        user_index.remove_user(user_id)
+        followee_sets.drop_user(user_id)
+        followee_sets.forget_followee(user_id)
+        responses.invalidate(f'user:{user_id}', 'users', 'books', 'reads')
         
         return jsonify({
             'status': 'success',
@@ -1763,91 +2151,73 @@ def delete_user():
 def get_all_users():
     """Get all users with their book counts for admin panel"""
     try:
+        limit, after = page_args(1)
+        params = []
+        keyset = ""
+        if after:
+            clause, extra = pagination.after_clause(["u.user_id"], after)
+            keyset = f"AND {clause}"
+            params.extend(extra)
+        if limit is not None:
+            params.append(limit + 1)
+
         db = get_db()
         cursor = db.cursor(dictionary=True)
         
         # Get all users with basic info (excluding admin)
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT u.user_id, u.username, u.name, u.age, 
                    COUNT(b.book_id) as book_count
             FROM User u 
             LEFT JOIN Book b ON u.user_id = b.user_id 
-            WHERE u.username != 'admin'
+            WHERE u.username != 'admin' {keyset}
             GROUP BY u.user_id, u.username, u.name, u.age
             ORDER BY u.user_id
-        """)
-        users = cursor.fetchall()
+            {"" if limit is None else "LIMIT %s"}
+        """, params)
+        users, next_cursor = pagination.trim(cursor.fetchall(), limit, lambda u: (u['user_id'],))
         cursor.close()
         
         # Convert count to int for JSON serialization
         for user in users:
             user['book_count'] = int(user['book_count'])
         
-        return jsonify({'status': 'success', 'users': users}), 200
+        return jsonify({'status': 'success', 'users': users, 'next_cursor': next_cursor}), 200
         
+    except pagination.InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 # Optional: Get user statistics for dashboard
 @app.route('/api/admin/stats', methods=['GET'])
+@responses.cached(lambda args: ['users', 'books', 'reads'])
 def get_admin_stats():
     """Get comprehensive statistics for the admin dashboard"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
-        # Total users (excluding admin)
-        cursor.execute("SELECT COUNT(*) as total_users FROM User WHERE username != 'admin'")
-        user_count = cursor.fetchone()['total_users']
-        
-        # Total books
-        cursor.execute("SELECT COUNT(*) as total_books FROM Book")
-        book_count = cursor.fetchone()['total_books']
-        
-        # Top 5 users with most books
-        cursor.execute("""
-            SELECT u.username, u.name, COUNT(b.book_id) as book_count
-            FROM User u 
-            LEFT JOIN Book b ON u.user_id = b.user_id 
-            WHERE u.username != 'admin'
-            GROUP BY u.user_id, u.username, u.name
-            ORDER BY book_count DESC
-            LIMIT 5
-        """)
-        top_users = cursor.fetchall()
-
-        # Total reads (entries in HasRead)
-        cursor.execute("SELECT COUNT(*) AS total_reads FROM HasRead")
-        total_reads = cursor.fetchone()['total_reads']
-
-        # Unique books read (distinct book_id)
-        cursor.execute("SELECT COUNT(DISTINCT book_id) AS unique_books_read FROM HasRead")
-        unique_books_read = cursor.fetchone()['unique_books_read']
-        
-        cursor.close()
-        
+        # Counters kept current by the write endpoints; see reconcile-admin-counters
         return jsonify({
             'status': 'success',
-            'stats': {
-                'total_users': int(user_count),
-                'total_books': int(book_count),
-                'total_reads': int(total_reads),
-                'unique_books_read': int(unique_books_read),
-                'top_users': top_users
-            }
+            'stats': admin_counters.fetch(get_db())
         }), 200
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/admin/metrics', methods=['GET'])
+def get_admin_metrics():
+    """Per-endpoint query latency and row histograms in Prometheus text format"""
+    pool = db_pool.stats()
+    gauges = [(f'bookapp_db_pool_{name}', f'Connection pool {name.replace("_", " ")}', pool[name])
+              for name in ('open', 'idle', 'in_use', 'overflow')]
+    return Response(query_stats.render_prometheus(gauges + events.gauges()),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 
 @app.route('/api/admin/analytics/weekly-reads', methods=['GET'])
 def get_weekly_reads():
     """Get the number of books read by all users for each day in the past week"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
         # Use UTC timezone to avoid timezone issues
         from datetime import datetime, timedelta, timezone
         
@@ -1856,49 +2226,12 @@ def get_weekly_reads():
         end_date = utc_now.date()
         start_date = end_date - timedelta(days=6)  # 7 days total including today
         
-        print(f"Debug: Date range from {start_date} to {end_date}")  # Debug log
-        
-        # Query to get reading counts by date for the past 7 days
-        # Using DATE() function to ensure we're grouping by date regardless of time
-        cursor.execute("""
-            SELECT 
-                DATE(date) as read_date,
-                COUNT(*) as books_read
-            FROM HasRead 
-            WHERE DATE(date) BETWEEN %s AND %s
-            GROUP BY DATE(date)
-            ORDER BY DATE(date) ASC
-        """, (start_date, end_date))
-        
-        results = cursor.fetchall()
-        
-        print(f"Debug: Database results: {results}")  # Debug log
-        
-        # Create a complete 7-day range with zero counts for missing days
-        date_counts = {}
-        for row in results:
-            # Handle both date and datetime objects
-            if hasattr(row['read_date'], 'strftime'):
-                date_key = row['read_date'].strftime('%Y-%m-%d')
-            else:
-                date_key = str(row['read_date'])
-            date_counts[date_key] = row['books_read']
-        
-        print(f"Debug: Date counts: {date_counts}")  # Debug log
-        
-        weekly_reads = []
-        current_date = start_date
-        for i in range(7):
-            date_str = current_date.strftime('%Y-%m-%d')
-            count = date_counts.get(date_str, 0)
-            weekly_reads.append({
-                'date': date_str,
-                'books_read': count
-            })
-            print(f"Debug: {date_str} -> {count} books")  # Debug log
-            current_date += timedelta(days=1)
-        
-        cursor.close()
+        # Daily buckets from the read rollups, missing days filled with zero
+        buckets = read_rollups.series(get_db(), 'day', start_date, end_date)
+        weekly_reads = [{
+            'date': day.strftime('%Y-%m-%d'),
+            'books_read': count
+        } for day, count in buckets]
         
         return jsonify({
             'status': 'success',
@@ -1910,13 +2243,52 @@ def get_weekly_reads():
             'debug_info': {
                 'server_timezone': str(utc_now.astimezone().tzinfo),
                 'utc_date': end_date.strftime('%Y-%m-%d'),
-                'raw_db_results': len(results)
+                'raw_db_results': sum(1 for _, count in buckets if count)
             }
         }), 200
         
     except Exception as e:
         print(f"Error in get_weekly_reads: {str(e)}")  # Debug log
         return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+# Window used when ?from= is omitted, per granularity
+READS_DEFAULT_SPAN = {'day': timedelta(days=29), 'week': timedelta(weeks=11), 'month': timedelta(days=365)}
+
+@app.route('/api/admin/analytics/reads', methods=['GET'])
+def get_read_analytics():
+    """Books read per day, week or month between two dates, zero-filled"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in read_rollups.GRANULARITIES:
+        return jsonify({'status': 'error', 'message': 'granularity must be day, week or month'}), 400
+
+    try:
+        end_date = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+        start_date = (date.fromisoformat(request.args['from']) if request.args.get('from')
+                      else end_date - READS_DEFAULT_SPAN[granularity])
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'from and to must be YYYY-MM-DD'}), 400
+
+    if start_date > end_date:
+        return jsonify({'status': 'error', 'message': 'from must not be after to'}), 400
+    if (end_date - start_date).days > read_rollups.MAX_BUCKETS:
+        return jsonify({'status': 'error', 'message': f'At most {read_rollups.MAX_BUCKETS} days per request'}), 400
+
+    try:
+        buckets = read_rollups.series(get_db(), granularity, start_date, end_date)
+        return jsonify({
+            'status': 'success',
+            'granularity': granularity,
+            'reads': [{'bucket': bucket.strftime('%Y-%m-%d'), 'books_read': count} for bucket, count in buckets],
+            'total': sum(count for _, count in buckets),
+            'date_range': {
+                'start': start_date.strftime('%Y-%m-%d'),
+                'end': end_date.strftime('%Y-%m-%d')
+            }
+        }), 200
+    except Exception as e:
+        print(f"❌ Read analytics error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
     
     
 @app.route('/api/admin/delete-book', methods=['DELETE'])
@@ -1964,7 +2336,13 @@ def delete_book():
             }), 404
         
         book_title = book['title']
-        
+
+        # The event log worker takes back the book's reads, and recomputes
+        # the summaries of everyone who read it
+        event_log.append_removed(db, "h.book_id = %s", (book_id,))
+        admin_counters.book_removed(db, user_id)
+        book_listings.book_removed(db, book_id)
+
         # Delete the book (this will also cascade delete from HasRead table if configured)
         cursor.execute("DELETE FROM Book WHERE book_id = %s AND user_id = %s", (book_id, user_id))
         
@@ -1975,10 +2353,18 @@ def delete_book():
                 'status': 'error',
                 'message': 'Failed to delete the book'
             }), 500
+        cache_epochs.bump(cursor, f'books.{user_id}')
         
         # Commit the transaction
         db.commit()
         cursor.close()
+        events.notify()
+
+        title_index.remove_book(user_id, book_id)
+        library_books.invalidate(user_id)
+        starred_sets.forget_book(book_id)
+        # Readers' cached summaries go when the worker applies the UNREAD events
+        responses.invalidate(f'user:{user_id}', 'books', 'reads')
         
         return jsonify({
             'status': 'success',
@@ -2020,6 +2406,11 @@ if __name__ == "__main__":
     print("- GET  /api/users            - Get all users (JSON)")
     print("- POST /api/users            - Add user (JSON)")
     print("- GET  /api/users/<id>       - Get single user (JSON)")
+    if pending_migrations:
+        print(f"❌ Pending schema migrations: {migrate.describe(pending_migrations)}")
+        print("Run `flask db-migrate` first")
+        raise SystemExit(1)
+
     print("\nServer starting on http://localhost:5000")
     
     app.run(port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import re
+
+from mysql.connector import errorcode, Error
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS SchemaMigrations (
+        version INT NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (version)
+    )
+    """,
+]
+
+# Errors meaning a statement's effect is already in place, so a migration
+# interrupted halfway (MySQL DDL is not transactional) can simply be re-run
+_ALREADY_APPLIED = {
+    errorcode.ER_DUP_KEYNAME,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_CANT_DROP_FIELD_OR_KEY,
+}
+
+_FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """[(version, name, path)] for every NNNN_name.sql file, in version order"""
+    found = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    found.sort()
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return found
+
+
+def statements(path):
+    """The statements of a migration file, with -- comments dropped"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    return [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+
+
+def applied(db):
+    cursor = db.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("SELECT version FROM SchemaMigrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def pending(db, directory=MIGRATIONS_DIR):
+    done = applied(db)
+    return [migration for migration in discover(directory) if migration[0] not in done]
+
+
+def describe(migrations):
+    return ', '.join(f"{version:04d}_{name}" for version, name, _ in migrations)
+
+
+def migrate(db, target=None, log=print, directory=MIGRATIONS_DIR):
+    """Apply pending migrations up to `target` (all by default); returns the versions applied"""
+    ran = []
+    cursor = db.cursor()
+    for version, name, path in pending(db, directory):
+        if target is not None and version > target:
+            break
+        log(f"Applying {version:04d}_{name}")
+        for statement in statements(path):
+            try:
+                cursor.execute(statement)
+            except Error as err:
+                if err.errno not in _ALREADY_APPLIED:
+                    raise
+                log(f"  already applied: {err.msg}")
+        cursor.execute("INSERT INTO SchemaMigrations (version, name) VALUES (%s, %s)", (version, name))
+        db.commit()
+        ran.append(version)
+    cursor.close()
+    return ran
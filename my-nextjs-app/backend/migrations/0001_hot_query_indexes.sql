@@ -0,0 +1,16 @@
+-- Composite indexes for the per-user listing and history queries in main.py.
+-- InnoDB secondary indexes carry the primary key, so (user_id, title) also
+-- covers the (title, book_id) keyset order used by the paginated endpoints.
+-- Author(name) and Publisher(name) get unique keys in 0004.
+
+-- /api/books/all, /api/books/letter, search index loads
+ALTER TABLE Book ADD INDEX idx_book_user_title (user_id, title);
+
+-- /api/books/page-range
+ALTER TABLE Book ADD INDEX idx_book_user_pages (user_id, page_length);
+
+-- /api/feed/user/<id> (newest first), challenge and rollup rebuilds
+ALTER TABLE HasRead ADD INDEX idx_hasread_user_date (user_id, date);
+
+-- mark-as-read duplicate check, /api/hasread
+ALTER TABLE HasRead ADD INDEX idx_hasread_user_book (user_id, book_id);
@@ -0,0 +1,7 @@
+-- Lookups behind suggestions.refresh_user, which must stay bounded per user.
+
+-- Heaviest readers of one author
+ALTER TABLE UserAuthorReads ADD INDEX idx_author_read_count (author_id, read_count);
+
+-- Most followed users, the fallback for users with no graph yet
+ALTER TABLE FollowerCounts ADD INDEX idx_followers (followers);
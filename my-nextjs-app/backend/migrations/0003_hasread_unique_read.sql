@@ -0,0 +1,13 @@
+-- One HasRead row per (user, book), so mark-as-read and its batch variant can
+-- dedupe with a multi-row INSERT ... ON DUPLICATE KEY UPDATE instead of
+-- checking first. Older duplicates keep their earliest row; the derived tables
+-- counted them, so run the rebuild-* commands after applying this.
+
+DELETE h FROM HasRead h
+JOIN HasRead earlier
+  ON earlier.user_id = h.user_id AND earlier.book_id = h.book_id AND earlier.hasread_id < h.hasread_id;
+
+-- Replaces the plain index from 0001; the unique key serves the same lookups
+ALTER TABLE HasRead
+  DROP INDEX idx_hasread_user_book,
+  ADD UNIQUE INDEX uq_hasread_user_book (user_id, book_id);
@@ -0,0 +1,37 @@
+-- Unique Author and Publisher names, which name_cache.NameCache and the bulk
+-- importer insert through. init_db used to add these keys on every startup.
+-- Names that already occur more than once (compared case-insensitively, like
+-- the column) are merged into their lowest id first. UserAuthorReads counted
+-- merged authors apart, so run rebuild-reading-stats after applying this.
+
+-- Point book links at the surviving id; IGNORE leaves links the book already has
+UPDATE IGNORE WrittenBy wb
+JOIN Author a ON a.author_id = wb.author_id
+JOIN (SELECT name, MIN(author_id) AS keep_id FROM Author GROUP BY name) keep ON keep.name = a.name
+SET wb.author_id = keep.keep_id
+WHERE wb.author_id <> keep.keep_id;
+
+DELETE wb FROM WrittenBy wb
+JOIN Author a ON a.author_id = wb.author_id
+JOIN Author earlier ON earlier.name = a.name AND earlier.author_id < a.author_id;
+
+DELETE a FROM Author a
+JOIN Author earlier ON earlier.name = a.name AND earlier.author_id < a.author_id;
+
+UPDATE IGNORE PublishedBy pb
+JOIN Publisher p ON p.publisher_id = pb.publisher_id
+JOIN (SELECT name, MIN(publisher_id) AS keep_id FROM Publisher GROUP BY name) keep ON keep.name = p.name
+SET pb.publisher_id = keep.keep_id
+WHERE pb.publisher_id <> keep.keep_id;
+
+DELETE pb FROM PublishedBy pb
+JOIN Publisher p ON p.publisher_id = pb.publisher_id
+JOIN Publisher earlier ON earlier.name = p.name AND earlier.publisher_id < p.publisher_id;
+
+DELETE p FROM Publisher p
+JOIN Publisher earlier ON earlier.name = p.name AND earlier.publisher_id < p.publisher_id;
+
+-- Databases that ran the old startup DDL already have these; re-adding is tolerated
+ALTER TABLE Author ADD UNIQUE KEY uq_author_name (name);
+
+ALTER TABLE Publisher ADD UNIQUE KEY uq_publisher_name (name);
@@ -0,0 +1,17 @@
+-- Fill the BookListings projection (book_listings.py) for books that predate
+-- it. Listings, the title search index and the library cache read only this
+-- table, so until it is filled existing users see empty libraries. init_db
+-- creates the table before migrations run. Same statement as
+-- book_listings.rebuild_all, and safe to re-run.
+
+INSERT INTO BookListings (book_id, user_id, title, issue, page_length, cover_url, authors)
+SELECT b.book_id, b.user_id, b.title, b.issue, b.page_length, b.cover_url,
+       LEFT(GROUP_CONCAT(DISTINCT a.name SEPARATOR ', '), 1024)
+FROM Book b
+LEFT JOIN WrittenBy wb ON b.book_id = wb.book_id
+LEFT JOIN Author a ON wb.author_id = a.author_id
+WHERE b.user_id IS NOT NULL
+GROUP BY b.book_id, b.user_id, b.title, b.issue, b.page_length, b.cover_url
+ON DUPLICATE KEY UPDATE
+    user_id = VALUES(user_id), title = VALUES(title), issue = VALUES(issue),
+    page_length = VALUES(page_length), cover_url = VALUES(cover_url), authors = VALUES(authors);
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+# kind -> (table, id column); both tables have a unique name key (migration 0004)
+TABLES = {
+    'author': ('Author', 'author_id'),
+    'publisher': ('Publisher', 'publisher_id'),
+}
+
+
+def _key(name):
+    # Author and Publisher use a case-insensitive collation
+    return name.casefold()
+
+
+class NameCache:
+    """Bounded LRU of Author/Publisher name -> id for the write paths.
+
+    Only ids that were already in the table are cached, so a rolled-back insert
+    never leaves a dangling id behind. The app never renames or deletes authors
+    and publishers; a migration that merges them (0004) must be followed by
+    clear(), in every process, or the write paths insert merged-away ids.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = {kind: OrderedDict() for kind in TABLES}
+        self._hits = {kind: 0 for kind in TABLES}
+        self._misses = {kind: 0 for kind in TABLES}
+        self._lock = threading.Lock()
+
+    def resolve(self, cursor, kind, name, extra=None):
+        """Id for `name`, inserting the row if it does not exist yet.
+
+        `extra` holds additional column values used only on insert,
+        e.g. {'date_of_birth': ...} for authors.
+        """
+        key = _key(name)
+        with self._lock:
+            entries = self._entries[kind]
+            if key in entries:
+                entries.move_to_end(key)
+                self._hits[kind] += 1
+                return entries[key]
+            self._misses[kind] += 1
+
+        table, id_column = TABLES[kind]
+        cursor.execute(f"SELECT {id_column} FROM {table} WHERE name = %s", (name,))
+        row = cursor.fetchone()
+        if row:
+            self._store(kind, key, row[0])
+            return row[0]
+
+        columns = ['name'] + list(extra or {})
+        values = [name] + list((extra or {}).values())
+        placeholders = ', '.join(['%s'] * len(columns))
+        # A concurrent insert of the same name turns into a no-op that still
+        # reports the existing id through LAST_INSERT_ID
+        cursor.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})
+            ON DUPLICATE KEY UPDATE {id_column} = LAST_INSERT_ID({id_column})
+        """, values)
+        return cursor.lastrowid
+
+    def clear(self, kind=None):
+        """Forget the cached ids of `kind`, or of every kind"""
+        with self._lock:
+            for k in [kind] if kind else TABLES:
+                self._entries[k].clear()
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for kind in TABLES:
+                hits, misses = self._hits[kind], self._misses[kind]
+                report[kind] = {
+                    "entries": len(self._entries[kind]),
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                }
+            return report
+
+    def _store(self, kind, key, value):
+        with self._lock:
+            entries = self._entries[kind]
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import date, datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(values):
+    """Opaque token for the sort key (plus tiebreaker) of the last row on a page"""
+    plain = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    payload = json.dumps(plain, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Cursor does not match this endpoint")
+    return values
+
+
+def parse(args, key_size, default_limit=100, max_limit=1000, unpaged_limit=None, source=None):
+    """Read ?limit= and ?cursor= from request args; returns (limit, key values or None).
+
+    A request with neither parameter gets `unpaged_limit`, None meaning every
+    row, so clients written before pagination are not silently truncated.
+    A `source` must match the one the cursor was issued with (see trim).
+    """
+    token = args.get('cursor')
+    if 'limit' not in args and not token:
+        return unpaged_limit, None
+    limit = args.get('limit', default_limit, type=int)
+    limit = max(1, min(limit or default_limit, max_limit))
+    if not token:
+        return limit, None
+    if source is None:
+        return limit, decode_cursor(token, key_size)
+    values = decode_cursor(token, key_size + 1)
+    if values[0] != source:
+        raise InvalidCursor("Cursor does not match this endpoint")
+    return limit, values[1:]
+
+
+def fetch_size(limit):
+    """Rows to fetch for a page: one extra shows whether another page follows"""
+    return None if limit is None else limit + 1
+
+
+def after_clause(columns, values, descending=False):
+    """SQL predicate for rows strictly after `values` in ORDER BY `columns` order.
+
+    Expanded into OR'd equality prefixes rather than a row constructor so MySQL
+    can turn it into an index range scan.
+    """
+    op = '<' if descending else '>'
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        parts = [f"{prev} = %s" for prev in columns[:i]] + [f"{column} {op} %s"]
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def trim(rows, limit, key, source=None):
+    """Cut a `limit + 1` fetch down to one page; returns (rows, next_cursor or None).
+
+    Give a `source` when an endpoint can page the same rows in more than one
+    order, e.g. MySQL collation versus an in-memory sort key. The cursor
+    carries it, and parse() with another source (or none) rejects it.
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    key_values = list(key(rows[-1]))
+    return rows, encode_cursor([source] + key_values if source else key_values)
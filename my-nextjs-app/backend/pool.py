@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout"""
+
+
+class _Entry:
+    """A pooled connection plus the time it was opened"""
+
+    __slots__ = ('conn', 'created_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+
+
+def _default_ping(conn):
+    """Raise if the connection is no longer usable"""
+    if hasattr(conn, 'ping'):
+        conn.ping(reconnect=False)
+    else:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+
+
+class ConnectionPool:
+    """Connection pool with overflow, age-based recycling and a health check on checkout.
+
+    `creator` is any zero-argument callable returning a DB-API connection, so the
+    pool works the same with mysql.connector or a sqlite3 stand-in.
+    """
+
+    def __init__(self, creator, size=5, max_overflow=10, recycle=3600,
+                 pre_ping=True, timeout=30, ping=_default_ping):
+        self._creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+        self._ping = ping
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._checked_out = {}
+        self._lock = threading.Lock()
+        self._open = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._invalidated = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        started = time.perf_counter()
+        entry = self._checkout(started)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._checked_out[id(entry.conn)] = entry
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        return entry.conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding it if broken or surplus"""
+        with self._lock:
+            entry = self._checked_out.pop(id(conn), None)
+        if entry is None:
+            return
+
+        try:
+            # Never hand the next request someone else's open transaction
+            conn.rollback()
+        except Exception:
+            self._discard(entry, invalidated=True)
+            return
+
+        try:
+            self._idle.put_nowait(entry)
+        except queue.Full:
+            self._discard(entry)
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(entry)
+
+    def stats(self):
+        """Snapshot of pool usage for /api/health"""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "in_use": len(self._checked_out),
+                "overflow": max(0, self._open - self.size),
+                "checkouts": checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "invalidated": self._invalidated,
+                "avg_checkout_ms": round(self._checkout_time_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                "max_checkout_ms": round(self._checkout_time_max * 1000, 3),
+            }
+
+    def _checkout(self, started):
+        waited = False
+        deadline = started + self.timeout
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                entry = None
+
+            if entry is not None:
+                entry = self._validate(entry)
+                if entry is not None:
+                    return entry
+                continue
+
+            if self._reserve_slot():
+                return self._connect()
+
+            if not waited:
+                waited = True
+                with self._lock:
+                    self._waits += 1
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolTimeout(
+                    f"No database connection available after {self.timeout}s "
+                    f"(size={self.size}, max_overflow={self.max_overflow})"
+                )
+            # Poll in short slices so slots freed by discarded connections are noticed too
+            try:
+                entry = self._idle.get(timeout=min(remaining, 0.05))
+            except queue.Empty:
+                continue
+            entry = self._validate(entry)
+            if entry is not None:
+                return entry
+
+    def _validate(self, entry):
+        """Return a usable entry for `entry`, replacing it when stale or dead"""
+        if self.recycle is not None and self.recycle >= 0 \
+                and time.monotonic() - entry.created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return self._replace(entry)
+
+        if self.pre_ping:
+            try:
+                self._ping(entry.conn)
+            except Exception:
+                with self._lock:
+                    self._invalidated += 1
+                return self._replace(entry)
+        return entry
+
+    def _replace(self, entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        try:
+            return self._connect(counted=True)
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._open < self.size + self.max_overflow:
+                self._open += 1
+                return True
+            return False
+
+    def _connect(self, counted=False):
+        """Open a new connection for a slot already reserved in `_open`"""
+        try:
+            conn = self._creator()
+        except Exception:
+            if not counted:
+                with self._lock:
+                    self._open -= 1
+            raise
+        with self._lock:
+            self._created += 1
+        return _Entry(conn)
+
+    def _discard(self, entry, invalidated=False):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+            if invalidated:
+                self._invalidated += 1
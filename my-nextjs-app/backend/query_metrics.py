@@ -0,0 +1,345 @@
+import bisect
+import hashlib
+import logging
+import re
+import threading
+from time import perf_counter
+
+# Histogram bucket upper bounds; +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+_WHITESPACE = re.compile(r'\s+')
+_VERB = re.compile(r'\s*(?:/\*.*?\*/\s*)*(\w+)', re.S)
+# Lists whose length varies per call: IN (%s, %s, ...) and multi-row VALUES
+_IN_LIST = re.compile(r'\bIN\s*\(\s*(?:%s|\d+)(?:\s*,\s*(?:%s|\d+))*\s*\)', re.I)
+_VALUES_ROWS = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.I)
+# Raw statement texts remembered with their canonical form; the memo is reset past this
+_MAX_TEXTS = 10000
+# Fingerprint prefixes of statements whose row count comes from fetching
+_READS = ('select_', 'with_', 'show_')
+# Registering a thread's shard past this many first folds in those of dead threads
+_MAX_LIVE_SHARDS = 64
+
+log = logging.getLogger('bookapp.slow_queries')
+
+
+def canonical(sql):
+    """Statement text with whitespace normalized and variable-length lists
+    collapsed, so IN lists of 2 and of 1000 placeholders are one statement"""
+    text = _WHITESPACE.sub(' ', sql).strip()
+    text = _IN_LIST.sub('IN (...)', text)
+    return _VALUES_ROWS.sub(r'VALUES \1, ...', text)
+
+
+class _Series:
+    """Latency and row histograms for one statement text under one endpoint"""
+
+    __slots__ = ('reads', 'latency', 'seconds', 'rows', 'row_total', 'count')
+
+    def __init__(self, reads):
+        self.reads = reads
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.rows = [0] * (len(ROW_BUCKETS) + 1)
+        self.row_total = 0
+        self.count = 0
+
+    def merge(self, other):
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.rows = [a + b for a, b in zip(self.rows, other.rows)]
+        self.seconds += other.seconds
+        self.row_total += other.row_total
+        self.count += other.count
+
+
+class QueryMetrics:
+    """Per (endpoint, statement) latency and row-count histograms.
+
+    Executions are keyed by canonical() statement text in a per-thread shard,
+    which keeps the per-query cost to dict lookups with no lock taken; at
+    render time shards are merged and statements grouped by a fingerprint of
+    that text, so call sites sharing a query share a series and queries
+    built with a variable number of placeholders stay one series.
+    Statements slower than `slow_threshold` seconds are logged with their
+    parameters reduced to types.
+    """
+
+    def __init__(self, slow_threshold=0.2, enabled=True, max_text=200):
+        self.slow_threshold = slow_threshold
+        self.enabled = enabled
+        self.max_text = max_text
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._fingerprints = {}
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._slow = 0
+
+    def fingerprint(self, sql):
+        """Short stable id for a statement, e.g. 'select_3f2a9c1b'"""
+        text = self._canonical(sql)
+        found = self._fingerprints.get(text)
+        if found is None:
+            verb = _VERB.match(text)
+            found = '{}_{}'.format((verb.group(1) if verb else 'sql').lower(),
+                                   hashlib.sha1(text.encode()).hexdigest()[:8])
+            self._fingerprints[text] = found
+        return found
+
+    def _canonical(self, sql):
+        found = self._texts.get(sql)
+        if found is None:
+            # Statements with inlined values could otherwise grow this without bound
+            if len(self._texts) >= _MAX_TEXTS:
+                self._texts.clear()
+            found = self._texts[sql] = canonical(sql)
+        return found
+
+    def record(self, endpoint, sql, seconds, rows, cursor=None):
+        """One finished execution; `cursor` supplies rowcount for writes"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                if len(self._shards) >= _MAX_LIVE_SHARDS:
+                    self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        key = (endpoint, self._canonical(sql))
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = _Series(self.fingerprint(sql).startswith(_READS))
+        if not rows and not series.reads and cursor is not None:
+            # Writes fetch nothing; what they touched is in rowcount
+            rows = max(cursor.rowcount or 0, 0)
+        series.latency[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.seconds += seconds
+        series.rows[bisect.bisect_left(ROW_BUCKETS, rows)] += 1
+        series.row_total += rows
+        series.count += 1
+
+    def slow(self, endpoint, sql, seconds, params=None):
+        with self._lock:
+            self._slow += 1
+        log.warning("slow query %.1f ms endpoint=%s query=%s params=%s sql=%s",
+                    seconds * 1000, endpoint, self.fingerprint(sql), redact(params),
+                    _WHITESPACE.sub(' ', sql).strip()[:self.max_text])
+
+    def wrap(self, conn, endpoint):
+        """`conn` with every cursor it hands out timed under `endpoint`"""
+        if not self.enabled:
+            return conn
+        return InstrumentedConnection(conn, self, endpoint)
+
+    def stats(self):
+        grouped, _ = self._merged()
+        return {
+            "statements": len({fingerprint for _, fingerprint in grouped}),
+            "series": len(grouped),
+            "executions": sum(series.count for series in grouped.values()),
+            "slow": self._slow,
+        }
+
+    def render_prometheus(self, extra_gauges=()):
+        """Prometheus text exposition of everything recorded so far.
+
+        `extra_gauges` is an iterable of (name, help, value) appended as-is.
+        """
+        grouped, texts = self._merged()
+        slow = self._slow
+        series = sorted(grouped.items())
+        lines = []
+        _histogram_lines(lines, 'bookapp_query_duration_seconds',
+                         'Time spent in cursor.execute per statement', LATENCY_BUCKETS,
+                         [(key, s.latency, s.seconds, s.count) for key, s in series])
+        _histogram_lines(lines, 'bookapp_query_rows',
+                         'Rows fetched (or written) per statement execution', ROW_BUCKETS,
+                         [(key, s.rows, s.row_total, s.count) for key, s in series])
+        lines.append('# HELP bookapp_slow_queries_total Statements over the slow-query threshold')
+        lines.append('# TYPE bookapp_slow_queries_total counter')
+        lines.append(f'bookapp_slow_queries_total {slow}')
+        lines.append('# HELP bookapp_query_info SQL text behind each query fingerprint')
+        lines.append('# TYPE bookapp_query_info gauge')
+        for fingerprint, sql in sorted(texts.items()):
+            text = sql[:self.max_text]
+            lines.append(f'bookapp_query_info{{query="{fingerprint}",sql="{_escape(text)}"}} 1')
+        for name, help_text, value in extra_gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _merged(self):
+        """Every shard folded into {(endpoint, fingerprint): _Series}, plus a text per fingerprint"""
+        with self._lock:
+            self._retire_dead_shards()
+            shards = [self._retired] + [shard for _, shard in self._shards]
+            grouped, texts = {}, {}
+            for shard in shards:
+                # Copied first: the owning thread may add keys while we read
+                for (endpoint, sql), series in list(shard.items()):
+                    fingerprint = self.fingerprint(sql)
+                    texts.setdefault(fingerprint, sql)
+                    total = grouped.get((endpoint, fingerprint))
+                    if total is None:
+                        total = grouped[(endpoint, fingerprint)] = _Series(series.reads)
+                    total.merge(series)
+        return grouped, texts
+
+    def _retire_dead_shards(self):
+        """Fold shards of finished threads into one; call with the lock held.
+
+        The threaded dev server runs each request on a fresh thread, so
+        without this the shard list would grow by one per request.
+        """
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            for key, series in shard.items():
+                total = self._retired.get(key)
+                if total is None:
+                    total = self._retired[key] = _Series(series.reads)
+                total.merge(series)
+        self._shards = live
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors report to a QueryMetrics"""
+
+    def __init__(self, conn, metrics, endpoint):
+        self.raw = conn
+        self._metrics = metrics
+        self._endpoint = endpoint
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self.raw.cursor(*args, **kwargs), self._metrics, self._endpoint)
+        self._cursors.append(cursor)
+        return cursor
+
+    def flush(self):
+        """Record executions still pending on cursors that were never closed"""
+        for cursor in self._cursors:
+            cursor._record()
+        self._cursors.clear()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class InstrumentedCursor:
+    """Times execute/executemany and counts rows as they are fetched.
+
+    An execution is recorded once its row count is final: on the next
+    execute, on close, or when the owning connection is flushed.
+    """
+
+    __slots__ = ('raw', '_metrics', '_endpoint', '_sql', '_seconds', '_rows')
+
+    def __init__(self, cursor, metrics, endpoint):
+        self.raw = cursor
+        self._metrics = metrics
+        self._endpoint = endpoint
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        if self._sql is not None:
+            self._record()
+        started = perf_counter()
+        try:
+            return self.raw.execute(operation, params, *args, **kwargs)
+        finally:
+            self._seconds = seconds = perf_counter() - started
+            self._sql = operation
+            if seconds >= self._metrics.slow_threshold:
+                self._metrics.slow(self._endpoint, operation, seconds, params)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        if self._sql is not None:
+            self._record()
+        started = perf_counter()
+        try:
+            return self.raw.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._seconds = seconds = perf_counter() - started
+            self._sql = operation
+            if seconds >= self._metrics.slow_threshold:
+                self._metrics.slow(self._endpoint, operation, seconds)
+
+    def fetchone(self):
+        row = self.raw.fetchone()
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.raw.fetchmany(*args, **kwargs)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.raw.fetchall()
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        if self._sql is not None:
+            self._record()
+        return self.raw.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def _record(self):
+        if self._sql is not None:
+            self._metrics.record(self._endpoint, self._sql, self._seconds, self._rows, self.raw)
+            self._sql = None
+            self._rows = 0
+
+
+def redact(params):
+    """Parameter types and sizes only, never their values"""
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {_describe(v)}' for k, v in params.items()) + '}'
+    return '(' + ', '.join(_describe(v) for v in params) + ')'
+
+
+def _describe(value):
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__} len={len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _histogram_lines(lines, name, help_text, bounds, series):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (endpoint, query), counts, total, count in series:
+        labels = f'endpoint="{_escape(endpoint)}",query="{query}"'
+        cumulative = 0
+        for bound, bucket in zip(bounds, counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{{labels}}} {total:g}')
+        lines.append(f'{name}_count{{{labels}}} {count}')
@@ -0,0 +1,85 @@
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS BookYearReads (
+        year SMALLINT NOT NULL,
+        book_id INT NOT NULL,
+        read_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, book_id),
+        KEY idx_year_read_count (year, read_count),
+        KEY idx_book (book_id)
+    )
+    """,
+]
+
+_APPLY_READS = """
+    INSERT INTO BookYearReads (year, book_id, read_count) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE read_count = read_count + VALUES(read_count)
+"""
+
+_REBUILD = """
+    INSERT INTO BookYearReads (year, book_id, read_count)
+    SELECT YEAR(h.date), h.book_id, COUNT(*)
+    FROM {reads} h
+    WHERE h.date IS NOT NULL
+    GROUP BY YEAR(h.date), h.book_id
+"""
+
+
+def record_reads(db, reads):
+    """Add (book_id, date, delta) reads to their books' yearly totals; a delta
+    of -1 takes back a deleted read"""
+    totals = {}
+    for book_id, day, delta in reads:
+        totals[(day.year, book_id)] = totals.get((day.year, book_id), 0) + delta
+    cursor = db.cursor()
+    cursor.executemany(_APPLY_READS, [(year, book_id, delta)
+                                      for (year, book_id), delta in totals.items() if delta])
+    emptied = [key for key, delta in totals.items() if delta < 0]
+    if emptied:
+        cursor.executemany("DELETE FROM BookYearReads WHERE year = %s AND book_id = %s AND read_count <= 0",
+                           emptied)
+    cursor.close()
+
+
+def clear(db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookYearReads")
+    cursor.close()
+
+
+def rebuild_all(db, reads=None):
+    """`reads` is an optional (query, params) standing in for HasRead, such as
+    the reads the event log has counted so far"""
+    source, params = (f"({reads[0]})", reads[1]) if reads else ("HasRead", ())
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM BookYearReads")
+    cursor.execute(_REBUILD.format(reads=source), params)
+    cursor.execute("SELECT COUNT(*) FROM BookYearReads")
+    rows = cursor.fetchone()[0]
+    cursor.close()
+    return rows
+
+
+def top(db, year, limit=10):
+    """The `limit` most read books of a year, read off the (year, read_count) index.
+    Joining Book skips a deleted book whose reads the event log has yet to take back."""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT r.book_id, b.title, r.read_count
+        FROM BookYearReads r
+        JOIN Book b ON b.book_id = r.book_id
+        WHERE r.year = %s
+        ORDER BY r.read_count DESC, r.book_id
+        LIMIT %s
+    """, (year, limit))
+    books = cursor.fetchall()
+    cursor.close()
+    return books
+
+
+def years(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT DISTINCT year FROM BookYearReads ORDER BY year DESC")
+    found = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return found
@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ReadRollups (
+        granularity ENUM('day', 'week', 'month') NOT NULL,
+        bucket DATE NOT NULL,
+        books_read INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket)
+    )
+    """,
+]
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Longest series one request may ask for
+MAX_BUCKETS = 3660
+
+# First day of the bucket holding h.date; weeks start on Monday
+_BUCKET = """
+    CASE g.granularity
+        WHEN 'day' THEN h.date
+        WHEN 'week' THEN h.date - INTERVAL WEEKDAY(h.date) DAY
+        ELSE h.date - INTERVAL (DAYOFMONTH(h.date) - 1) DAY
+    END
+"""
+
+_GRANULARITY_ROWS = "(SELECT 'day' AS granularity UNION ALL SELECT 'week' UNION ALL SELECT 'month')"
+
+_APPLY_READS = """
+    INSERT INTO ReadRollups (granularity, bucket, books_read) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE books_read = books_read + VALUES(books_read)
+"""
+
+_REBUILD = f"""
+    INSERT INTO ReadRollups (granularity, bucket, books_read)
+    SELECT g.granularity, {_BUCKET} AS bucket, COUNT(*)
+    FROM {{reads}} h
+    CROSS JOIN {_GRANULARITY_ROWS} g
+    GROUP BY g.granularity, bucket
+"""
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def record_reads(db, reads):
+    """Add (book_id, date, delta) reads to their day, week and month; a delta of
+    -1 takes back a deleted read"""
+    totals = {}
+    for _, day, delta in reads:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(day, granularity))
+            totals[key] = totals.get(key, 0) + delta
+    cursor = db.cursor()
+    cursor.executemany(_APPLY_READS, [(granularity, bucket, delta)
+                                      for (granularity, bucket), delta in totals.items() if delta])
+    cursor.close()
+
+
+def clear(db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM ReadRollups")
+    cursor.close()
+
+
+def rebuild_all(db, reads=None):
+    """`reads` is an optional (query, params) standing in for HasRead, such as
+    the reads the event log has counted so far"""
+    source, params = (f"({reads[0]})", reads[1]) if reads else ("HasRead", ())
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM ReadRollups")
+    cursor.execute(_REBUILD.format(reads=source), params)
+    cursor.execute("SELECT COUNT(*) FROM ReadRollups")
+    rows = cursor.fetchone()[0]
+    cursor.close()
+    return rows
+
+
+def series(db, granularity, start, end):
+    """[(bucket start, books read)] for every bucket from start to end, zeros included"""
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT bucket, books_read FROM ReadRollups
+        WHERE granularity = %s AND bucket BETWEEN %s AND %s
+    """, (granularity, first, last))
+    counts = dict(cursor.fetchall())
+    cursor.close()
+
+    buckets = []
+    current = first
+    while current <= last:
+        buckets.append((current, counts.get(current, 0)))
+        current = next_bucket(current, granularity)
+    return buckets
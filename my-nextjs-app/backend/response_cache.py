@@ -0,0 +1,236 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import request, make_response
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL; each worker process keeps its own"""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value, tags)
+        self._tags = {}                 # tag -> set of keys
+        self._generations = {}          # tag -> invalidation count
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def generations(self, tags):
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, ttl, tags, generations):
+        """Store unless a tag was invalidated since `generations` was read; returns whether stored"""
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in tags) != generations:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, tags):
+        with self._lock:
+            dropped = 0
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._drop(key)
+                        dropped += 1
+            return dropped
+
+    def size(self):
+        return len(self._entries)
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    """Redis (or any server speaking its protocol) shared by every worker.
+
+    Each entry is a hash with a TTL; each tag is a set of entry keys, so an
+    invalidation deletes exactly the entries carrying that tag. Each tag also
+    has a generation counter that invalidations increment.
+    """
+
+    TAG_TTL = 86400
+
+    def __init__(self, url, prefix='rc:'):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND = 'redis' needs the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        entry = self.client.hgetall(self.prefix + key)
+        if not entry:
+            return None
+        return (int(entry[b'status']), entry[b'mimetype'].decode(), entry[b'body'], entry[b'etag'].decode())
+
+    def generations(self, tags):
+        return tuple(self.client.mget(self._generation_keys(tags))) if tags else ()
+
+    def set(self, key, value, ttl, tags, generations):
+        """Store unless a tag was invalidated since `generations` was read; returns whether stored"""
+        status, mimetype, body, etag = value
+        generation_keys = self._generation_keys(tags)
+        with self.client.pipeline() as pipe:
+            try:
+                # An invalidation between this check and EXEC aborts the transaction
+                if generation_keys:
+                    pipe.watch(*generation_keys)
+                    if tuple(pipe.mget(generation_keys)) != generations:
+                        return False
+                pipe.multi()
+                pipe.hset(self.prefix + key, mapping={
+                    'status': status, 'mimetype': mimetype, 'body': body, 'etag': etag,
+                })
+                pipe.expire(self.prefix + key, ttl)
+                for tag in tags:
+                    pipe.sadd(self.prefix + 'tag:' + tag, key)
+                    # Outlives any entry it points at; stale members are harmless
+                    pipe.expire(self.prefix + 'tag:' + tag, max(ttl, self.TAG_TTL))
+                pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    def invalidate(self, tags):
+        dropped = 0
+        pipe = self.client.pipeline()
+        for generation_key in self._generation_keys(tags):
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, self.TAG_TTL)
+        pipe.execute()
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self.client.smembers(tag_key)
+            if keys:
+                dropped += self.client.delete(*(self.prefix + k.decode() for k in keys))
+            self.client.delete(tag_key)
+        return dropped
+
+    def size(self):
+        return None
+
+    def _generation_keys(self, tags):
+        return [self.prefix + 'gen:' + tag for tag in tags]
+
+
+def make_backend(config):
+    if config['RESPONSE_CACHE_BACKEND'] == 'redis':
+        return RedisBackend(config['RESPONSE_CACHE_REDIS_URL'])
+    return MemoryBackend(config['RESPONSE_CACHE_MAX_ENTRIES'])
+
+
+class ResponseCache:
+    """Caches successful JSON responses of read endpoints, keyed by path and query.
+
+    Every entry carries tags such as 'user:7' or 'year:2024'; write endpoints
+    call invalidate() with the tags they affect after committing. Responses
+    carry an ETag whether or not they came from the cache, and a matching
+    If-None-Match gets a 304 with no body.
+
+    A response computed while a write to one of its tags committed may
+    predate that write. So the tags' generations are read before the view
+    runs, and the response is only stored if none has moved since.
+    """
+
+    def __init__(self, backend, default_ttl=60, enabled=True):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self._hits = 0
+        self._misses = 0
+        self._invalidated = 0
+        self._stale_skipped = 0
+
+    def cached(self, tags, ttl=None):
+        """Decorator; `tags(args, **view_args)` returns the tags for a request"""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*view_args, **view_kwargs):
+                key = self._key()
+                hit = self.backend.get(key) if self.enabled else None
+                if hit is not None:
+                    self._hits += 1
+                    status, mimetype, body, etag = hit
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    response.set_etag(etag)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response.make_conditional(request)
+
+                self._misses += 1
+                if self.enabled:
+                    entry_tags = [str(tag) for tag in tags(request.args, **view_kwargs)]
+                    generations = self.backend.generations(entry_tags)
+                response = make_response(view(*view_args, **view_kwargs))
+                if response.status_code != 200 or response.direct_passthrough or not response.is_json:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                response.set_etag(etag)
+                if self.enabled:
+                    if not self.backend.set(key, (200, response.mimetype, body, etag),
+                                            ttl or self.default_ttl, entry_tags, generations):
+                        self._stale_skipped += 1
+                    response.headers['X-Cache'] = 'MISS'
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of `tags`"""
+        if not tags:
+            return 0
+        dropped = self.backend.invalidate([str(tag) for tag in tags])
+        self._invalidated += dropped or 0
+        return dropped
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "invalidated": self._invalidated,
+            "stale_skipped": self._stale_skipped,
+        }
+
+    @staticmethod
+    def _key():
+        return request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
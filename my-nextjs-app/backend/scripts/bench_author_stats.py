@@ -0,0 +1,121 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mysql.connector
+
+from config import Config
+from main import AUTHOR_STATS_QUERY
+
+AUTHORS = 200
+BOOKS = 5000
+ROUNDS = 30
+
+
+class CountingCursor:
+    """Wraps a cursor and counts statements sent to the server"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.round_trips = 0
+
+    def execute(self, query, params=None):
+        self.round_trips += 1
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def legacy_author_stats(cursor, user_id):
+    """The previous N+1 implementation: top-10 query plus three queries per author"""
+    cursor.execute("""
+        SELECT a.author_id, a.name AS author_name, COUNT(b.book_id) AS num_books
+        FROM Author a
+        JOIN WrittenBy wb ON a.author_id = wb.author_id
+        JOIN Book b ON b.book_id = wb.book_id
+        WHERE b.user_id = %s
+        GROUP BY a.author_id, a.name
+        ORDER BY num_books DESC
+        LIMIT 10
+    """, (user_id,))
+    stats = []
+    for author in cursor.fetchall():
+        cursor.execute("""
+            SELECT MIN(b.page_length) AS min_page_length, MAX(b.page_length) AS max_page_length,
+                   ROUND(AVG(b.page_length), 1) AS avg_page_length, COUNT(b.book_id) AS books_with_pages
+            FROM Book b
+            JOIN WrittenBy wb ON b.book_id = wb.book_id
+            WHERE wb.author_id = %s AND b.user_id = %s AND b.page_length IS NOT NULL
+        """, (author['author_id'], user_id))
+        page_stats = cursor.fetchone()
+        for length in (page_stats['min_page_length'], page_stats['max_page_length']):
+            cursor.execute("""
+                SELECT b.title FROM Book b
+                JOIN WrittenBy wb ON b.book_id = wb.book_id
+                WHERE wb.author_id = %s AND b.user_id = %s AND b.page_length = %s
+                LIMIT 1
+            """, (author['author_id'], user_id, length))
+            cursor.fetchone()
+        stats.append(page_stats)
+    return stats
+
+
+def set_based_author_stats(cursor, user_id):
+    cursor.execute(AUTHOR_STATS_QUERY, (user_id,))
+    return cursor.fetchall()
+
+
+def seed(cursor, rng):
+    """Insert one user with BOOKS books spread over AUTHORS authors (skewed towards a few)"""
+    cursor.execute("INSERT INTO User (username, password, name) VALUES (%s, 'x', 'Bench')",
+                   (f"bench_{rng.randrange(10**9)}",))
+    user_id = cursor.lastrowid
+
+    author_ids = []
+    for i in range(AUTHORS):
+        cursor.execute("INSERT INTO Author (name) VALUES (%s)", (f"Bench Author {i}",))
+        author_ids.append(cursor.lastrowid)
+
+    weights = [1 / (rank + 1) for rank in range(AUTHORS)]
+    for i in range(BOOKS):
+        pages = rng.choice([None, rng.randint(80, 1200)])
+        cursor.execute("INSERT INTO Book (title, page_length, user_id) VALUES (%s, %s, %s)",
+                       (f"Bench Book {i}", pages, user_id))
+        cursor.execute("INSERT INTO WrittenBy (book_id, author_id) VALUES (%s, %s)",
+                       (cursor.lastrowid, rng.choices(author_ids, weights)[0]))
+    return user_id
+
+
+def measure(fn, cursor, user_id):
+    samples = []
+    cursor.round_trips = 0
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn(cursor, user_id)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return cursor.round_trips / ROUNDS, samples
+
+
+if __name__ == '__main__':
+    conn = mysql.connector.connect(host=Config.DB_HOST, user=Config.DB_USER,
+                                   password=Config.DB_PASSWORD, database=Config.DB_DATABASE,
+                                   port=Config.DB_PORT)
+    cursor = CountingCursor(conn.cursor(dictionary=True))
+    try:
+        # Seed inside the transaction and roll back at the end so nothing persists
+        user_id = seed(cursor, random.Random(348))
+        print(f"Seeded {BOOKS} books over {AUTHORS} authors for user {user_id}")
+        for name, fn in (('legacy N+1', legacy_author_stats), ('set-based', set_based_author_stats)):
+            trips, samples = measure(fn, cursor, user_id)
+            print(f"{name:<11} round-trips/request {trips:5.1f}   "
+                  f"p50 {statistics.median(samples):7.2f} ms   max {max(samples):7.2f} ms")
+            if fn is set_based_author_stats and trips > 1:
+                sys.exit(f"Regression: /api/author-stats issued {trips:.1f} queries per request")
+    finally:
+        conn.rollback()
+        conn.close()
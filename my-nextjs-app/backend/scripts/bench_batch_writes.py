@@ -0,0 +1,53 @@
+import argparse
+import json
+
+from bench_endpoints import MANIFEST, Dataset, _distinct, _follow_batch, _json, _toggle_batch, run
+
+
+def scenarios(size):
+    """(name, single-row request factory, batch request factory) for each batched write"""
+    return [
+        ('mark-as-read',
+         _json('POST', lambda r, d: f'/api/mark-as-read?username={d.user(r)}', lambda r, d: {'book_id': d.book(r)}),
+         _json('POST', lambda r, d: f'/api/mark-as-read/batch?username={d.user(r)}',
+               lambda r, d: {'books': [{'book_id': book_id} for book_id in _distinct(r, d.books, size)]})),
+        ('star',
+         _json('POST', lambda r, d: f'/api/star?username={d.user(r)}', lambda r, d: {'book_id': d.book(r)}),
+         _json('POST', lambda r, d: f'/api/star/batch?username={d.user(r)}',
+               lambda r, d: _toggle_batch('star', 'unstar', _distinct(r, d.books, size)))),
+        ('follow',
+         _json('POST', lambda r, d: '/api/follow', lambda r, d: dict(
+             zip(('follower_id', 'followee_id'), _distinct(r, d.users, 2)))),
+         _json('POST', lambda r, d: '/api/follow/batch', lambda r, d: _follow_batch(r, d, size))),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rows written per second by the single-row write routes against their /batch variants")
+    parser.add_argument('--base', default='http://127.0.0.1:5000', help='server under test')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5, help='seconds per route')
+    parser.add_argument('--batch-size', type=int, default=50, help='rows per batch request')
+    parser.add_argument('--manifest', default=MANIFEST, help='written by seed_dataset.py')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding='utf-8') as f:
+        data = Dataset(json.load(f))
+
+    print(f"{args.base}: {args.concurrency} clients, {args.duration:g}s per route, batches of {args.batch_size}")
+    print(f"{'write':<14} {'single rows/s':>14} {'batch rows/s':>14} {'speedup':>8} {'batch p95':>10} {'errors':>7}")
+    for name, single, batch in scenarios(args.batch_size):
+        one = run(args.base, single, data, args.concurrency, args.duration, args.seed)
+        many = run(args.base, batch, data, args.concurrency, args.duration, args.seed)
+        single_rows = one['rps']
+        batch_rows = many['rps'] * args.batch_size
+        speedup = f"{batch_rows / single_rows:7.1f}x" if single_rows else '       -'
+        p95 = f"{many['p95']:8.2f}ms" if many['p95'] is not None else '         -'
+        print(f"{name:<14} {single_rows:14.1f} {batch_rows:14.1f} {speedup} {p95} "
+              f"{one['errors'] + many['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
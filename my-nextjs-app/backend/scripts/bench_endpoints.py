@@ -0,0 +1,271 @@
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from datetime import date
+from urllib.parse import quote, urlencode, urlsplit
+
+from load_test import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = os.path.join(HERE, 'bench_dataset.json')
+BASELINE = os.path.join(HERE, 'bench_baseline.json')
+
+# Unique suffixes for rows the write routes create
+_serial = itertools.count(int(time.time()))
+
+
+class Dataset:
+    """Random ids and names drawn from what scripts/seed_dataset.py loaded"""
+
+    def __init__(self, manifest):
+        self.prefix = manifest['prefix']
+        self.password = manifest['password']
+        self.users = manifest['users']
+        self.books = manifest['books']
+        self.words = manifest['words']
+        self.follow_pairs = manifest['follow_pairs'] or [[self.users[0], self.users[-1]]]
+        self.read_pairs = manifest['read_pairs'] or [[self.users[0], self.books[0]]]
+
+    def user(self, rng):
+        return rng.randint(*self.users)
+
+    def book(self, rng):
+        return rng.randint(*self.books)
+
+    def word(self, rng):
+        return rng.choice(self.words)
+
+
+def _get(template):
+    return lambda rng, data: ('GET', template(rng, data), None, None)
+
+
+def _json(method, path, body):
+    return lambda rng, data: (method, path(rng, data), json.dumps(body(rng, data)), 'application/json')
+
+
+def _distinct(rng, bounds, count):
+    """`count` different ids from the inclusive range `bounds`, so a batch never conflicts with itself"""
+    return rng.sample(range(bounds[0], bounds[1] + 1), min(count, bounds[1] - bounds[0] + 1))
+
+
+def _toggle_batch(first, second, ids):
+    half = len(ids) // 2
+    return {first: ids[:half], second: ids[half:]}
+
+
+def _follow_batch(rng, data, size):
+    follower, *others = _distinct(rng, data.users, size + 1)
+    return {'follower_id': follower, **_toggle_batch('follow', 'unfollow', others)}
+
+
+def _bulk_csv(rng, data, rows=50):
+    lines = ['"Book-Title";"Book-Author";"Publisher";"Image-URL-L"']
+    for _ in range(rows):
+        lines.append(f'"{data.word(rng).capitalize()} {next(_serial)}";"Bench Author {rng.randint(1, 500)}";'
+                     f'"Bench Press {rng.randint(1, 50)}";""')
+    return '\n'.join(lines) + '\n'
+
+
+# (route as declared in main.py, request factory); reads are idempotent and run by default
+READ_ROUTES = [
+    ('/api/health', _get(lambda r, d: '/api/health')),
+    ('/api/test_db', _get(lambda r, d: '/api/test_db')),
+    ('/', _get(lambda r, d: '/')),
+    ('/api/hello', _get(lambda r, d: '/api/hello')),
+    ('/api/users', _get(lambda r, d: '/api/users')),
+    ('/api/users/<int:user_id>', _get(lambda r, d: '/api/users/1')),
+    ('/api/books/search', _get(lambda r, d: f'/api/books/search?query={d.word(r)}&username={d.user(r)}')),
+    ('/api/books/sort', _get(lambda r, d: f'/api/books/sort?query={d.word(r)}&sort=asc&username={d.user(r)}')),
+    ('/api/books/page-range', _get(lambda r, d: f'/api/books/page-range?min=100&max=400&username={d.user(r)}')),
+    ('/api/books/letter/<letter>', _get(lambda r, d: f'/api/books/letter/{d.word(r)[0].upper()}?username={d.user(r)}')),
+    ('/api/books/all', _get(lambda r, d: f'/api/books/all?username={d.user(r)}')),
+    ('/api/books/all?stream=ndjson', _get(lambda r, d: f'/api/books/all?stream=ndjson&username={d.user(r)}')),
+    ('/api/hasread', _get(lambda r, d: f'/api/hasread?username={d.user(r)}')),
+    ('/api/reading-stats', _get(lambda r, d: f'/api/reading-stats?user_id={d.user(r)}')),
+    ('/api/author-stats', _get(lambda r, d: f'/api/author-stats?username={d.user(r)}')),
+    ('/api/most-read-book', _get(lambda r, d: f'/api/most-read-book?year={date.today().year}&limit=10')),
+    ('/api/most-read-book/available-years', _get(lambda r, d: '/api/most-read-book/available-years')),
+    ('/api/reading_challenges', _get(lambda r, d: f'/api/reading_challenges?user_id={d.user(r)}')),
+    ('/api/following', _get(lambda r, d: f'/api/following?user_id={d.user(r)}')),
+    ('/api/users-to-follow', _get(lambda r, d: f'/api/users-to-follow?user_id={d.user(r)}')),
+    ('/api/search-users', _get(lambda r, d: f'/api/search-users?query={quote(d.prefix)}_{r.randint(1, 99)}'
+                                            f'&current_user_id={d.user(r)}')),
+    ('/api/user', _get(lambda r, d: f'/api/user?user_id={d.user(r)}')),
+    ('/api/feed', _get(lambda r, d: f'/api/feed?user_id={d.user(r)}')),
+    ('/api/feed/all', _get(lambda r, d: f'/api/feed/all?user_id={d.user(r)}&limit=30')),
+    ('/api/feed/user/<int:target_user_id>',
+     _get(lambda r, d: '/api/feed/user/{1}?current_user_id={0}'.format(*r.choice(d.follow_pairs)))),
+    ('/api/admin/users', _get(lambda r, d: '/api/admin/users')),
+    ('/api/admin/stats', _get(lambda r, d: '/api/admin/stats')),
+    ('/api/admin/metrics', _get(lambda r, d: '/api/admin/metrics')),
+    ('/api/admin/analytics/weekly-reads', _get(lambda r, d: '/api/admin/analytics/weekly-reads')),
+    ('/api/admin/analytics/reads', _get(lambda r, d: '/api/admin/analytics/reads?granularity=week')),
+]
+
+# Routes that add rows; run with --writes against a database you can throw away
+WRITE_ROUTES = [
+    ('POST /api/register', _json('POST', lambda r, d: '/api/register', lambda r, d: {
+        'username': f'{d.prefix}_new_{next(_serial)}', 'password': d.password, 'name': 'Bench', 'age': 30})),
+    ('POST /api/login', _json('POST', lambda r, d: '/api/login', lambda r, d: {
+        'username': f'{d.prefix}_{d.user(r)}', 'password': d.password})),
+    ('POST /api/change_password', _json('POST', lambda r, d: '/api/change_password', lambda r, d: {
+        'user_id': d.user(r), 'current_password': d.password, 'new_password': d.password})),
+    ('POST /api/books', _json('POST', lambda r, d: '/api/books', lambda r, d: {
+        'user_id': d.user(r), 'title': f'{d.word(r).capitalize()} {next(_serial)}', 'page_length': r.randint(60, 900),
+        'author': f'Bench Author {r.randint(1, 500)}', 'publisher': f'Bench Press {r.randint(1, 50)}'})),
+    ('POST /api/books/bulk', lambda r, d: ('POST', f'/api/books/bulk?user_id={d.user(r)}',
+                                           _bulk_csv(r, d), 'text/csv')),
+    ('POST /api/star', _json('POST', lambda r, d: f'/api/star?username={d.user(r)}',
+                             lambda r, d: {'book_id': d.book(r)})),
+    ('DELETE /api/unstar', _json('DELETE', lambda r, d: f'/api/unstar?username={d.user(r)}',
+                                 lambda r, d: {'book_id': d.book(r)})),
+    ('POST /api/star/batch', _json('POST', lambda r, d: f'/api/star/batch?username={d.user(r)}',
+                                   lambda r, d: _toggle_batch('star', 'unstar', _distinct(r, d.books, 20)))),
+    ('POST /api/mark-as-read', _json('POST', lambda r, d: f'/api/mark-as-read?username={d.user(r)}',
+                                     lambda r, d: {'book_id': d.book(r)})),
+    ('POST /api/mark-as-read/batch', _json('POST', lambda r, d: f'/api/mark-as-read/batch?username={d.user(r)}',
+                                           lambda r, d: {'books': [{'book_id': d.book(r)} for _ in range(20)]})),
+    ('PUT /api/hasread/review', _json('PUT', lambda r, d: '/api/hasread/review', lambda r, d: dict(
+        zip(('user_id', 'book_id'), r.choice(d.read_pairs)), review='Benchmarked'))),
+    ('POST /api/follow', _json('POST', lambda r, d: '/api/follow', lambda r, d: {
+        'follower_id': d.user(r), 'followee_id': d.user(r)})),
+    ('POST /api/unfollow', _json('POST', lambda r, d: '/api/unfollow', lambda r, d: {
+        'follower_id': d.user(r), 'followee_id': d.user(r)})),
+    ('POST /api/follow/batch', _json('POST', lambda r, d: '/api/follow/batch', lambda r, d: _follow_batch(r, d, 20))),
+    ('POST /api/users', _json('POST', lambda r, d: '/api/users', lambda r, d: {
+        'name': 'Bench', 'email': f'bench{next(_serial)}@example.com'})),
+    ('POST /add', lambda r, d: ('POST', '/add', urlencode({'name': 'Bench', 'email': f'form{next(_serial)}@example.com'}),
+                                'application/x-www-form-urlencoded')),
+]
+
+# Not driven: each request would cascade through the seeded rows other routes rely on
+SKIPPED = {
+    'DELETE /api/admin/delete-user': 'deletes a user with their books and reads',
+    'DELETE /api/admin/delete-book': 'deletes a book with its reads',
+}
+
+
+def worker(base, factory, data, seed, deadline, latencies, errors, rejected, lock):
+    """Send requests from `factory` over one keep-alive connection until the deadline"""
+    parts = urlsplit(base)
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    local, failed, refused = [], 0, 0
+    while time.perf_counter() < deadline:
+        method, path, body, content_type = factory(rng, data)
+        headers = {'Content-Type': content_type} if content_type else {}
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                failed += 1
+                continue
+            # 4xx still ran the handler (e.g. 409 on an existing follow), but a
+            # route that only ever rejects is a broken scenario, so count them
+            if response.status >= 400:
+                refused += 1
+            local.append((time.perf_counter() - started) * 1000)
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+        errors[0] += failed
+        rejected[0] += refused
+
+
+def run(base, factory, data, concurrency, duration, seed):
+    latencies, errors, rejected, lock = [], [0], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker,
+                                args=(base, factory, data, seed + i, deadline, latencies, errors, rejected, lock))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = {"rps": round(len(latencies) / duration, 1), "requests": len(latencies),
+              "errors": errors[0], "4xx": rejected[0]}
+    for pct in (50, 95, 99):
+        result[f"p{pct}"] = round(percentile(latencies, pct), 2) if latencies else None
+    return result
+
+
+def regressions(results, baseline, tolerance):
+    """Routes whose p95 grew or throughput fell by more than `tolerance` against the baseline"""
+    found = []
+    for route, result in results.items():
+        before = baseline.get(route)
+        if not before or not result['requests']:
+            continue
+        if before['p95'] and result['p95'] > before['p95'] * (1 + tolerance):
+            found.append(f"{route}: p95 {before['p95']} -> {result['p95']} ms")
+        if before['rps'] and result['rps'] < before['rps'] * (1 - tolerance):
+            found.append(f"{route}: {before['rps']} -> {result['rps']} req/s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency percentiles for every route in main.py")
+    parser.add_argument('--base', default='http://127.0.0.1:5000', help='server under test')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5, help='seconds per route')
+    parser.add_argument('--only', default=None, help='run routes containing this substring')
+    parser.add_argument('--writes', action='store_true', help='also drive the routes that insert rows')
+    parser.add_argument('--manifest', default=MANIFEST, help='written by seed_dataset.py')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed drift before a regression')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding='utf-8') as f:
+        data = Dataset(json.load(f))
+    routes = READ_ROUTES + (WRITE_ROUTES if args.writes else [])
+    if args.only:
+        routes = [(route, factory) for route, factory in routes if args.only in route]
+
+    print(f"{args.base}: {args.concurrency} clients, {args.duration:g}s per route, "
+          f"users {data.users[0]}-{data.users[1]}")
+    print(f"{'route':<45} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'4xx':>7} {'errors':>7}")
+    results = {}
+    for route, factory in routes:
+        result = results[route] = run(args.base, factory, data, args.concurrency, args.duration, args.seed)
+        cells = [f"{result[p]:8.2f}" if result[p] is not None else '       -' for p in ('p50', 'p95', 'p99')]
+        print(f"{route:<45} {result['rps']:9.1f} {' '.join(cells)} {result['4xx']:7d} {result['errors']:7d}")
+    for route, reason in SKIPPED.items():
+        print(f"{route:<45} skipped: {reason}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} routes to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"  REGRESSION {line}")
+        if found:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from query_metrics import QueryMetrics
+
+# Endpoint-shaped statements so fingerprint lookups hit a realistically sized table
+STATEMENTS = [
+    f"SELECT book_id, title FROM Book WHERE user_id = %s AND page_length > {n} LIMIT %s"
+    for n in range(60)
+]
+
+
+class NullCursor:
+    """Does no I/O, so the timings below are the instrumentation alone"""
+
+    rowcount = 1
+    rows = [(1, 'title')] * 3
+
+    def execute(self, operation, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class NullConnection:
+    def cursor(self, *args, **kwargs):
+        return NullCursor()
+
+
+def run(conn, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        cursor = conn.cursor()
+        cursor.execute(STATEMENTS[i % len(STATEMENTS)], (1, 10))
+        cursor.fetchall()
+        cursor.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query overhead of the query_metrics cursor wrapper")
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    metrics = QueryMetrics(slow_threshold=60)
+    raw = NullConnection()
+    wrapped = metrics.wrap(raw, 'bench')
+    run(wrapped, 1000)
+
+    base = min(run(raw, args.iterations) for _ in range(args.repeat))
+    instrumented = min(run(wrapped, args.iterations) for _ in range(args.repeat))
+    overhead = (instrumented - base) / args.iterations * 1e6
+    print(f"raw          {base / args.iterations * 1e6:7.2f} us per cursor/execute/fetchall/close")
+    print(f"instrumented {instrumented / args.iterations * 1e6:7.2f} us")
+    print(f"overhead     {overhead:7.2f} us per query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from search_index import TitleSearchIndex
+
+WORDS = [
+    'the', 'of', 'and', 'night', 'house', 'river', 'secret', 'garden', 'shadow', 'king',
+    'winter', 'summer', 'stone', 'fire', 'ocean', 'history', 'love', 'war', 'city', 'dream',
+    'harry', 'potter', 'lost', 'girl', 'road', 'silent', 'empire', 'island', 'star', 'wolf',
+]
+FIRST = ['Anne', 'John', 'Maya', 'Stephen', 'Jane', 'Toni', 'Ray', 'Agatha', 'George', 'Ursula']
+LAST = ['King', 'Austen', 'Morrison', 'Bradbury', 'Christie', 'Orwell', 'Le Guin', 'Rowling', 'Tolkien', 'Smith']
+QUERIES = ['har', 'secret garden', 'night', 'the', 'wolf', 'empire of', 'morrison', 'zzz', 'h', 'ri']
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+class SyntheticCursor:
+    """Stands in for the MySQL cursor by returning generated Book rows"""
+
+    def __init__(self, count, seed=348):
+        self.count = count
+        self.rng = random.Random(seed)
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        rng = self.rng
+        return [{
+            "book_id": book_id,
+            "title": ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title(),
+            "authors": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+            "cover_url": None,
+        } for book_id in range(1, self.count + 1)]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench(size, rounds=20, limit=50):
+    index = TitleSearchIndex()
+    cursor = SyntheticCursor(size)
+
+    started = time.perf_counter()
+    index.search(cursor, 1, 'warmup')
+    build_s = time.perf_counter() - started
+
+    results = {}
+    for mode in ('search', 'prefix'):
+        samples = []
+        for _ in range(rounds):
+            for query in QUERIES:
+                t0 = time.perf_counter()
+                if mode == 'search':
+                    index.search(cursor, 1, query, limit=limit)
+                else:
+                    index.prefix_search(cursor, 1, query)
+                samples.append((time.perf_counter() - t0) * 1000)
+        results[mode] = samples
+
+    print(f"{size:>9,} books  build {build_s:6.2f}s  (search limit={limit})")
+    for mode, samples in results.items():
+        print(f"    {mode:<7} p50 {statistics.median(samples):8.3f} ms   "
+              f"p99 {percentile(samples, 99):8.3f} ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import streaming
+
+SIZES = [10_000, 100_000, 250_000]
+BATCH_SIZE = 500
+# Streaming peak may not grow more than this between the smallest and largest size
+MAX_GROWTH = 1.5
+
+
+class SyntheticCursor:
+    """Stands in for an unbuffered MySQL cursor over /api/hasread rows, generated lazily"""
+
+    def __init__(self, count):
+        self.count = count
+        self.position = 0
+
+    def _row(self, i):
+        return {
+            "hasread_id": i,
+            "book_id": i,
+            "title": f"Synthetic Book Number {i}",
+            "issue": i % 7,
+            "page_length": 100 + i % 900,
+            "review": "A perfectly fine read." if i % 3 else None,
+            "date": date(2020, 1, 1) + timedelta(days=i % 1500),
+        }
+
+    def fetchmany(self, size):
+        end = min(self.position + size, self.count)
+        rows = [self._row(i) for i in range(self.position, end)]
+        self.position = end
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(self.count - self.position)
+
+    def close(self):
+        pass
+
+
+def dumps(row):
+    return json.dumps(row, default=str)
+
+
+def drop_key(row):
+    del row['hasread_id']
+    return row
+
+
+def buffered(count):
+    """What the endpoint did before: fetchall, then serialize the whole list"""
+    rows = [drop_key(row) for row in SyntheticCursor(count).fetchall()]
+    return len(json.dumps(rows, default=str))
+
+
+def streamed(count, fmt):
+    rows = map(drop_key, streaming.iter_rows(SyntheticCursor(count), BATCH_SIZE))
+    chunks, _ = streaming.body(fmt, rows, dumps)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    peaks = {}
+    for count in sizes:
+        print(f"{count:>9,} rows")
+        for label, fn, args in (('buffered', buffered, (count,)),
+                                ('array', streamed, (count, 'array')),
+                                ('ndjson', streamed, (count, 'ndjson'))):
+            size, peak, elapsed = measure(fn, *args)
+            peaks.setdefault(label, []).append(peak)
+            print(f"    {label:<8} peak {peak / 2**20:8.2f} MiB   "
+                  f"{elapsed:6.2f}s   body {size / 2**20:7.1f} MiB")
+
+    growth = max(max(peaks['array']), max(peaks['ndjson'])) / min(min(peaks['array']), min(peaks['ndjson']))
+    print(f"streaming peak growth across sizes: {growth:.2f}x (limit {MAX_GROWTH}x)")
+    if growth > MAX_GROWTH:
+        sys.exit(1)
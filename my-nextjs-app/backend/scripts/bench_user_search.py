@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from user_search import UserSearchIndex
+
+FIRST = ['Anne', 'John', 'Maya', 'Stephen', 'Jane', 'Toni', 'Ray', 'Agatha', 'George', 'Ursula',
+         'Zoë', 'Kenji', 'Amara', 'Luis', 'Priya', 'Olek', 'Fatima', 'Noah', 'Ingrid', 'Tariq']
+LAST = ['King', 'Austen', 'Morrison', 'Bradbury', 'Christie', 'Orwell', 'Le Guin', 'Rowling',
+        'Tolkien', 'Smith', 'Nakamura', 'Okafor', 'García', 'Sharma', 'Nowak', 'Haddad']
+# Typeahead keystrokes: short prefixes, longer prefixes, mid-word substrings, misses
+QUERIES = ['a', 'jo', 'mor', 'king', 'ann', 'ya_legu', 'ursula o', 'rris', 'la_nowak99', 'zzq', 'smith4', '7']
+
+
+class SyntheticCursor:
+    """Stands in for the MySQL cursor by returning generated User rows"""
+
+    def __init__(self, count, seed=348):
+        self.count = count
+        self.rng = random.Random(seed)
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        rng = self.rng
+        rows = []
+        for user_id in range(1, self.count + 1):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            rows.append({"user_id": user_id, "name": f"{first} {last}",
+                         "username": f"{first.lower()}_{last.lower().replace(' ', '')}{user_id}"})
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of UserSearchIndex.search at scale")
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--rounds', type=int, default=2000, help='searches per query')
+    args = parser.parse_args()
+
+    index = UserSearchIndex()
+    started = time.perf_counter()
+    index.search(SyntheticCursor(args.users), 'warm')
+    load = time.perf_counter() - started
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.users:,} users loaded in {load:.1f}s, max RSS {rss:.0f} MiB, {index.stats()}")
+
+    rng = random.Random(1)
+    everything = []
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            results = index.search(None, query, limit=10, exclude=rng.randint(1, args.users))
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        everything.extend(samples)
+        print(f"  {query!r:<12} {len(results):2d} results   p50 {samples[len(samples) // 2]:.3f} ms   "
+              f"p99 {samples[int(len(samples) * 0.99)]:.3f} ms")
+    everything.sort()
+    print(f"all queries p99 {everything[int(len(everything) * 0.99)]:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+import mysql.connector
+
+from config import Config
+
+# main.py plus the modules it delegates queries to
+SOURCES = [
+    'main.py', 'stats_summary.py', 'challenges.py', 'feed.py', 'rankings.py',
+    'admin_counters.py', 'read_rollups.py', 'search_index.py', 'starred_cache.py',
+]
+SQL_FILES = ['test-production.sql']
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'explain_baseline.json')
+
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE)\b|^\s*INSERT\b.*\bSELECT\b', re.I | re.S)
+_LIMIT_PARAM = re.compile(r'\b(LIMIT|OFFSET)\s+%s', re.I)
+
+
+class QueryCollector(ast.NodeVisitor):
+    """Finds SQL passed to cursor.execute/executemany, resolving module-level constants"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.constants = {}
+        self.scope = '<module>'
+        self.counts = {}
+        self.queries = []
+
+    def collect(self, tree):
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                text = self.render(node.value)
+                if text is not None:
+                    self.constants[node.targets[0].id] = text
+        self.visit(tree)
+        return self.queries
+
+    def visit_FunctionDef(self, node):
+        outer, self.scope = self.scope, node.name
+        self.generic_visit(node)
+        self.scope = outer
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in ('execute', 'executemany') and node.args:
+            text = self.render(node.args[0])
+            if text is not None:
+                n = self.counts[self.scope] = self.counts.get(self.scope, 0) + 1
+                self.queries.append((f"{self.filename}:{self.scope}#{n}", text))
+        self.generic_visit(node)
+
+    def render(self, node):
+        """SQL text for a string expression, or None if it is not one we can follow"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.constants.get(node.id)
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.Constant):
+                    parts.append(value.value)
+                else:
+                    parts.append(self.render_interpolation(value.value))
+            return ''.join(parts)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = self.render(node.left), self.render(node.right)
+            return left + right if left is not None and right is not None else None
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'format'):
+            template = self.render(node.func.value)
+            if template is None:
+                return None
+            values = {kw.arg: self.render(kw.value) or '' for kw in node.keywords if kw.arg}
+            try:
+                return template.format(**values)
+            except (KeyError, IndexError):
+                return None
+        return None
+
+    def render_interpolation(self, node):
+        # Placeholder lists become one parameter; optional clauses are left out
+        if isinstance(node, ast.Name) and node.id in self.constants:
+            return self.constants[node.id]
+        source = ast.unparse(node)
+        if 'placeholder' in source or "', '.join" in source:
+            return '%s'
+        return ''
+
+
+def queries_from_python(path):
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    return QueryCollector(os.path.basename(path)).collect(tree)
+
+
+def queries_from_sql(path):
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    name = os.path.basename(path)
+    statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+    return [(f"{name}#{i}", stmt) for i, stmt in enumerate(statements, 1)]
+
+
+def bind(sql):
+    """Inline representative values so EXPLAIN can plan the statement"""
+    sql = _LIMIT_PARAM.sub(lambda m: f"{m.group(1)} 10", sql)
+    return sql.replace('%s', "'1'")
+
+
+def findings_for(plan):
+    found = []
+    for row in plan:
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        # Derived tables and unions are temporary results, scanning them is expected
+        if row.get('type') == 'ALL' and not table.startswith('<'):
+            found.append(f"full scan of {table}")
+        if 'Using filesort' in extra:
+            found.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            found.append(f"temporary table for {table}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query and flag full scans and filesorts")
+    parser.add_argument('--write-baseline', action='store_true',
+                        help='Accept the current findings as the baseline')
+    parser.add_argument('--verbose', action='store_true', help='Also list baseline and skipped queries')
+    args = parser.parse_args()
+
+    queries = []
+    for name in SOURCES:
+        queries.extend(queries_from_python(os.path.join(BACKEND, name)))
+    for name in SQL_FILES:
+        queries.extend(queries_from_sql(os.path.join(BACKEND, name)))
+
+    conn = mysql.connector.connect(host=Config.DB_HOST, user=Config.DB_USER,
+                                   password=Config.DB_PASSWORD, database=Config.DB_DATABASE,
+                                   port=Config.DB_PORT)
+    cursor = conn.cursor(dictionary=True)
+    results, skipped = {}, []
+    try:
+        for label, sql in queries:
+            if not _EXPLAINABLE.match(sql):
+                continue
+            try:
+                cursor.execute("EXPLAIN " + bind(sql))
+                plan = cursor.fetchall()
+            except mysql.connector.Error as err:
+                skipped.append((label, err.msg))
+                continue
+            for finding in findings_for(plan):
+                results.setdefault(label, []).append(finding)
+    finally:
+        conn.rollback()
+        conn.close()
+
+    keys = sorted(f"{label}: {finding}" for label, found in results.items() for finding in found)
+    if args.write_baseline:
+        with open(BASELINE, 'w', encoding='utf-8') as f:
+            json.dump(keys, f, indent=2)
+            f.write('\n')
+        print(f"Wrote {len(keys)} accepted findings to {BASELINE}")
+        return
+
+    baseline = set()
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding='utf-8') as f:
+            baseline = set(json.load(f))
+
+    new = [key for key in keys if key not in baseline]
+    print(f"Explained {len(queries) - len(skipped)} statements, {len(skipped)} skipped, "
+          f"{len(keys)} findings ({len(new)} new)")
+    for key in new:
+        print(f"  NEW  {key}")
+    if args.verbose:
+        for key in keys:
+            if key in baseline:
+                print(f"  ok   {key}")
+        for label, msg in skipped:
+            print(f"  skip {label}: {msg}")
+    if new:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Routes served natively by asgi_app.py; {user_id} is filled in from --user-id
+PATHS = [
+    '/api/reading-stats?user_id={user_id}',
+    '/api/reading_challenges?user_id={user_id}',
+    '/api/author-stats?username={user_id}',
+    '/api/admin/stats',
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def worker(base, path, deadline, latencies, errors, lock):
+    """Hammer one path over a keep-alive connection until the deadline"""
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local, failed = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                failed += 1
+            else:
+                local.append((time.perf_counter() - started) * 1000)
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+        errors[0] += failed
+
+
+def run(base, path, concurrency, duration):
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(base, path, deadline, latencies, errors, lock))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies) if latencies else None,
+        "p99": percentile(latencies, 99) if latencies else None,
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare requests/sec of the Flask and ASGI servers")
+    parser.add_argument('--flask', default='http://127.0.0.1:5000', help='Flask (WSGI) base URL')
+    parser.add_argument('--asgi', default='http://127.0.0.1:8000', help='asgi_app.py base URL')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per route and server')
+    parser.add_argument('--user-id', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.concurrency} clients, {args.duration:g}s per route")
+    for template in PATHS:
+        path = template.format(user_id=args.user_id)
+        print(path)
+        results = {}
+        for label, base in (('flask', args.flask), ('asgi', args.asgi)):
+            result = results[label] = run(base, path, args.concurrency, args.duration)
+            p50 = f"{result['p50']:8.2f}" if result['p50'] is not None else '       -'
+            p99 = f"{result['p99']:8.2f}" if result['p99'] is not None else '       -'
+            print(f"    {label:<6} {result['rps']:9.1f} req/s   p50 {p50} ms   p99 {p99} ms   "
+                  f"errors {result['errors']}")
+        if results['flask']['rps']:
+            print(f"    asgi/flask {results['asgi']['rps'] / results['flask']['rps']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import array
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mysql.connector
+
+import admin_counters
+import book_listings
+import challenges
+import feed
+import rankings
+import read_rollups
+import stats_summary
+import suggestions
+from config import Config
+
+MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_dataset.json')
+
+WORDS = (
+    "the of and a in to night house river shadow garden winter light stone last city "
+    "secret song war queen king star road sea fire dark little lost dream heart time "
+    "empire glass iron silver storm wolf north island letter memory ghost silent wild"
+).split()
+
+# Knuth's multiplicative hash constant, used to scatter popular ranks across the id range
+_SCATTER = 2654435761
+
+
+def zipf_rank(rng, n, alpha):
+    """A rank in [0, n) drawn from a continuous power law with exponent `alpha` (> 1)"""
+    u = rng.random()
+    power = 1 - alpha
+    x = ((n ** power - 1) * u + 1) ** (1 / power)
+    return min(int(x) - 1, n - 1)
+
+
+def popular_id(rng, base, n, alpha):
+    """An id in [base, base + n) where a few ids are drawn far more often than the rest"""
+    return base + (zipf_rank(rng, n, alpha) * _SCATTER) % n
+
+
+def title(rng):
+    words = rng.sample(WORDS, rng.randint(1, 4))
+    return ' '.join(words).capitalize()
+
+
+def next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+class Loader:
+    """Batched multi-row inserts, one commit per batch"""
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self.inserted = {}
+
+    def insert(self, table, columns, rows):
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            table, ', '.join(columns), ', '.join(['%s'] * len(columns)))
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, sql, batch)
+                batch = []
+        if batch:
+            self._flush(table, sql, batch)
+
+    def _flush(self, table, sql, batch):
+        self.cursor.executemany(sql, batch)
+        self.conn.commit()
+        self.inserted[table] = self.inserted.get(table, 0) + len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load a synthetic dataset for scripts/bench_endpoints.py and rebuild derived tables")
+    parser.add_argument('--users', type=int, default=1000, help='1k to 1M')
+    parser.add_argument('--books-per-user', type=float, default=20, help='mean owned books per user')
+    parser.add_argument('--reads-per-user', type=float, default=30, help='mean HasRead rows per user')
+    parser.add_argument('--follows-per-user', type=float, default=10, help='mean followees per user')
+    parser.add_argument('--alpha', type=float, default=1.6,
+                        help='power-law exponent for follow targets and book/author popularity')
+    parser.add_argument('--days', type=int, default=730, help='spread read dates over this many days')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=348)
+    parser.add_argument('--prefix', default='bench', help='username prefix, keeps reruns from colliding')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = mysql.connector.connect(host=Config.DB_HOST, user=Config.DB_USER,
+                                   password=Config.DB_PASSWORD, database=Config.DB_DATABASE,
+                                   port=Config.DB_PORT)
+    cursor = conn.cursor()
+    loader = Loader(conn, args.batch_size)
+    started = time.perf_counter()
+
+    # Explicit ids, so later phases can reference rows without reading them back
+    user_base = next_id(cursor, 'User', 'user_id')
+    book_base = next_id(cursor, 'Book', 'book_id')
+    author_base = next_id(cursor, 'Author', 'author_id')
+    publisher_base = next_id(cursor, 'Publisher', 'publisher_id')
+    users = args.users
+    authors = max(50, users // 5)
+    publishers = max(20, users // 50)
+
+    loader.insert('User', ('user_id', 'name', 'age', 'username', 'password'), (
+        (user_base + i, f"Reader {user_base + i}", rng.randint(13, 90),
+         f"{args.prefix}_{user_base + i}", 'bench')
+        for i in range(users)))
+    loader.insert('Author', ('author_id', 'name'), (
+        (author_base + i, f"{args.prefix.capitalize()} Author {author_base + i}") for i in range(authors)))
+    loader.insert('Publisher', ('publisher_id', 'name'), (
+        (publisher_base + i, f"{args.prefix.capitalize()} Press {publisher_base + i}")
+        for i in range(publishers)))
+    print(f"users, authors, publishers loaded ({time.perf_counter() - started:.1f}s)")
+
+    # Owned books: count per user is exponential around the mean
+    owners = array.array('l')
+    for i in range(users):
+        owners.extend(array.array('l', [user_base + i]) * int(rng.expovariate(1 / args.books_per_user)))
+    books = len(owners)
+    loader.insert('Book', ('book_id', 'title', 'page_length', 'user_id'), (
+        (book_base + i, title(rng), rng.randint(60, 1200), owner) for i, owner in enumerate(owners)))
+    loader.insert('WrittenBy', ('book_id', 'author_id'), (
+        (book_base + i, popular_id(rng, author_base, authors, args.alpha)) for i in range(books)))
+    loader.insert('PublishedBy', ('book_id', 'publisher_id'), (
+        (book_base + i, popular_id(rng, publisher_base, publishers, args.alpha)) for i in range(books)))
+    loader.insert('Starred', ('user_id', 'book_id'), (
+        (owner, book_base + i) for i, owner in enumerate(owners) if rng.random() < 0.1))
+    print(f"{books:,} books loaded ({time.perf_counter() - started:.1f}s)")
+
+    today = date.today()
+
+    def reads():
+        # HasRead is unique per (user, book), so repeat draws of a popular book are dropped
+        for i in range(users):
+            seen = set()
+            for _ in range(int(rng.expovariate(1 / args.reads_per_user)) if books else 0):
+                book_id = popular_id(rng, book_base, books, args.alpha)
+                if book_id not in seen:
+                    seen.add(book_id)
+                    yield (user_base + i, book_id, today - timedelta(days=rng.randrange(args.days)), None)
+
+    loader.insert('HasRead', ('user_id', 'book_id', 'date', 'review'), reads())
+    print(f"{loader.inserted.get('HasRead', 0):,} reads loaded ({time.perf_counter() - started:.1f}s)")
+
+    def follows():
+        # Out-degree is heavy-tailed, and targets follow a power law, so a few
+        # users collect most followers (the fan-out worst case for feeds)
+        for i in range(users):
+            follower = user_base + i
+            degree = min(users - 1, int(rng.paretovariate(2) * args.follows_per_user / 2))
+            targets = {popular_id(rng, user_base, users, args.alpha) for _ in range(degree)}
+            targets.discard(follower)
+            for followee in targets:
+                yield (follower, followee)
+
+    loader.insert('Follows', ('follower_id', 'followee_id'), follows())
+    print(f"{loader.inserted.get('Follows', 0):,} follows loaded ({time.perf_counter() - started:.1f}s)")
+
+    # Derived tables the write endpoints would normally keep current
+    stats_summary.rebuild_all(conn)
+    challenges.rebuild_all(conn)
+    feed.FeedStore(timeline_length=Config.FEED_TIMELINE_LENGTH,
+                   fanout_limit=Config.FEED_FANOUT_LIMIT,
+                   trim_every=Config.FEED_TRIM_EVERY).rebuild(conn)
+    rankings.rebuild_all(conn)
+    read_rollups.rebuild_all(conn)
+    book_listings.rebuild_all(conn)
+    admin_counters.reconcile(conn, fix=True)
+    conn.commit()
+    suggestions.rebuild_all(conn, Config.SUGGESTIONS_TOP_K)
+    print(f"derived tables rebuilt ({time.perf_counter() - started:.1f}s)")
+
+    cursor.execute("SELECT follower_id, followee_id FROM Follows WHERE follower_id BETWEEN %s AND %s LIMIT 1000",
+                   (user_base, user_base + users - 1))
+    follow_pairs = cursor.fetchall()
+    cursor.execute("SELECT user_id, book_id FROM HasRead WHERE user_id BETWEEN %s AND %s LIMIT 1000",
+                   (user_base, user_base + users - 1))
+    read_pairs = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    manifest = {
+        "seed": args.seed,
+        "prefix": args.prefix,
+        "password": 'bench',
+        "users": [user_base, user_base + users - 1],
+        "books": [book_base, book_base + books - 1],
+        "words": WORDS,
+        "follow_pairs": follow_pairs,
+        "read_pairs": read_pairs,
+        "rows": loader.inserted,
+    }
+    with open(MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Seeded {sum(loader.inserted.values()):,} rows in {time.perf_counter() - started:.1f}s; "
+          f"manifest written to {MANIFEST}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+import bisect
+import heapq
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Slotted book object, its `order` tuple and list slot, and its `books` entry
+_BOOK_OVERHEAD = 80 + 56 + 8 + 64
+# One book id in one trigram's posting set, amortized over set growth
+_POSTING_BYTES = 40
+
+
+def normalize(text):
+    """Lower-case and strip accents so matching mirrors MySQL's *_ai_ci collation"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IndexedBook:
+    """Display fields for one book plus its normalized search keys"""
+
+    __slots__ = ('book_id', 'title', 'authors', 'cover_url', 'title_key', 'author_key')
+
+    def __init__(self, book_id, title, authors, cover_url):
+        self.book_id = book_id
+        self.title = title
+        self.authors = authors
+        self.cover_url = cover_url
+        self.title_key = normalize(title)
+        self.author_key = normalize(authors)
+
+    def size(self):
+        """Estimated bytes this book adds to a library, postings included"""
+        size = _BOOK_OVERHEAD + len(trigrams(self.title_key)) * _POSTING_BYTES
+        size += sys.getsizeof(self.title) + sys.getsizeof(self.authors)
+        size += sum(sys.getsizeof(key) for key, original in ((self.title_key, self.title),
+                                                             (self.author_key, self.authors))
+                    if key != original)
+        return size + (sys.getsizeof(self.cover_url) if self.cover_url is not None else 0)
+
+
+class _Library:
+    """One user's books kept in title order, trigram postings over titles, and books per author"""
+
+    __slots__ = ('books', 'order', 'postings', 'authors', 'size')
+
+    def __init__(self):
+        self.books = {}
+        self.order = []
+        self.postings = {}
+        self.authors = {}
+        self.size = 0
+
+    def load(self, books):
+        """Bulk-build from a full snapshot, sorting once instead of per insert"""
+        for book in books:
+            self.books[book.book_id] = book
+            self._post(book)
+        self.order = sorted((b.title_key, b.book_id) for b in self.books.values())
+
+    def add(self, book):
+        self.remove(book.book_id)
+        self.books[book.book_id] = book
+        bisect.insort(self.order, (book.title_key, book.book_id))
+        self._post(book)
+
+    def remove(self, book_id):
+        book = self.books.pop(book_id, None)
+        if book is None:
+            return
+        self.size -= book.size()
+        entry = (book.title_key, book.book_id)
+        pos = bisect.bisect_left(self.order, entry)
+        if pos < len(self.order) and self.order[pos] == entry:
+            del self.order[pos]
+        for gram in trigrams(book.title_key):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(book_id)
+                if not ids:
+                    del self.postings[gram]
+        ids = self.authors.get(book.author_key)
+        if ids is not None:
+            ids.discard(book_id)
+            if not ids:
+                del self.authors[book.author_key]
+
+    def _post(self, book):
+        self.size += book.size()
+        for gram in trigrams(book.title_key):
+            self.postings.setdefault(gram, set()).add(book.book_id)
+        # Far fewer distinct author strings than books, so authors are matched by scanning names
+        self.authors.setdefault(book.author_key, set()).add(book.book_id)
+
+    def prefix_range(self, key):
+        """Slice bounds of `order` holding titles that start with `key`"""
+        if not key:
+            return 0, len(self.order)
+        upper = key[:-1] + chr(ord(key[-1]) + 1)
+        return (bisect.bisect_left(self.order, (key,)),
+                bisect.bisect_left(self.order, (upper,)))
+
+    def candidates(self, key):
+        """Books whose title could contain `key`, narrowed by trigram intersection"""
+        if len(key) < 3:
+            # Too short to have a trigram: fall back to scanning this library
+            return self.books.values()
+        lists = []
+        for gram in trigrams(key):
+            ids = self.postings.get(gram)
+            if not ids:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        ids = set(lists[0])
+        for other in lists[1:]:
+            ids &= other
+            if not ids:
+                return []
+        return [self.books[book_id] for book_id in ids]
+
+
+def _title_rank(title, key):
+    """Lower is better: title prefix, title word prefix, then any title substring"""
+    if title.startswith(key):
+        return 0
+    if ' ' + key in title:
+        return 1
+    if key in title:
+        return 2
+    return None
+
+
+def _author_rank(author, key):
+    """Author matches rank below every title match"""
+    if author.startswith(key) or ' ' + key in author:
+        return 3
+    if key in author:
+        return 4
+    return None
+
+
+class TitleSearchIndex:
+    """In-process trigram index over each user's Book.title and Author.name.
+
+    A user's library is loaded from MySQL on first use and then kept current by
+    add_book/remove_book from the write endpoints. Like LibraryCache, libraries
+    are evicted least recently used first once their estimated size passes
+    `max_bytes`.
+    """
+
+    # Served from the BookListings projection, authors already joined
+    LOAD_QUERY = """
+        SELECT book_id, title, cover_url, authors
+        FROM BookListings
+        WHERE user_id = %s
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._libraries = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def search(self, cursor, user_id, query, limit=None):
+        """Books whose title or authors contain `query`, best matches first"""
+        key = normalize(query.strip())
+        library = self._library(cursor, user_id)
+        with self._lock:
+            if limit and key:
+                books = self._top_title_matches(library, key, limit)
+                if books is not None:
+                    return books
+
+            ranked = []
+            matched = set()
+            for book in library.candidates(key):
+                rank = _title_rank(book.title_key, key)
+                if rank is not None:
+                    ranked.append((rank, book.title_key, book.book_id, book))
+                    matched.add(book.book_id)
+            for author_key, ids in library.authors.items():
+                rank = _author_rank(author_key, key)
+                if rank is None:
+                    continue
+                for book_id in ids - matched:
+                    book = library.books[book_id]
+                    ranked.append((rank, book.title_key, book_id, book))
+        if limit:
+            ranked = heapq.nsmallest(limit, ranked, key=lambda item: item[:3])
+        else:
+            ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked]
+
+    def _top_title_matches(self, library, key, limit):
+        """Fill `limit` results from the two cheapest tiers, or None if they fall short"""
+        # Title-prefix matches rank first and are already in title order
+        lo, hi = library.prefix_range(key)
+        books = [library.books[book_id] for _, book_id in library.order[lo:min(hi, lo + limit)]]
+        if len(books) >= limit:
+            return books
+
+        # Then titles with a word starting with the key; ' ' + key is itself a trigram
+        # for two-character keys, so short queries avoid the full scan here too
+        word_start = ' ' + key
+        tier = [b for b in library.candidates(word_start)
+                if word_start in b.title_key and not b.title_key.startswith(key)]
+        books.extend(heapq.nsmallest(limit - len(books), tier, key=lambda b: (b.title_key, b.book_id)))
+        if len(books) >= limit:
+            return books
+        return None
+
+    def prefix_search(self, cursor, user_id, prefix='', descending=False):
+        """Books whose title starts with `prefix`, ordered by title"""
+        key = normalize(prefix.strip())
+        library = self._library(cursor, user_id)
+        with self._lock:
+            lo, hi = library.prefix_range(key)
+            ids = [book_id for _, book_id in library.order[lo:hi]]
+            books = [library.books[book_id] for book_id in ids]
+        if descending:
+            books.reverse()
+        return books
+
+    def add_book(self, user_id, book_id, title, authors, cover_url):
+        """Index a newly saved book if its owner's library is already loaded"""
+        with self._lock:
+            uid = str(user_id)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            library = self._libraries.get(uid)
+            if library is not None:
+                self._resize(uid, library, library.add, IndexedBook(book_id, title, authors, cover_url))
+
+    def remove_book(self, user_id, book_id):
+        with self._lock:
+            uid = str(user_id)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            library = self._libraries.get(uid)
+            if library is not None:
+                self._resize(uid, library, library.remove, book_id)
+
+    def drop_user(self, user_id):
+        """Forget a user's library entirely, e.g. after the user is deleted"""
+        with self._lock:
+            uid = str(user_id)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            library = self._libraries.pop(uid, None)
+            if library is not None:
+                self._bytes -= library.size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users_loaded": len(self._libraries),
+                "books_indexed": sum(len(lib.books) for lib in self._libraries.values()),
+                "trigrams": sum(len(lib.postings) for lib in self._libraries.values()),
+                "authors": sum(len(lib.authors) for lib in self._libraries.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+    def _library(self, cursor, user_id):
+        uid = str(user_id)
+        with self._lock:
+            library = self._libraries.get(uid)
+            if library is not None:
+                self._libraries.move_to_end(uid)
+                return library
+            version = self._versions.get(uid, 0)
+
+        cursor.execute(self.LOAD_QUERY, (user_id,))
+        library = _Library()
+        library.load(IndexedBook(row['book_id'], row['title'], row['authors'], row['cover_url'])
+                     for row in cursor.fetchall())
+
+        with self._lock:
+            if uid in self._libraries:
+                return self._libraries[uid]
+            # Only cache the snapshot if no write raced with the load
+            if self._versions.get(uid, 0) == version and library.size <= self.max_bytes:
+                self._libraries[uid] = library
+                self._bytes += library.size
+                self._trim()
+            return library
+
+    def _resize(self, uid, library, change, arg):
+        """Apply `change(arg)` to a loaded library and account for its new size"""
+        before = library.size
+        change(arg)
+        self._bytes += library.size - before
+        self._libraries.move_to_end(uid)
+        self._trim()
+
+    def _trim(self):
+        while self._bytes > self.max_bytes and self._libraries:
+            _, evicted = self._libraries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._evictions += 1
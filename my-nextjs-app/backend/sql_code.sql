@@ -1,9 +1,14 @@
+-- Schema with every migration in migrations/ applied; SchemaMigrations at the
+-- end records them, so `flask db-migrate` has nothing to do on a database
+-- created from this file. Schema changes go in a new migration, then here.
+
 -- Table: Author
 CREATE TABLE `Author` (
   `author_id` int NOT NULL AUTO_INCREMENT,
   `name` varchar(255) NOT NULL,
   `date_of_birth` date DEFAULT NULL,
-  PRIMARY KEY (`author_id`)
+  PRIMARY KEY (`author_id`),
+  UNIQUE KEY `uq_author_name` (`name`)
 ) ENGINE=InnoDB AUTO_INCREMENT=10041 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- Table: Book
@@ -16,6 +21,8 @@ CREATE TABLE `Book` (
   `user_id` int DEFAULT NULL,
   PRIMARY KEY (`book_id`),
   KEY `fk_book_user` (`user_id`),
+  KEY `idx_book_user_title` (`user_id`,`title`),
+  KEY `idx_book_user_pages` (`user_id`,`page_length`),
   CONSTRAINT `fk_book_user` FOREIGN KEY (`user_id`) REFERENCES `User` (`user_id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=2080709184 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -53,7 +60,8 @@ CREATE TABLE `Starred` (
 CREATE TABLE `Publisher` (
   `publisher_id` int NOT NULL AUTO_INCREMENT,
   `name` varchar(255) NOT NULL,
-  PRIMARY KEY (`publisher_id`)
+  PRIMARY KEY (`publisher_id`),
+  UNIQUE KEY `uq_publisher_name` (`name`)
 ) ENGINE=InnoDB AUTO_INCREMENT=10021 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- Table: HasRead
@@ -64,7 +72,9 @@ CREATE TABLE `HasRead` (
   `date` date NOT NULL,
   `review` text,
   PRIMARY KEY (`hasread_id`),
+  UNIQUE KEY `uq_hasread_user_book` (`user_id`,`book_id`),
   KEY `user_id` (`user_id`),
+  KEY `idx_hasread_user_date` (`user_id`,`date`),
   KEY `book_id` (`book_id`),
   CONSTRAINT `hasread_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `User` (`user_id`),
   CONSTRAINT `hasread_ibfk_2` FOREIGN KEY (`book_id`) REFERENCES `Book` (`book_id`)
@@ -95,3 +105,172 @@ CREATE TABLE `ToReadList` (
   CONSTRAINT `toreadlist_ibfk_2` FOREIGN KEY (`book_id`) REFERENCES `Book` (`book_id`),
   CONSTRAINT `toreadlist_chk_1` CHECK ((`rating` between 1 and 5))
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: UserReadingStats (per-user summary behind /api/reading-stats)
+CREATE TABLE `UserReadingStats` (
+  `user_id` int NOT NULL,
+  `total_books` int NOT NULL DEFAULT '0',
+  `total_pages` bigint NOT NULL DEFAULT '0',
+  `min_pages` int DEFAULT NULL,
+  `max_pages` int DEFAULT NULL,
+  `first_hasread_id` int DEFAULT NULL,
+  `first_date` date DEFAULT NULL,
+  `first_book` varchar(255) DEFAULT NULL,
+  `latest_hasread_id` int DEFAULT NULL,
+  `latest_book` varchar(255) DEFAULT NULL,
+  `favorite_author` varchar(255) DEFAULT NULL,
+  `favorite_author_reads` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: UserAuthorReads
+CREATE TABLE `UserAuthorReads` (
+  `user_id` int NOT NULL,
+  `author_id` int NOT NULL,
+  `read_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`,`author_id`),
+  KEY `idx_user_read_count` (`user_id`,`read_count`),
+  KEY `idx_author_read_count` (`author_id`,`read_count`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: UserYearReads (reading challenge counters)
+CREATE TABLE `UserYearReads` (
+  `user_id` int NOT NULL,
+  `year` smallint NOT NULL,
+  `books_read` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`,`year`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: FeedTimeline (fan-out-on-write activity feed)
+CREATE TABLE `FeedTimeline` (
+  `follower_id` int NOT NULL,
+  `hasread_id` int NOT NULL,
+  `actor_id` int NOT NULL,
+  PRIMARY KEY (`follower_id`,`hasread_id`),
+  KEY `idx_follower_actor` (`follower_id`,`actor_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: FollowerCounts
+CREATE TABLE `FollowerCounts` (
+  `user_id` int NOT NULL,
+  `followers` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`),
+  KEY `idx_followers` (`followers`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: BookYearReads (per-year read counts behind /api/most-read-book)
+CREATE TABLE `BookYearReads` (
+  `year` smallint NOT NULL,
+  `book_id` int NOT NULL,
+  `read_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`year`,`book_id`),
+  KEY `idx_year_read_count` (`year`,`read_count`),
+  KEY `idx_book` (`book_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: CacheEpochs (cross-worker invalidation for in-process caches)
+CREATE TABLE `CacheEpochs` (
+  `name` varchar(64) NOT NULL,
+  `epoch` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: SiteCounters (admin dashboard totals)
+CREATE TABLE `SiteCounters` (
+  `name` varchar(64) NOT NULL,
+  `value` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: UserBookCounts
+CREATE TABLE `UserBookCounts` (
+  `user_id` int NOT NULL,
+  `book_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`),
+  KEY `idx_book_count` (`book_count`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: BookReadCounts (reads per book, so unique_books_read knows a book's first and last read)
+CREATE TABLE `BookReadCounts` (
+  `book_id` int NOT NULL,
+  `read_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`book_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: ReadRollups (reads per day/week/month behind /api/admin/analytics)
+CREATE TABLE `ReadRollups` (
+  `granularity` enum('day','week','month') NOT NULL,
+  `bucket` date NOT NULL,
+  `books_read` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`granularity`,`bucket`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: FollowSuggestions (ranked candidates behind /api/users-to-follow)
+CREATE TABLE `FollowSuggestions` (
+  `user_id` int NOT NULL,
+  `position` smallint NOT NULL,
+  `candidate_id` int NOT NULL,
+  `score` int NOT NULL,
+  `mutuals` int NOT NULL DEFAULT '0',
+  `shared_authors` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`user_id`,`position`),
+  KEY `idx_candidate` (`candidate_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: BookListings (display rows for the book listing endpoints, authors pre-joined)
+CREATE TABLE `BookListings` (
+  `book_id` int NOT NULL,
+  `user_id` int NOT NULL,
+  `title` varchar(255) NOT NULL,
+  `issue` varchar(255) DEFAULT NULL,
+  `page_length` int DEFAULT NULL,
+  `cover_url` varchar(400) DEFAULT NULL,
+  `authors` varchar(1024) DEFAULT NULL,
+  PRIMARY KEY (`book_id`),
+  KEY `idx_user_title` (`user_id`,`title`,`book_id`),
+  KEY `idx_user_pages` (`user_id`,`page_length`,`book_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: ReadEvents (write-behind log of HasRead changes, see event_log.py)
+CREATE TABLE `ReadEvents` (
+  `event_id` bigint NOT NULL AUTO_INCREMENT,
+  `kind` varchar(16) NOT NULL,
+  `user_id` int NOT NULL,
+  `book_id` int DEFAULT NULL,
+  `hasread_id` int DEFAULT NULL,
+  `read_date` date DEFAULT NULL,
+  `created_at` timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`event_id`),
+  KEY `idx_hasread` (`hasread_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: EventCheckpoints (last ReadEvents id applied by each aggregate)
+CREATE TABLE `EventCheckpoints` (
+  `consumer` varchar(64) NOT NULL,
+  `last_event_id` bigint NOT NULL DEFAULT '0',
+  `updated_at` timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`consumer`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: EventGaps (skipped ReadEvents ids each aggregate still expects, see event_log.py)
+CREATE TABLE `EventGaps` (
+  `consumer` varchar(64) NOT NULL,
+  `event_id` bigint NOT NULL,
+  `skipped_at` timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`consumer`,`event_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Table: SchemaMigrations (migrations/ files applied by `flask db-migrate`, see migrate.py)
+CREATE TABLE `SchemaMigrations` (
+  `version` int NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `applied_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO `SchemaMigrations` (`version`, `name`) VALUES
+  (1, 'hot_query_indexes'),
+  (2, 'suggestion_indexes'),
+  (3, 'hasread_unique_read'),
+  (4, 'unique_author_publisher_names'),
+  (5, 'backfill_book_listings');
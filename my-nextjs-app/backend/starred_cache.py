@@ -0,0 +1,99 @@
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class StarredCache:
+    """Per-user starred book ids, kept as a sorted int array.
+
+    A user's set is loaded from Starred on first use (dictionary cursor) and then
+    kept current write-through by /api/star and /api/unstar, so the listing
+    endpoints can flag starred books without querying Starred. At most
+    `max_users` sets are kept, least recently used first out.
+    """
+
+    LOAD_QUERY = "SELECT book_id FROM Starred WHERE user_id = %s ORDER BY book_id"
+    COLUMN = 'book_id'
+
+    def __init__(self, max_users=10000):
+        self.max_users = max_users
+        self._sets = OrderedDict()
+        self._versions = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.RLock()
+
+    def starred_ids(self, cursor, user_id):
+        """The user's starred ids as a sorted array; treat it as read-only"""
+        uid = str(user_id)
+        with self._lock:
+            ids = self._sets.get(uid)
+            if ids is not None:
+                self._sets.move_to_end(uid)
+                self._hits += 1
+                return ids
+            self._misses += 1
+            version = self._versions.get(uid, 0)
+
+        cursor.execute(self.LOAD_QUERY, (user_id,))
+        ids = array('l', (row[self.COLUMN] for row in cursor.fetchall()))
+
+        with self._lock:
+            if uid in self._sets:
+                return self._sets[uid]
+            # Only cache the snapshot if no write raced with the load
+            if self._versions.get(uid, 0) == version:
+                self._sets[uid] = ids
+                while len(self._sets) > self.max_users:
+                    self._sets.popitem(last=False)
+            return ids
+
+    def is_starred(self, ids, book_id):
+        i = bisect.bisect_left(ids, book_id)
+        return i < len(ids) and ids[i] == book_id
+
+    def star(self, user_id, book_id):
+        """Record a committed star for a user whose set is loaded"""
+        book_id = int(book_id)
+        with self._lock:
+            ids = self._touch(user_id)
+            if ids is not None and not self.is_starred(ids, book_id):
+                ids.insert(bisect.bisect_left(ids, book_id), book_id)
+
+    def unstar(self, user_id, book_id):
+        book_id = int(book_id)
+        with self._lock:
+            ids = self._touch(user_id)
+            if ids is not None and self.is_starred(ids, book_id):
+                del ids[bisect.bisect_left(ids, book_id)]
+
+    def forget_book(self, book_id):
+        """Drop a deleted book from every loaded set (Starred rows cascade with it)"""
+        book_id = int(book_id)
+        with self._lock:
+            for ids in self._sets.values():
+                if self.is_starred(ids, book_id):
+                    del ids[bisect.bisect_left(ids, book_id)]
+
+    def drop_user(self, user_id):
+        with self._lock:
+            uid = str(user_id)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            self._sets.pop(uid, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "users_loaded": len(self._sets),
+                "starred_ids": sum(len(ids) for ids in self._sets.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            }
+
+    def _touch(self, user_id):
+        uid = str(user_id)
+        self._versions[uid] = self._versions.get(uid, 0) + 1
+        return self._sets.get(uid)
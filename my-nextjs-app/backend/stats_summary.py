@@ -0,0 +1,211 @@
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS UserReadingStats (
+        user_id INT NOT NULL,
+        total_books INT NOT NULL DEFAULT 0,
+        total_pages BIGINT NOT NULL DEFAULT 0,
+        min_pages INT DEFAULT NULL,
+        max_pages INT DEFAULT NULL,
+        first_hasread_id INT DEFAULT NULL,
+        first_date DATE DEFAULT NULL,
+        first_book VARCHAR(255) DEFAULT NULL,
+        latest_hasread_id INT DEFAULT NULL,
+        latest_book VARCHAR(255) DEFAULT NULL,
+        favorite_author VARCHAR(255) DEFAULT NULL,
+        favorite_author_reads INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS UserAuthorReads (
+        user_id INT NOT NULL,
+        author_id INT NOT NULL,
+        read_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, author_id),
+        KEY idx_user_read_count (user_id, read_count)
+    )
+    """,
+]
+
+# total_books/total_pages/min/max only count books with a known page_length,
+# matching what the old PageStats CTE reported
+_APPLY_READ = """
+    INSERT INTO UserReadingStats (
+        user_id, total_books, total_pages, min_pages, max_pages,
+        first_hasread_id, first_date, first_book, latest_hasread_id, latest_book
+    )
+    SELECT
+        hr.user_id,
+        IF(b.page_length IS NULL, 0, 1),
+        COALESCE(b.page_length, 0),
+        b.page_length,
+        b.page_length,
+        hr.hasread_id,
+        hr.date,
+        b.title,
+        hr.hasread_id,
+        b.title
+    FROM HasRead hr
+    JOIN Book b ON b.book_id = hr.book_id
+    WHERE hr.hasread_id = %s
+    ON DUPLICATE KEY UPDATE
+        total_books = total_books + VALUES(total_books),
+        total_pages = total_pages + VALUES(total_pages),
+        min_pages = COALESCE(LEAST(min_pages, VALUES(min_pages)), min_pages, VALUES(min_pages)),
+        max_pages = COALESCE(GREATEST(max_pages, VALUES(max_pages)), max_pages, VALUES(max_pages)),
+        -- first_book and first_hasread_id must be assigned before first_date changes
+        first_book = IF(first_date IS NULL OR VALUES(first_date) < first_date, VALUES(first_book), first_book),
+        first_hasread_id = IF(first_date IS NULL OR VALUES(first_date) < first_date, VALUES(first_hasread_id), first_hasread_id),
+        first_date = IF(first_date IS NULL OR VALUES(first_date) < first_date, VALUES(first_date), first_date),
+        latest_book = IF(latest_hasread_id IS NULL OR VALUES(latest_hasread_id) > latest_hasread_id, VALUES(latest_book), latest_book),
+        latest_hasread_id = GREATEST(COALESCE(latest_hasread_id, 0), VALUES(latest_hasread_id))
+"""
+
+_APPLY_AUTHORS = """
+    INSERT INTO UserAuthorReads (user_id, author_id, read_count)
+    SELECT hr.user_id, wb.author_id, 1
+    FROM HasRead hr
+    JOIN WrittenBy wb ON wb.book_id = hr.book_id
+    WHERE hr.hasread_id = %s
+    ON DUPLICATE KEY UPDATE read_count = read_count + 1
+"""
+
+_REBUILD_STATS = """
+    INSERT INTO UserReadingStats (
+        user_id, total_books, total_pages, min_pages, max_pages,
+        first_hasread_id, first_date, first_book, latest_hasread_id, latest_book
+    )
+    SELECT
+        r.user_id,
+        COUNT(r.page_length),
+        COALESCE(SUM(r.page_length), 0),
+        MIN(r.page_length),
+        MAX(r.page_length),
+        MAX(CASE WHEN r.first_rank = 1 THEN r.hasread_id END),
+        MAX(CASE WHEN r.first_rank = 1 THEN r.date END),
+        MAX(CASE WHEN r.first_rank = 1 THEN r.title END),
+        MAX(r.hasread_id),
+        MAX(CASE WHEN r.latest_rank = 1 THEN r.title END)
+    FROM (
+        SELECT
+            hr.user_id,
+            hr.hasread_id,
+            hr.date,
+            b.title,
+            b.page_length,
+            ROW_NUMBER() OVER (PARTITION BY hr.user_id ORDER BY hr.date, hr.hasread_id) AS first_rank,
+            ROW_NUMBER() OVER (PARTITION BY hr.user_id ORDER BY hr.hasread_id DESC) AS latest_rank
+        FROM HasRead hr
+        JOIN Book b ON b.book_id = hr.book_id
+        {where}
+    ) r
+    GROUP BY r.user_id
+"""
+
+_REBUILD_AUTHORS = """
+    INSERT INTO UserAuthorReads (user_id, author_id, read_count)
+    SELECT hr.user_id, wb.author_id, COUNT(*)
+    FROM HasRead hr
+    JOIN WrittenBy wb ON wb.book_id = hr.book_id
+    {where}
+    GROUP BY hr.user_id, wb.author_id
+"""
+
+_REFRESH_FAVORITE = """
+    UPDATE UserReadingStats s
+    JOIN (
+        SELECT
+            ar.user_id,
+            ar.author_id,
+            ar.read_count,
+            ROW_NUMBER() OVER (PARTITION BY ar.user_id ORDER BY ar.read_count DESC, ar.author_id) AS rn
+        FROM UserAuthorReads ar
+        {where}
+    ) top ON top.user_id = s.user_id AND top.rn = 1
+    JOIN Author a ON a.author_id = top.author_id
+    SET s.favorite_author = a.name, s.favorite_author_reads = top.read_count
+"""
+
+
+def record_read(db, user_id, hasread_id):
+    """Fold one newly inserted HasRead row into its user's summary"""
+    cursor = db.cursor()
+    cursor.execute(_APPLY_READ, (hasread_id,))
+    cursor.execute(_APPLY_AUTHORS, (hasread_id,))
+    cursor.execute(_REFRESH_FAVORITE.format(where="WHERE ar.user_id = %s"), (user_id,))
+    cursor.close()
+
+
+def clear(db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM UserReadingStats")
+    cursor.execute("DELETE FROM UserAuthorReads")
+    cursor.close()
+
+
+def rebuild_user(db, user_id, only=None):
+    """Recompute one user's summary from HasRead, e.g. after their reads were deleted.
+
+    `only` is an optional (condition, params) on HasRead `hr` limiting the rows
+    counted, such as the ones the event log has already applied.
+    """
+    condition, params = only or ("TRUE", ())
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM UserReadingStats WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM UserAuthorReads WHERE user_id = %s", (user_id,))
+    where = f"WHERE hr.user_id = %s AND {condition}"
+    cursor.execute(_REBUILD_STATS.format(where=where), (user_id, *params))
+    cursor.execute(_REBUILD_AUTHORS.format(where=where), (user_id, *params))
+    cursor.execute(_REFRESH_FAVORITE.format(where="WHERE ar.user_id = %s"), (user_id,))
+    cursor.close()
+
+
+def rebuild_all(db, only=None):
+    """Backfill every user's summary from scratch; `only` as for rebuild_user"""
+    condition, params = only or ("TRUE", ())
+    clear(db)
+    cursor = db.cursor()
+    cursor.execute(_REBUILD_STATS.format(where=f"WHERE {condition}"), params)
+    cursor.execute(_REBUILD_AUTHORS.format(where=f"WHERE {condition}"), params)
+    cursor.execute(_REFRESH_FAVORITE.format(where=""))
+    cursor.execute("SELECT COUNT(*) FROM UserReadingStats")
+    users = cursor.fetchone()[0]
+    cursor.close()
+    return users
+
+
+FETCH_QUERY = """
+    SELECT total_books, total_pages, favorite_author, first_book, latest_book
+    FROM UserReadingStats
+    WHERE user_id = %s
+"""
+
+
+def fetch(db, user_id):
+    """The /api/reading-stats payload for a user, read from the summary row"""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(FETCH_QUERY, (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return summarize(row)
+
+
+def summarize(row):
+    """Shape a FETCH_QUERY row (or None) into the API payload"""
+    if not row:
+        return {
+            "total_books": 0,
+            "avg_pages": None,
+            "favorite_author": None,
+            "first_book": None,
+            "latest_book": None,
+        }
+
+    total_books = row['total_books']
+    return {
+        "total_books": total_books,
+        "avg_pages": round(float(row['total_pages']) / total_books, 1) if total_books else None,
+        "favorite_author": row['favorite_author'],
+        "first_book": row['first_book'],
+        "latest_book": row['latest_book'],
+    }
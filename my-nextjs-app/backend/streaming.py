@@ -0,0 +1,66 @@
+NDJSON = 'application/x-ndjson'
+
+FORMATS = ('ndjson', 'array')
+
+
+def requested_format(args, accept=None):
+    """'ndjson' or 'array' when the client opted into streaming, else None.
+
+    Opt in with ?stream=ndjson|array, or an Accept: application/x-ndjson header.
+    """
+    fmt = (args.get('stream') or '').lower()
+    if fmt in FORMATS:
+        return fmt
+    if fmt in ('1', 'true'):
+        return 'array'
+    if accept and NDJSON in accept:
+        return 'ndjson'
+    return None
+
+
+def iter_rows(cursor, batch_size=500):
+    """Yield rows from an unbuffered cursor `batch_size` at a time.
+
+    The cursor is always closed; if the consumer stops early (client hung up)
+    the rest of the result set is read and discarded so the connection goes
+    back to the pool clean.
+    """
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        try:
+            while cursor.fetchmany(batch_size):
+                pass
+        finally:
+            cursor.close()
+
+
+def ndjson(rows, dumps):
+    """One JSON document per line"""
+    for row in rows:
+        yield dumps(row) + '\n'
+
+
+def json_array(rows, dumps, prefix='[', suffix=']'):
+    """A JSON array written element by element.
+
+    `prefix`/`suffix` wrap the array, so an envelope such as
+    '{"status": "success", "books": [' ... ']}' can be streamed as well.
+    """
+    yield prefix
+    first = True
+    for row in rows:
+        yield (dumps(row) if first else ',' + dumps(row))
+        first = False
+    yield suffix
+
+
+def body(fmt, rows, dumps, prefix='[', suffix=']'):
+    """(chunks, mimetype) for a streaming Response in the requested format"""
+    if fmt == 'ndjson':
+        return ndjson(rows, dumps), NDJSON
+    return json_array(rows, dumps, prefix, suffix), 'application/json'
@@ -0,0 +1,199 @@
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS FollowSuggestions (
+        user_id INT NOT NULL,
+        position SMALLINT NOT NULL,
+        candidate_id INT NOT NULL,
+        score INT NOT NULL,
+        mutuals INT NOT NULL DEFAULT 0,
+        shared_authors INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, position),
+        KEY idx_candidate (candidate_id)
+    )
+    """,
+]
+
+# A followee of a followee counts this much more than one shared favourite author
+MUTUAL_WEIGHT = 3
+AUTHOR_WEIGHT = 1
+
+# Bounds on the work done per user, whatever the size of the graph
+TOP_AUTHORS = 10            # the user's most-read authors compared against others
+READERS_PER_AUTHOR = 200    # heaviest readers taken from each of those authors
+FOF_CANDIDATES = 500        # friends-of-friends kept, most mutual followees first
+
+_FRIENDS_OF_FRIENDS = """
+    SELECT f2.followee_id, COUNT(*) AS mutuals
+    FROM Follows f1
+    JOIN Follows f2 ON f2.follower_id = f1.followee_id
+    WHERE f1.follower_id = %s AND f2.followee_id <> %s
+    GROUP BY f2.followee_id
+    ORDER BY mutuals DESC
+    LIMIT %s
+"""
+
+# One index range per author on UserAuthorReads (author_id, read_count)
+_AUTHOR_READERS = """
+    (SELECT user_id FROM UserAuthorReads
+     WHERE author_id = %s
+     ORDER BY read_count DESC
+     LIMIT %s)
+"""
+
+# Most followed users, for people with no follows or reads yet
+_POPULAR = """
+    SELECT user_id FROM FollowerCounts
+    ORDER BY followers DESC
+    LIMIT %s
+"""
+
+# Lists are refreshed after the follow that changes them commits, so users
+# followed since are filtered out here
+_SERVE = """
+    SELECT s.candidate_id AS user_id, u.username, u.name, s.mutuals, s.shared_authors
+    FROM FollowSuggestions s
+    JOIN User u ON u.user_id = s.candidate_id
+    LEFT JOIN Follows f ON f.follower_id = s.user_id AND f.followee_id = s.candidate_id
+    WHERE s.user_id = %s AND f.follower_id IS NULL
+    ORDER BY s.position
+"""
+
+
+def rank(user_id, following, mutuals, shared, popular, top_k):
+    """[(candidate, score, mutuals, shared authors)] best first, at most `top_k`.
+
+    `mutuals` and `shared` map candidate -> count. Users already followed are
+    skipped; `popular` tops the list up when the graph has too little to say.
+    """
+    scored = []
+    for candidate in mutuals.keys() | shared.keys():
+        if candidate == user_id or candidate in following:
+            continue
+        m, s = mutuals.get(candidate, 0), shared.get(candidate, 0)
+        scored.append((MUTUAL_WEIGHT * m + AUTHOR_WEIGHT * s, m, s, candidate))
+    scored.sort(key=lambda row: (-row[0], -row[1], row[3]))
+    ranked = [(candidate, score, m, s) for score, m, s, candidate in scored[:top_k]]
+
+    chosen = {row[0] for row in ranked}
+    for candidate in popular:
+        if len(ranked) >= top_k:
+            break
+        if candidate != user_id and candidate not in following and candidate not in chosen:
+            ranked.append((candidate, 0, 0, 0))
+            chosen.add(candidate)
+    return ranked
+
+
+def popular_users(db, top_k):
+    """Fallback candidates shared by every refresh in a batch"""
+    cursor = db.cursor()
+    cursor.execute(_POPULAR, (top_k * 4,))
+    found = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return found
+
+
+def refresh_user(db, user_id, top_k=20, popular=None):
+    """Recompute and store one user's suggestions; a handful of bounded index reads"""
+    user_id = int(user_id)
+    cursor = db.cursor()
+    cursor.execute("SELECT followee_id FROM Follows WHERE follower_id = %s", (user_id,))
+    following = {row[0] for row in cursor.fetchall()}
+
+    mutuals = {}
+    if following:
+        cursor.execute(_FRIENDS_OF_FRIENDS, (user_id, user_id, FOF_CANDIDATES))
+        mutuals = dict(cursor.fetchall())
+
+    cursor.execute("""
+        SELECT author_id FROM UserAuthorReads
+        WHERE user_id = %s
+        ORDER BY read_count DESC
+        LIMIT %s
+    """, (user_id, TOP_AUTHORS))
+    authors = [row[0] for row in cursor.fetchall()]
+    shared = {}
+    if authors:
+        cursor.execute(" UNION ALL ".join([_AUTHOR_READERS] * len(authors)),
+                       [value for author_id in authors for value in (author_id, READERS_PER_AUTHOR)])
+        for (reader,) in cursor.fetchall():
+            shared[reader] = shared.get(reader, 0) + 1
+
+    if popular is None:
+        popular = popular_users(db, top_k)
+    ranked = rank(user_id, following, mutuals, shared, popular, top_k)
+
+    cursor.execute("DELETE FROM FollowSuggestions WHERE user_id = %s", (user_id,))
+    if ranked:
+        cursor.executemany("""
+            INSERT INTO FollowSuggestions (user_id, position, candidate_id, score, mutuals, shared_authors)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(user_id, position, *row) for position, row in enumerate(ranked)])
+    cursor.close()
+    return len(ranked)
+
+
+def follows_changed(db, follower_ids, top_k=20, fanout_limit=1000):
+    """Bring suggestions up to date after `follower_ids` followed or unfollowed someone.
+
+    Their own lists are recomputed. Their followers' friends-of-friends
+    changed too, so those stored lists are dropped and fetch() recomputes
+    each on its next request; followers of users with more than
+    `fanout_limit` followers are left to rebuild-suggestions.
+    """
+    follower_ids = [int(user_id) for user_id in follower_ids]
+    if not follower_ids:
+        return
+    popular = popular_users(db, top_k)
+    for user_id in follower_ids:
+        refresh_user(db, user_id, top_k, popular)
+
+    placeholders = ', '.join(['%s'] * len(follower_ids))
+    cursor = db.cursor()
+    cursor.execute(f"""
+        DELETE s FROM FollowSuggestions s
+        JOIN Follows f ON f.follower_id = s.user_id
+        JOIN FollowerCounts c ON c.user_id = f.followee_id
+        WHERE f.followee_id IN ({placeholders}) AND c.followers <= %s
+          AND s.user_id NOT IN ({placeholders})
+    """, follower_ids + [fanout_limit] + follower_ids)
+    cursor.close()
+
+
+def rebuild_all(db, top_k=20, batch_size=1000, progress=None):
+    """Refresh every user, committing each `batch_size` users; returns users refreshed"""
+    cursor = db.cursor()
+    cursor.execute("SELECT user_id FROM User WHERE username != 'admin' ORDER BY user_id")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+
+    popular = popular_users(db, top_k)
+    for done, user_id in enumerate(user_ids, 1):
+        refresh_user(db, user_id, top_k, popular)
+        if done % batch_size == 0:
+            db.commit()
+            if progress:
+                progress(done, len(user_ids))
+    db.commit()
+    return len(user_ids)
+
+
+def forget_user(db, user_id):
+    """Drop a deleted user's own list and their entries in everyone else's"""
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM FollowSuggestions WHERE user_id = %s OR candidate_id = %s",
+                   (user_id, user_id))
+    cursor.close()
+
+
+def fetch(db, user_id, top_k=20):
+    """Stored suggestions in rank order, computing them on first request"""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(_SERVE, (user_id,))
+    users = cursor.fetchall()
+    if not users and refresh_user(db, user_id, top_k):
+        db.commit()
+        cursor.execute(_SERVE, (user_id,))
+        users = cursor.fetchall()
+    cursor.close()
+    return users
@@ -0,0 +1,70 @@
+"""Deleting a book through the admin endpoint, against the configured MySQL database.
+
+Skipped when Flask or the MySQL driver is missing, the database is unreachable,
+or it has migrations pending (the app refuses requests until they run).
+"""
+import uuid
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('mysql.connector')
+
+import main  # noqa: E402
+import migrate  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    with main.app.app_context():
+        try:
+            db = main.get_db()
+        except Exception as e:
+            pytest.skip(f'database unavailable: {e}')
+        if migrate.pending(db):
+            pytest.skip('database has pending migrations')
+        yield db
+
+
+@pytest.fixture
+def owner(db):
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO User (name, username, password) VALUES (%s, %s, %s)",
+        ('Delete Test', f'delete-test-{uuid.uuid4().hex[:12]}', 'x'))
+    user_id = cursor.lastrowid
+    db.commit()
+    yield user_id
+    # Book rows go with the user (ON DELETE CASCADE)
+    cursor.execute("DELETE FROM User WHERE user_id = %s", (user_id,))
+    db.commit()
+    cursor.close()
+
+
+def _add_book(db, user_id):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO Book (title, user_id) VALUES (%s, %s)", ('Delete Me', user_id))
+    book_id = cursor.lastrowid
+    db.commit()
+    cursor.close()
+    return book_id
+
+
+def test_delete_book(db, owner):
+    book_id = _add_book(db, owner)
+
+    response = main.app.test_client().delete(
+        '/api/admin/delete-book', json={'book_id': book_id, 'user_id': owner})
+
+    assert response.status_code == 200, response.get_json()
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Book WHERE book_id = %s", (book_id,))
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+
+
+def test_delete_missing_book(db, owner):
+    response = main.app.test_client().delete(
+        '/api/admin/delete-book', json={'book_id': 2 ** 31 - 1, 'user_id': owner})
+
+    assert response.status_code == 404
@@ -0,0 +1,272 @@
+import bisect
+import logging
+import threading
+import time
+from array import array
+
+from search_index import normalize, trigrams
+from starred_cache import StarredCache
+
+
+class _IndexedUser:
+    __slots__ = ('username', 'name', 'username_key', 'name_key')
+
+    def __init__(self, username, name):
+        self.username = username
+        self.name = name or ''
+        # Reuse the original string when normalizing changes nothing, which is most usernames
+        key = normalize(username)
+        self.username_key = username if key == username else key
+        key = normalize(self.name)
+        self.name_key = self.name if key == self.name else key
+
+
+class _SortedKeys:
+    """Keys in sorted order with the owning user id alongside, for prefix ranges"""
+
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = array('i', (user_id for _, user_id in pairs))
+
+    def add(self, key, user_id):
+        pos = bisect.bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, user_id)
+
+    def remove(self, key, user_id):
+        pos = bisect.bisect_left(self.keys, key)
+        while pos < len(self.keys) and self.keys[pos] == key:
+            if self.ids[pos] == user_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return
+            pos += 1
+
+    def prefixed(self, prefix):
+        """User ids whose key starts with `prefix`, in key order"""
+        pos = bisect.bisect_left(self.keys, prefix)
+        while pos < len(self.keys) and self.keys[pos].startswith(prefix):
+            yield self.ids[pos]
+            pos += 1
+
+
+class UserSearchIndex:
+    """In-process typeahead index over User.username and User.name.
+
+    Matches come in three tiers: username prefix, name prefix, then any
+    substring of either found through trigram postings (queries of three or
+    more characters). Prefix tiers are read off sorted key arrays in username
+    or name order; the substring tier stops once `limit` matches are found.
+
+    The whole table is loaded once, on a background thread at 1M users since
+    it takes tens of seconds, and then kept current by add_user/remove_user
+    from /api/register and /api/admin/delete-user. Writes that land while the
+    load is running are replayed onto it. Nothing loads on the request path:
+    search() returns None until the index is ready, and a failed load is
+    logged to `log` and retried no sooner than `retry_after` seconds later.
+    """
+
+    LOAD_QUERY = "SELECT user_id, username, name FROM User"
+
+    def __init__(self, log=None, retry_after=30):
+        self.log = log or logging.getLogger('bookapp.user_search')
+        self.retry_after = retry_after
+        self._failed_at = None
+        self._users = None
+        self._usernames = None
+        self._names = None
+        self._postings = None
+        self._pending = None
+        self._loader = None
+        self._failures = 0
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._users is not None
+
+    def load_in_background(self, pool):
+        """Start loading with a connection from `pool` unless already loaded or loading"""
+        with self._lock:
+            if self._users is not None or self._loader is not None:
+                return
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                return
+            self._loader = threading.Thread(target=self._load_from_pool, args=(pool,),
+                                            name='user-search-load', daemon=True)
+            self._loader.start()
+
+    def search(self, query, limit=10, exclude=None):
+        """[(user_id, username, name)] matching `query`, best first, or None while not loaded"""
+        exclude = int(exclude) if exclude is not None else None
+        query = query.strip()
+        with self._lock:
+            if self._users is None:
+                return None
+            if query.isdigit():
+                user = self._users.get(int(query))
+                found = [int(query)] if user is not None and int(query) != exclude else []
+            else:
+                found = self._match(normalize(query), limit, exclude)
+            return [(user_id, self._users[user_id].username, self._users[user_id].name)
+                    for user_id in found]
+
+    def add_user(self, user_id, username, name):
+        """Index a newly registered user"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self.add_user, (user_id, username, name)))
+            if self._users is None:
+                return
+            user_id = int(user_id)
+            self._remove(user_id)
+            user = self._users[user_id] = _IndexedUser(username, name)
+            self._usernames.add(user.username_key, user_id)
+            self._names.add(user.name_key, user_id)
+            for gram in trigrams(user.username_key) | trigrams(user.name_key):
+                self._postings.setdefault(gram, array('i')).append(user_id)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self.remove_user, (user_id,)))
+            if self._users is not None:
+                self._remove(int(user_id))
+
+    def stats(self):
+        with self._lock:
+            if self._users is None:
+                return {"loaded": False, "load_failures": self._failures}
+            return {
+                "loaded": True,
+                "load_failures": self._failures,
+                "users": len(self._users),
+                "trigrams": len(self._postings),
+                "postings": sum(len(ids) for ids in self._postings.values()),
+            }
+
+    def _match(self, key, limit, exclude):
+        found, seen = [], set()
+
+        def take(user_id):
+            if user_id != exclude and user_id not in seen:
+                seen.add(user_id)
+                found.append(user_id)
+            return len(found) >= limit
+
+        for sorted_keys in (self._usernames, self._names):
+            for user_id in sorted_keys.prefixed(key):
+                if take(user_id):
+                    return found
+        if len(key) < 3:
+            return found
+
+        lists = []
+        for gram in trigrams(key):
+            ids = self._postings.get(gram)
+            if not ids:
+                return found
+            lists.append(ids)
+        substring = []
+        # Walk the rarest trigram's postings and confirm each candidate
+        for user_id in min(lists, key=len):
+            user = self._users.get(user_id)
+            if user_id in seen or user_id == exclude or user is None:
+                continue
+            if key in user.username_key or key in user.name_key:
+                substring.append((user.username_key, user_id))
+                if len(found) + len(substring) >= limit:
+                    break
+        found.extend(user_id for _, user_id in sorted(substring))
+        return found
+
+    def _remove(self, user_id):
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return
+        self._usernames.remove(user.username_key, user_id)
+        self._names.remove(user.name_key, user_id)
+        for gram in trigrams(user.username_key) | trigrams(user.name_key):
+            ids = self._postings.get(gram)
+            if ids is not None and user_id in ids:
+                ids.remove(user_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _load_from_pool(self, pool):
+        conn = None
+        failed = False
+        try:
+            conn = pool.acquire()
+            cursor = conn.cursor(dictionary=True)
+            self._ensure_loaded(cursor)
+            cursor.close()
+        except Exception:
+            failed = True
+            self.log.exception("User search index load failed; retrying in %ss", self.retry_after)
+        finally:
+            if conn is not None:
+                pool.release(conn)
+            with self._lock:
+                # Cleared either way, so a failed load is retried once retry_after has passed
+                self._loader = None
+                if failed:
+                    self._failed_at = time.monotonic()
+                    self._failures += 1
+
+    def _ensure_loaded(self, cursor):
+        if self._users is not None:
+            return
+        with self._load_lock:
+            if self._users is not None:
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                users, usernames, names, postings = self._read(cursor)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                self._users, self._usernames, self._names, self._postings = users, usernames, names, postings
+                pending, self._pending = self._pending, None
+                for apply, args in pending:
+                    apply(*args)
+
+    def _read(self, cursor):
+        cursor.execute(self.LOAD_QUERY)
+        users, postings = {}, {}
+        for row in cursor.fetchall():
+            user = users[row['user_id']] = _IndexedUser(row['username'], row['name'])
+            for gram in trigrams(user.username_key) | trigrams(user.name_key):
+                ids = postings.get(gram)
+                if ids is None:
+                    ids = postings[gram] = array('i')
+                ids.append(row['user_id'])
+        usernames = _SortedKeys((u.username_key, user_id) for user_id, u in users.items())
+        names = _SortedKeys((u.name_key, user_id) for user_id, u in users.items())
+        return users, usernames, names, postings
+
+
+class FolloweeCache(StarredCache):
+    """Per-user followee ids as sorted int arrays, for follow-state flags.
+
+    Same LRU and write-through behaviour as StarredCache, loaded from Follows
+    and kept current by /api/follow and /api/unfollow.
+    """
+
+    LOAD_QUERY = "SELECT followee_id FROM Follows WHERE follower_id = %s ORDER BY followee_id"
+    COLUMN = 'followee_id'
+
+    followee_ids = StarredCache.starred_ids
+    is_following = StarredCache.is_starred
+    follow = StarredCache.star
+    unfollow = StarredCache.unstar
+    # A deleted user disappears from everyone's followees
+    forget_followee = StarredCache.forget_book